@@ -1,16 +1,46 @@
 from dotenv import load_dotenv
 from fastapi import FastAPI
 import os
-from langchain_groq import ChatGroq
-from routes import analyze
+from contextlib import asynccontextmanager
+from routes import analyze, stream, batch, jobs, metrics
 from fastapi.middleware.cors import CORSMiddleware
+from utility.llm_pool import LLMRegistry
+from utility.executor import run_blocking, shutdown_executor, warm_process_pool
+from utility.fetch import close_fetch_client
+from utility.jobs import JobQueue
+from utility.warmup import WARMUP_IMPORTS, warm_imports
+from utility.observability import RequestContextMiddleware
+import asyncio
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared, keep-alive Groq clients for the life of the worker instead of one per request
+    app.state.llm_registry = LLMRegistry.from_env()
+    # Workers for /analyze/jobs; job status lives in the JOB_BACKEND store
+    app.state.job_queue = JobQueue.from_env()
+    app.state.job_queue.start()
+    # Heavy imports and the document parse workers load in the background; requests that need them
+    # before they're ready just wait on the import lock / pool as they would have anyway
+    warmups = [warm_process_pool()]
+    if WARMUP_IMPORTS:
+        warmups.append(run_blocking(warm_imports))
+    warmup = asyncio.gather(*warmups)
+    yield
+    if not warmup.done():
+        warmup.cancel()
+    await app.state.job_queue.stop()
+    await app.state.llm_registry.aclose()
+    await close_fetch_client()
+    shutdown_executor()
 
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Gen AI Career Consultant",
     description="An AI Career Consultant App.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -19,9 +49,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Session-Token"], # Browser clients resubmit with the issued session token
 )
+# Outermost: request IDs, spans, request metrics and the JSON access log
+app.add_middleware(RequestContextMiddleware)
 
 app.include_router(analyze.router, tags=["analyze"])
+app.include_router(stream.router, tags=["analyze"])
+app.include_router(batch.router, tags=["analyze"])
+app.include_router(jobs.router, tags=["analyze"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 async def root():
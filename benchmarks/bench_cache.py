@@ -0,0 +1,195 @@
+# bench_cache.py
+# Shared cache tiers (utility/cache.py): get/set latency per backend, orjson vs json encoding, and
+# checks that matter for multi-worker deployments:
+#   cross_process - entries written by another process are served from the shared tier
+#   eviction      - the sqlite tier stays under its byte cap, the Redis stand-in under --maxmemory
+#   outage        - with the network backend down, lookups fall back to misses without raising
+#   event_loop    - aget/aset against a slow shared tier leave the event loop free for other requests
+# The redis backend runs against benchmarks/resp_server.py unless --redis-url points at a real server.
+# Prints JSON; exits non-zero if a check fails.
+#
+#   python benchmarks/bench_cache.py --ops 2000
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import ANALYSIS_REPLY, resume_lines
+from benchmarks.resp_server import start_server
+import utility.cache as cache_module
+from utility.cache import LRUCache, TieredCache, SQLiteCache, RedisCache, dumps, loads
+
+VALUES = {
+    "analysis": ANALYSIS_REPLY,
+    "resume_text": "\n".join(resume_lines(3)),
+}
+
+
+def percentile_us(samples, fraction):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e6, 1)
+
+
+def make_tier(backend, target, name, **options):
+    if backend == "sqlite":
+        return SQLiteCache(target, name, **options)
+    if backend == "redis":
+        return RedisCache(target, name)
+    return None
+
+
+def time_ops(cache, ops, value):
+    sets, gets = [], []
+    for i in range(ops):
+        started = time.perf_counter()
+        cache.set(f"key-{i}", value)
+        sets.append(time.perf_counter() - started)
+    for i in range(ops):
+        cache.memory.clear() # Measure the shared tier, not the in-process LRU in front of it
+        started = time.perf_counter()
+        cache.get(f"key-{i}")
+        gets.append(time.perf_counter() - started)
+    return {"set_p50_us": percentile_us(sets, 0.5), "set_p99_us": percentile_us(sets, 0.99),
+            "get_p50_us": percentile_us(gets, 0.5), "get_p99_us": percentile_us(gets, 0.99)}
+
+
+def writer(backend, target, count):
+    # Runs in a separate process, like another uvicorn worker
+    cache = TieredCache(LRUCache(), make_tier(backend, target, "cross_process"))
+    for i in range(count):
+        cache.set(f"entry-{i}", {"index": i, "text": "shared"})
+
+
+def cross_process(backend, target, count=100):
+    process = multiprocessing.get_context("spawn").Process(target=writer, args=(backend, target, count))
+    process.start()
+    process.join()
+    cache = TieredCache(LRUCache(), make_tier(backend, target, "cross_process"))
+    found = sum(cache.get(f"entry-{i}") == {"index": i, "text": "shared"} for i in range(count))
+    return {"written": count, "read_back": found, "shared_hits": cache.shared_hits}
+
+
+class SlowTier:
+    # A shared tier whose every call takes `delay` seconds, like a Redis server near its timeout
+    name = "slow"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.data = {}
+
+    def get(self, key, default=None):
+        time.sleep(self.delay)
+        return self.data.get(key, default)
+
+    def set(self, key, value, ttl=None):
+        time.sleep(self.delay)
+        self.data[key] = value
+
+
+async def loop_lag(delay=0.1, calls=5):
+    # Longest gap between 10 ms ticks of another task while the cache waits on the slow tier
+    cache = TieredCache(LRUCache(), SlowTier(delay))
+    gaps = []
+
+    async def ticker(stop):
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    stop = asyncio.Event()
+    ticking = asyncio.create_task(ticker(stop))
+    for i in range(calls):
+        await cache.aset(f"key-{i}", i)
+        cache.memory.clear()
+        await cache.aget(f"key-{i}")
+    stop.set()
+    await ticking
+    return {"tier_delay_ms": delay * 1000, "max_tick_gap_ms": round(max(gaps) * 1000, 1), "shared_hits": cache.shared_hits}
+
+
+def encoding():
+    report = {}
+    for name, value in VALUES.items():
+        started = time.perf_counter()
+        for _ in range(1000):
+            loads(dumps(value))
+        fast = (time.perf_counter() - started) / 1000
+        started = time.perf_counter()
+        for _ in range(1000):
+            json.loads(json.dumps(value))
+        plain = (time.perf_counter() - started) / 1000
+        report[name] = {"bytes": len(dumps(value)), "json_bytes": len(json.dumps(value).encode()),
+                        "roundtrip_us": round(fast * 1e6, 1), "json_roundtrip_us": round(plain * 1e6, 1)}
+    report["orjson"] = cache_module.orjson is not None
+    return report
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="bench_cache_")
+    sqlite_path = os.path.join(workdir, "cache.db")
+    server = None
+    redis_url = args.redis_url
+    if redis_url is None:
+        server, redis_url = start_server(maxmemory=args.maxmemory)
+    targets = {"memory": None, "sqlite": sqlite_path, "redis": redis_url}
+
+    report = {"latency": {}, "encoding": encoding(), "checks": {}}
+    for backend, target in targets.items():
+        report["latency"][backend] = {
+            name: time_ops(TieredCache(LRUCache(maxsize=args.ops), make_tier(backend, target, f"bench_{name}")), args.ops, value)
+            for name, value in VALUES.items()
+        }
+
+    checks = report["checks"]
+    for backend in ("sqlite", "redis"):
+        result = cross_process(backend, targets[backend])
+        report[f"cross_process_{backend}"] = result
+        checks[f"{backend}: entries written by another process are read back"] = result["read_back"] == result["written"]
+
+    # sqlite: write 4x the cap, the table must end at or under it
+    cap = 256 * 1024
+    evicting = SQLiteCache(sqlite_path, "eviction", max_bytes=cap)
+    for i in range(4 * cap // len(dumps(VALUES["resume_text"]))):
+        evicting.set(f"doc-{i}", VALUES["resume_text"])
+    stored = evicting._conn.execute("SELECT COALESCE(SUM(size), 0) FROM eviction").fetchone()[0]
+    report["eviction_sqlite"] = {"cap_bytes": cap, "stored_bytes": stored, "evicted": evicting.evictions}
+    checks["sqlite: size stays under CACHE_MAX_BYTES"] = stored <= cap and evicting.evictions > 0
+    if server is not None:
+        report["eviction_redis_stand_in"] = {"maxmemory": args.maxmemory, "used": server.store.used, "evicted": server.store.evicted}
+        checks["redis stand-in: size stays under maxmemory"] = server.store.used <= args.maxmemory
+
+    # Nothing listens on port 1: every shared-tier call fails, the cache must still answer
+    down = TieredCache(LRUCache(), RedisCache("redis://127.0.0.1:1/0", "outage"))
+    try:
+        down.set("a", 1)
+        outage_ok = down.get("a") == 1 and down.get("b") is None
+    except Exception:
+        outage_ok = False
+    report["outage"] = {"backend_errors": down.errors}
+    checks["redis down: lookups degrade to misses"] = outage_ok and down.errors > 0
+
+    report["event_loop"] = asyncio.run(loop_lag())
+    checks["slow shared tier: event loop keeps running"] = report["event_loop"]["max_tick_gap_ms"] < 50 and report["event_loop"]["shared_hits"] == 5
+
+    if server is not None:
+        server.shutdown()
+    report["failures"] = [name for name, passed in checks.items() if not passed]
+    print(json.dumps(report, indent=2))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared cache backend latency and checks.")
+    parser.add_argument("--ops", type=int, default=1000, help="Sets and gets per backend and value")
+    parser.add_argument("--redis-url", help="Use a real Redis instead of the in-process stand-in")
+    parser.add_argument("--maxmemory", type=int, default=8 * 1024 * 1024, help="Stand-in memory cap in bytes")
+    sys.exit(main(parser.parse_args()))
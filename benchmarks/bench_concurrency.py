@@ -0,0 +1,67 @@
+# bench_concurrency.py
+# Load benchmark for /analyze/ against a stub LLM: shows how many analyses one worker keeps in flight.
+# The real ChatGroq client is used, talking to an in-process fake Groq transport.
+#
+#   python benchmarks/bench_concurrency.py --requests 100 --concurrency 1 10 50 --llm-latency 0.5
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+
+import httpx
+from app import app
+import prompts.posting
+from benchmarks.stubs import stub_reply, make_fetch_stub, make_portfolio_csv, fake_chat_transport
+from utility.llm_pool import LLMRegistry
+
+
+async def run_level(client, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    # A distinct portfolio per request, otherwise the analysis result cache answers everything after the first
+    run_id = time.perf_counter_ns()
+
+    async def one(i):
+        async with semaphore:
+            response = await client.post(
+                "/analyze/",
+                data={"url": "https://jobs.example.com/1", "use_both": "false", "model_choice": "llama-3.1-8b-instant"},
+                files={"portfolio_file": ("portfolio.csv", make_portfolio_csv(unique=f"{run_id}-{i}"), "text/csv")},
+            )
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    # Swap the network-bound pieces for local stubs with fixed latencies
+    prompts.posting.fetch_page_text = make_fetch_stub(latency=args.fetch_latency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await app.state.llm_registry.aclose() # Replace the real registry; the lifespan closes ours on exit
+        app.state.llm_registry = LLMRegistry(
+            api_key=os.environ["GROQ_API_KEY"],
+            async_transport=fake_chat_transport(stub_reply, latency=args.llm_latency),
+            # This measures the app, not the rate limiter (see bench_rate_limits.py): lift the per-model budgets
+            rpm=0, tpm=0, max_concurrency=max(args.concurrency),
+        )
+        print(f"{'concurrency':>12} {'requests':>9} {'seconds':>9} {'req/s':>9}")
+        for concurrency in args.concurrency:
+            elapsed = await run_level(client, args.requests, concurrency)
+            print(f"{concurrency:>12} {args.requests:>9} {elapsed:>9.2f} {args.requests / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--fetch-latency", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,238 @@
+# bench_e2e.py
+# Offline end-to-end benchmark for /analyze/: nothing leaves the machine. Recorded job-posting pages are
+# served from a local HTTP server (so the real fetch + HTML extraction run), ChatGroq talks to the fake
+# Groq transport with a fixed latency and canned JSON (benchmarks/corpus.py), and resumes/portfolios come
+# from the generated PDF/DOCX/CSV corpus. For each mode (resume, portfolio, both) and concurrency level
+# it reports throughput, p50/p99 latency, per-stage p50 (from Server-Timing) and peak RSS of the server
+# process plus its parse workers. Writes JSON; exits non-zero on failed requests or, with --baseline,
+# when throughput or p99 regresses by more than --max-regression.
+#
+#   python benchmarks/bench_e2e.py --requests 60 --concurrency 1 8 32 --output e2e.json
+#   python benchmarks/bench_e2e.py --cache-mode warm --baseline e2e.json
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+os.environ.setdefault("LOG_LEVEL", "WARNING") # Keep the app's JSON logs out of the report on stdout
+
+import httpx
+from app import app
+import utility.executor
+from benchmarks.corpus import load_postings, make_fake_reply, make_resume, make_portfolio, RESUME_SIZES, PORTFOLIO_SIZES
+from benchmarks.stubs import fake_chat_transport
+from utility.llm_pool import LLMRegistry
+
+MODES = ("resume", "portfolio", "both")
+MODEL = "llama-3.1-8b-instant"
+
+
+def serve_postings(postings, latency):
+    # Job-board stand-in on 127.0.0.1; every path ending in <name>.html (query ignored) serves that fixture
+    pages = {f"/{name}.html": html.encode() for name, (html, _) in postings.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path.split("?")[0])
+            time.sleep(latency)
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            self.wfile.write(body or b"")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def rss_bytes() -> int:
+    # Resident memory of this process plus the parse workers, from /proc; falls back to our own peak
+    pids = [os.getpid()]
+    pool = utility.executor._process_pool
+    if pool is not None:
+        pids += list(getattr(pool, "_processes", None) or {})
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            if pid == os.getpid():
+                return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return total
+
+
+class RssSampler:
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = 0
+
+    async def run(self):
+        while True:
+            self.peak = max(self.peak, rss_bytes())
+            await asyncio.sleep(self.interval)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+def server_timing(header: str) -> dict:
+    stages = {}
+    for part in header.split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if duration:
+            stages[name] = float(duration)
+    return stages
+
+
+def build_request(mode, i, args, posting_names, base_url, salt):
+    # Posting, document kind and size rotate with the request index so every level sees the same mix
+    name = posting_names[i % len(posting_names)]
+    url = f"{base_url}/{name}.html" + (f"?r={salt}" if salt else "")
+    files = {}
+    if mode in ("resume", "both"):
+        kind = ("pdf", "docx")[i % 2]
+        size = args.resume_sizes[i % len(args.resume_sizes)]
+        content_type = "application/pdf" if kind == "pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        files["resume_file"] = (f"resume.{kind}", make_resume(kind, size, salt), content_type)
+    if mode in ("portfolio", "both"):
+        size = args.portfolio_sizes[i % len(args.portfolio_sizes)]
+        files["portfolio_file"] = ("portfolio.csv", make_portfolio(PORTFOLIO_SIZES[size], salt), "text/csv")
+    data = {"url": url, "use_both": "true" if mode == "both" else "false", "model_choice": MODEL}
+    return data, files
+
+
+async def run_level(client, mode, concurrency, args, posting_names, base_url, run_id):
+    # Documents are built up front so generating them isn't part of the measurement
+    requests = []
+    for i in range(args.requests):
+        # cold: every request distinct (posting, parse and analysis caches all miss); warm: a repeating set
+        salt = f"{run_id}-{mode}-{concurrency}-{i}" if args.cache_mode == "cold" else ""
+        requests.append(build_request(mode, i, args, posting_names, base_url, salt))
+    if args.cache_mode == "warm":
+        for data, files in requests[:len(posting_names) * 2]:
+            (await client.post("/analyze/", data=data, files=files)).raise_for_status()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, stages, errors = [], {}, []
+
+    async def one(data, files):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/analyze/", data=data, files=files)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors.append(f"{response.status_code}: {response.text[:200]}")
+                return
+            for name, ms in server_timing(response.headers.get("server-timing", "")).items():
+                stages.setdefault(name, []).append(ms)
+
+    sampler = RssSampler()
+    sampling = asyncio.create_task(sampler.run())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(data, files) for data, files in requests))
+    elapsed = time.perf_counter() - started
+    sampling.cancel()
+    return {
+        "mode": mode, "concurrency": concurrency, "requests": args.requests, "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.5), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "stages_p50_ms": {name: round(percentile(values, 0.5), 1) for name, values in stages.items()},
+        "peak_rss_mb": round(max(sampler.peak, rss_bytes()) / 2**20, 1),
+        "error_samples": errors[:3],
+    }
+
+
+def compare(results, baseline, max_regression):
+    # Same mode/concurrency in both runs: throughput may drop, and p99 may grow, by at most max_regression
+    previous = {(r["mode"], r["concurrency"]): r for r in baseline.get("results", [])}
+    failures = []
+    for result in results:
+        before = previous.get((result["mode"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['mode']} @ {result['concurrency']}"
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            failures.append(f"{label}: throughput {result['throughput_rps']} < baseline {before['throughput_rps']}")
+        if result["p99_ms"] > before["p99_ms"] * (1 + max_regression):
+            failures.append(f"{label}: p99 {result['p99_ms']} ms > baseline {before['p99_ms']} ms")
+    return failures
+
+
+async def main(args):
+    postings = load_postings()
+    server = serve_postings(postings, args.fetch_latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await app.state.llm_registry.aclose() # Replace the real registry; the lifespan closes ours on exit
+            app.state.llm_registry = LLMRegistry(
+                api_key=os.environ["GROQ_API_KEY"],
+                async_transport=fake_chat_transport(make_fake_reply(postings), latency=args.llm_latency),
+                # Measures the pipeline, not the rate limiter (see bench_rate_limits.py)
+                rpm=0, tpm=0, max_concurrency=max(args.concurrency),
+            )
+            run_id = time.time_ns()
+            # One throwaway request first: lazy imports and the first ChatGroq client aren't part of any level
+            data, files = build_request("both", 0, args, list(postings), base_url, f"{run_id}-warmup")
+            (await client.post("/analyze/", data=data, files=files)).raise_for_status()
+            for mode in args.modes:
+                for concurrency in args.concurrency:
+                    result = await run_level(client, mode, concurrency, args, list(postings), base_url, run_id)
+                    results.append(result)
+                    print(f"{mode:>10} c={concurrency:<4} {result['throughput_rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+                          f"p99 {result['p99_ms']:>8.1f} ms  rss {result['peak_rss_mb']:>7.1f} MB  errors {result['errors']}", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    report = {
+        "settings": {"requests": args.requests, "cache_mode": args.cache_mode, "llm_latency_s": args.llm_latency,
+                     "fetch_latency_s": args.fetch_latency, "resume_sizes": args.resume_sizes, "portfolio_sizes": args.portfolio_sizes,
+                     "postings": list(postings), "cpus": os.cpu_count()},
+        "results": results,
+        "failures": [f"{r['mode']} @ {r['concurrency']}: {r['errors']} failed requests" for r in results if r["errors"]],
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["failures"] += compare(results, json.load(f), args.max_regression)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end /analyze/ benchmark.")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per mode and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--cache-mode", choices=("cold", "warm"), default="cold")
+    parser.add_argument("--resume-sizes", nargs="+", choices=list(RESUME_SIZES), default=["small", "medium", "large"])
+    parser.add_argument("--portfolio-sizes", nargs="+", choices=list(PORTFOLIO_SIZES), default=["small", "medium", "large"])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="Seconds the posting server waits before answering")
+    parser.add_argument("--output", help="Write the JSON report here as well")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed fractional throughput drop / p99 growth")
+    sys.exit(asyncio.run(main(parser.parse_args())))
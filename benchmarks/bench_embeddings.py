@@ -0,0 +1,148 @@
+# bench_embeddings.py
+# Semantic skill matching (utility/embeddings.py, utility/skills.py) at a large vocabulary: the skill
+# dictionary plus synthetic phrases up to --vocab-size entries. Measures embedding/build time, the .npy
+# save and memory-mapped load, top-k latency per batch size and match_skills latency with that
+# vocabulary loaded, then checks match quality on near-synonyms (must match) and look-alikes that are
+# different skills or share only one word with the evidence (must not). Prints JSON; exits non-zero if a check fails.
+#
+#   python benchmarks/bench_embeddings.py --vocab-size 10000
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.corpus import resume_lines
+import utility.embeddings as embeddings
+from utility.embeddings import embed, vocabulary_phrases, save_vocabulary, load_vocabulary
+from utility.skills import SKILL_SYNONYMS, SEMANTIC_THRESHOLD, match_skills
+
+# (job skill, candidate text): the exact pass misses these, the semantic pass has to catch them
+NEAR_SYNONYMS = [
+    ("PostgresSQL", "Built reporting on PostgreSQL and Redis."),
+    ("Kubernets", "Deployed services to Kubernetes with Helm."),
+    ("Postgre SQL", "Tuned postgresql queries."),
+    ("Machine-learning", "Applied machine learning to churn prediction."),
+    ("Elastic-search", "Indexed logs into Elasticsearch."),
+    ("Micro-services", "Split the monolith into microservices."),
+    ("Node", "Wrote APIs in Node.js and Express."),
+]
+# (job skill, candidate text): close spellings, different skills
+LOOK_ALIKES = [
+    ("Java", "Five years of JavaScript and TypeScript."),
+    ("Reactor", "Built dashboards in React."),
+    ("MySQL", "Ran PostgreSQL in production."),
+    ("Swift", "Shipped SwiftUI previews for the design team."),
+    ("Jenkins", "Wrote tests with Jest."),
+    ("Communication", "Set up continuous integration."),
+    ("Data Analysis", "Created data visualization dashboards."),
+    # One shared word is not a match: every word of the skill has to be covered
+    ("Apache Flink", "Streamed events through Apache Kafka."),
+    ("Objective-C", "Objective: to get a job in backend development."),
+    ("Power BI", "Maintained control systems at a power plant."),
+    ("Microsoft Excel", "Wrote release notes in Microsoft Word."),
+    ("Project Management", "Moved from engineering into product management."),
+    ("Customer Service", "Partnered with customer success on renewals."),
+    ("Terraform Cloud", "Wrote Terraform modules for every service."),
+    ("Machine Learning Operations", "Trained machine learning models."),
+]
+SYLLABLES = ["ka", "ro", "mi", "zen", "tor", "lux", "qua", "vex", "dal", "pri", "sto", "nex", "fra", "gol", "wyn", "bel"]
+SUFFIXES = ["", " framework", " platform", " administration", " certification", " sdk", " api", " cloud", " studio", " db"]
+
+
+def percentile_ms(samples, fraction):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+
+def synthetic_vocabulary(size, seed=7):
+    # The real dictionary first, then made-up product names with common suffixes until size entries
+    phrases, labels = vocabulary_phrases(SKILL_SYNONYMS)
+    seen = {phrase.lower() for phrase in phrases}
+    rng = random.Random(seed)
+    while len(phrases) < size:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        phrase = name + rng.choice(SUFFIXES)
+        if phrase.lower() not in seen:
+            seen.add(phrase.lower())
+            phrases.append(phrase)
+            labels.append(name)
+    return phrases, labels
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {"p50_ms": percentile_ms(samples, 0.5), "p99_ms": percentile_ms(samples, 0.99)}
+
+
+def main(args):
+    report = {"vocab_size": args.vocab_size, "dim": embeddings.EMBED_DIM, "threshold": SEMANTIC_THRESHOLD, "checks": {}}
+    phrases, labels = synthetic_vocabulary(args.vocab_size)
+
+    started = time.perf_counter()
+    embed(phrases)
+    report["embed_cold_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    started = time.perf_counter()
+    embed(phrases)
+    report["embed_cached_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_embeddings_"), "skill_vectors.npy")
+    started = time.perf_counter()
+    save_vocabulary(path, phrases, labels)
+    report["save_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["file_bytes"] = os.path.getsize(path)
+    started = time.perf_counter()
+    vocabulary = load_vocabulary(path)
+    report["mmap_load_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["memory_mapped"] = isinstance(vocabulary.matrix, np.memmap)
+
+    rng = random.Random(11)
+    report["top_k"] = {}
+    for batch in args.batches:
+        queries = embed([rng.choice(phrases) for _ in range(batch)])
+        vocabulary.top_k(queries) # Fault the mapped pages in before timing
+        report["top_k"][batch] = time_calls(lambda: vocabulary.top_k(queries), args.repeat)
+
+    # match_skills against the large vocabulary, on a 3-page resume and a mixed job skill list
+    embeddings._vocabulary = vocabulary
+    resume = "\n".join(resume_lines(3))
+    job_skills = [skill for skill, _ in NEAR_SYNONYMS + LOOK_ALIKES] + ["Python", "Docker", "AWS"]
+    report["match_skills"] = time_calls(lambda: match_skills(job_skills, resume_text=resume), args.repeat)
+
+    checks = report["checks"]
+    for skill, text in NEAR_SYNONYMS:
+        match = match_skills([skill], resume_text=text)
+        checks[f"near synonym matches: {skill}"] = match["Matched Skills"] == [skill] and bool(match["Semantic Matches"])
+    for skill, text in LOOK_ALIKES:
+        checks[f"look-alike stays unmatched: {skill}"] = match_skills([skill], resume_text=text)["Matched Skills"] == []
+    checks["scores are deterministic"] = match_skills(job_skills, resume_text=resume) == match_skills(job_skills, resume_text=resume)
+    checks["vocabulary is memory-mapped"] = report["memory_mapped"]
+    largest = max(args.batches)
+    checks[f"top-k p99 under {args.max_top_k_ms} ms at batch {largest}"] = report["top_k"][largest]["p99_ms"] <= args.max_top_k_ms
+
+    report["failures"] = [name for name, passed in checks.items() if not passed]
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semantic skill matching latency and quality.")
+    parser.add_argument("--vocab-size", type=int, default=10000)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 20, 100], help="Job skills embedded per top-k call")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--max-top-k-ms", type=float, default=50.0, help="Fail if top-k p99 at the largest batch exceeds this")
+    parser.add_argument("--output", help="Also write the report to this file")
+    sys.exit(main(parser.parse_args()))
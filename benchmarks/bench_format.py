@@ -0,0 +1,138 @@
+# bench_format.py
+# Result rendering (utility/format.py) on large analyses, hundreds to thousands of questions and skills:
+# the escaping templates and the JSON output mode against the f-string renderer they replaced
+# (frozen below as legacy_format_string_response). Checks:
+#   identical - for text without markup characters the HTML is byte-for-byte what the old renderer produced
+#   escaped   - markup in model output or scraped job text comes out as text, never as tags
+#   speed     - the escaping renderer stays within --max-slowdown of the old, non-escaping one
+# Prints JSON; exits non-zero if a check fails.
+#
+#   python benchmarks/bench_format.py --sizes 10 200 1000
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utility.format import ensure_list, ensure_question_list, format_string_response, format_json_response
+from utility.cache import dumps
+
+
+# --- The renderer before the template rewrite, unescaped ---
+def legacy_format_string_response(result, job_info):
+    suitability = result.get("Suitability", "N/A")
+    job_details = f"""
+        <h3>Job Details</h3>
+        <p><strong>Role:</strong> {job_info.get("role", "N/A")}</p>
+        <p><strong>Description:</strong> {job_info.get("description", "N/A")}</p>
+        <p><strong>Skills Required:</strong> {', '.join(job_info.get("skills", []))}</p>
+    """
+    matched = f"""
+        <h3>Matched Skills</h3>
+        <p><strong>Percentage:</strong> {result.get("Skill Match Percentage", "N/A")}%</p>
+        <ul>
+            {''.join(f'<li>{skill}</li>' for skill in ensure_list(result.get("Matched Skills", [])))}
+        </ul>
+    """
+    html = f"""
+    <div class="analysis-result">
+        <h2>Suitability: {suitability}</h2>
+{job_details}{matched}"""
+    if suitability.lower() == "yes":
+        tech = "".join(f"<li><strong>Q:</strong> {item.get('Question', 'N/A')}<br><strong>A:</strong> {item.get('Answer', 'N/A')}</li>"
+                       for item in ensure_question_list(result.get("Interview Questions", [])))
+        behav = "".join(f"<li>{q}</li>" for q in ensure_list(result.get("Behavioral Questions", [])))
+        html += "\n            <h3>Interview Questions</h3>"
+        html += f"""
+            <h4>Technical Questions:</h4>
+            <ul>{tech if tech else "<li>No technical questions generated.</li>"}</ul>"""
+        html += f"""
+            <h4>Behavioral Questions:</h4>
+            <ul>{behav if behav else "<li>No behavioral questions generated.</li>"}</ul>"""
+        html += "\n        "
+    elif suitability.lower() == "no":
+        reasons = "".join(f"<li>{r}</li>" for r in ensure_list(result.get("Reasons for Unsuitability", [])))
+        suggestions = "".join(f"<li>{s}</li>" for s in ensure_list(result.get("Suggestions", [])))
+        html += f"""
+            <h3>Reasons for Unsuitability</h3>
+            <ul>{reasons if reasons else "<li>No specific reasons provided.</li>"}</ul>"""
+        html += f"""
+            <h3>Suggestions for Improvement</h3>
+            <ul>{suggestions if suggestions else "<li>No specific suggestions provided.</li>"}</ul>"""
+        html += "\n        "
+    else:
+        html += "<p>Analysis result did not clearly indicate suitability.</p>"
+    html += "</div>"
+    return html
+
+
+def make_result(size, suitable=True):
+    job = {"role": "Senior Backend Engineer", "description": "Own the matching pipeline. " * 40,
+           "skills": [f"Skill {i}" for i in range(size)]}
+    result = {"Suitability": "Yes" if suitable else "No", "Skill Match Percentage": 82,
+              "Matched Skills": [f"Skill {i}" for i in range(0, size, 2)]}
+    if suitable:
+        result["Interview Questions"] = [{"Question": f"How would you scale service {i} to ten times the traffic?",
+                                          "Answer": f"Profile first, then cache hot reads and shard by tenant ({i})."} for i in range(size)]
+        result["Behavioral Questions"] = [f"Tell me about a time you disagreed with a design decision ({i})." for i in range(size)]
+    else:
+        result["Reasons for Unsuitability"] = [f"No evidence of production experience with system {i}." for i in range(size)]
+        result["Suggestions"] = [f"Build and document a project that uses system {i}." for i in range(size)]
+    return result, job
+
+
+def best_of(fn, repeat):
+    # Lowest per-call time over a few rounds, in microseconds
+    rounds = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        rounds.append((time.perf_counter() - started) / repeat)
+    return round(min(rounds) * 1e6, 1)
+
+
+def main(args):
+    report = {"sizes": {}, "checks": {}}
+    for size in args.sizes:
+        repeat = max(5, args.repeat // max(1, size // 10))
+        for suitable in (True, False):
+            result, job = make_result(size, suitable)
+            legacy = best_of(lambda: legacy_format_string_response(result, job), repeat)
+            html = best_of(lambda: format_string_response(result, job), repeat)
+            as_json = best_of(lambda: dumps(format_json_response(result, job)), repeat)
+            report["sizes"][f"{size}_{'yes' if suitable else 'no'}"] = {
+                "legacy_us": legacy, "template_us": html, "json_us": as_json,
+                "template_vs_legacy": round(html / legacy, 2), "html_bytes": len(format_string_response(result, job)),
+            }
+
+    checks = report["checks"]
+    for suitable in (True, False):
+        result, job = make_result(50, suitable)
+        checks[f"same HTML as the old renderer ({'yes' if suitable else 'no'})"] = format_string_response(result, job) == legacy_format_string_response(result, job)
+
+    hostile = {"Suitability": "Yes", "Skill Match Percentage": "<b>90</b>", "Matched Skills": ["<script>alert(1)</script>", "C & C++"],
+               "Interview Questions": [{"Question": "<img src=x onerror=alert(1)>", "Answer": "</li></ul><iframe>"}],
+               "Behavioral Questions": ["<a href='javascript:alert(1)'>click</a>"]}
+    hostile_job = {"role": "<svg onload=alert(1)>", "description": "<style>body{display:none}</style>", "skills": ["<b>Go</b>"]}
+    rendered = format_string_response(hostile, hostile_job)
+    checks["markup in model and job text is escaped"] = all(tag not in rendered for tag in ("<script", "<img", "<iframe", "<a ", "<svg", "<style", "<b>"))
+    checks["JSON mode round-trips"] = json.loads(dumps(format_json_response(hostile, hostile_job)))["Matched Skills"] == hostile["Matched Skills"]
+
+    largest = f"{max(args.sizes)}_yes"
+    ratio = report["sizes"][largest]["template_vs_legacy"]
+    checks[f"within {args.max_slowdown}x of the old renderer at {max(args.sizes)} items"] = ratio <= args.max_slowdown
+
+    report["failures"] = [name for name, passed in checks.items() if not passed]
+    print(json.dumps(report, indent=2))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Result rendering: escaping templates and JSON mode vs. the old f-string renderer.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 200, 1000], help="Questions/skills per result")
+    parser.add_argument("--repeat", type=int, default=500, help="Calls per round at 10 items, scaled down for larger results")
+    parser.add_argument("--max-slowdown", type=float, default=2.0, help="Fail if escaping costs more than this factor")
+    sys.exit(main(parser.parse_args()))
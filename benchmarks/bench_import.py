@@ -0,0 +1,96 @@
+# bench_import.py
+# Cold-start benchmark: how long a fresh worker takes to `import app`, measured with `python -X importtime`
+# in a new interpreter per run. Prints JSON; pass --baseline to fail when startup regresses.
+#
+#   python benchmarks/bench_import.py --runs 5 --output import.json
+#   python benchmarks/bench_import.py --baseline benchmarks/import_baseline.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported by `import app`; they load lazily or in the lifespan warm-up (utility/warmup.py)
+HEAVY_MODULES = ["langchain", "langchain_core", "langchain_groq", "PyPDF2", "docx", "lxml", "pandas", "numpy"]
+
+PROBE = (
+    "import json, sys; import app; "
+    f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+)
+
+
+def parse_importtime(stderr: str):
+    # Lines look like "import time:   self [us] | cumulative | package"; nesting is shown by indentation
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once():
+    env = dict(os.environ, GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "benchmark-key"))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    eager = json.loads(completed.stdout.strip().splitlines()[-1])
+    return parse_importtime(completed.stderr), eager
+
+
+def main(args):
+    totals, eager = [], []
+    last_modules = {}
+    for _ in range(args.runs):
+        last_modules, eager = run_once()
+        totals.append(last_modules["app"][1] / 1000)
+
+    slowest = sorted(last_modules.items(), key=lambda item: item[1][0], reverse=True)[: args.top]
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_app_ms": {
+            "median": round(statistics.median(totals), 1),
+            "min": round(min(totals), 1),
+            "max": round(max(totals), 1),
+        },
+        "modules_imported": len(last_modules),
+        "eager_heavy_modules": eager,
+        "slowest_self_ms": [{"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+                            for name, (self_us, cumulative_us) in slowest],
+    }
+
+    failures = []
+    if eager:
+        failures.append(f"heavy modules imported at startup: {', '.join(eager)}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        limit = baseline["import_app_ms"]["median"] * (1 + args.max_regression)
+        report["baseline_median_ms"] = baseline["import_app_ms"]["median"]
+        if report["import_app_ms"]["median"] > limit:
+            failures.append(f"median import time {report['import_app_ms']['median']} ms is over {limit:.1f} ms "
+                            f"(baseline {baseline['import_app_ms']['median']} ms + {args.max_regression:.0%})")
+    report["failures"] = failures
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure `import app` cold-start time with python -X importtime.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest modules to list")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="Report from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown over the baseline median (0.25 = 25%%)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,167 @@
+# bench_incremental.py
+# Incremental re-analysis (utility/incremental.py): one session resubmits edited versions of a generated
+# resume (or the posting changes its skill list), through routes.analyze.run_analysis with a fake LLM that counts the prompt
+# tokens it is sent. Reports, per resubmission, how it was answered (full, reused, updated), the prompt
+# tokens a full analysis would have sent and the tokens actually sent. Checks:
+#   mode       - every edit gets the expected treatment (a rewrite still gets a full analysis)
+#   merge      - kept questions survive, regenerated keys are swapped in, the skill match is the local one
+#   reduction  - a one-entry edit sends at most --max-sent-share of the full prompt
+# Prints JSON; exits non-zero if a check fails.
+#
+#   python benchmarks/bench_incremental.py --pages 3
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+os.environ.setdefault("LOG_LEVEL", "WARNING") # Keep the app's JSON logs out of the report on stdout
+
+from benchmarks.corpus import resume_lines
+from benchmarks.stubs import StubMessage
+from routes.analyze import run_analysis
+from utility.compact import count_tokens
+from utility.incremental import incremental_stats, new_session_token
+from utility.skills import match_skills
+from utility.timing import StageTimer
+
+JOB = {"role": "Platform Engineer", "description": "Run the Python services and the Helm charts they deploy with.",
+       "skills": ["Python", "Docker", "AWS", "Linux", "Terraform", "Helm"]}
+# Most of its skills are missing, so the verdict is "No" and edits revise the reasons and suggestions
+GAP_JOB = {"role": "Infrastructure Engineer", "description": "Automate the fleet with configuration management.",
+           "skills": ["Python", "Helm", "Ansible", "Pulumi", "Nomad"]}
+FULL_REPLY = {
+    "Interview Questions": [{"Question": f"How do you use {skill} in production?", "Answer": f"A concise answer about {skill}."}
+                            for skill in ("Python", "Docker", "AWS", "Linux", "Terraform")],
+    "Behavioral Questions": ["Tell me about a migration you led.", "Describe a production incident you handled."],
+    "Reasons for Unsuitability": ["No evidence of Helm."],
+    "Suggestions": ["Package a service as a Helm chart and describe it on your resume."],
+}
+
+
+class CountingLLM:
+    # Full analysis prompts get FULL_REPLY; update prompts get just the keys they ask for, tagged with the call
+    model_name = "bench"
+
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.prompts.append(count_tokens(prompt))
+        if "### KEYS TO REGENERATE:" not in prompt:
+            return StubMessage(json.dumps(FULL_REPLY))
+        wanted = prompt.split("### KEYS TO REGENERATE:")[1]
+        reply = {}
+        if '"Interview Questions"' in wanted:
+            count = int(wanted.split('"Interview Questions": ')[1].split()[0])
+            reply["Interview Questions"] = [{"Question": f"Updated question {len(self.prompts)}.{i}?", "Answer": "An answer."} for i in range(count)]
+        for key in ("Behavioral Questions", "Reasons for Unsuitability", "Suggestions"):
+            if f'"{key}"' in wanted:
+                reply[key] = [f"Updated {key.lower()} {len(self.prompts)}.{i}" for i in range(2)]
+        return StubMessage(json.dumps(reply))
+
+
+def base_resume(pages):
+    lines = resume_lines(pages)
+    # A fixed skills line so the edits below decide what matches
+    lines[lines.index("Skills") + 1] = "Python, Docker, AWS, Linux, Terraform, PostgreSQL"
+    return lines
+
+
+def edit_bullet(lines):
+    lines = list(lines)
+    index = next(i for i, line in enumerate(lines) if line.startswith("- "))
+    lines[index] = "- Cut p99 latency of the billing API by 40% by batching database writes."
+    return lines
+
+
+def add_skill(lines, skill):
+    lines = list(lines)
+    index = lines.index("Skills") + 1
+    lines[index] += f", {skill}"
+    return lines
+
+
+def rewrite(lines):
+    return [line.replace("Built", "Designed and shipped").replace("serving", "handling") if line.startswith("- ") else line for line in lines]
+
+
+def scenarios(pages):
+    # (session, name, resume lines, job, expected mode); each step resubmits in its session after the one before
+    base = base_resume(pages)
+    edited = edit_bullet(base)
+    with_helm = add_skill(edited, "Helm")
+    has_skill = dict(JOB, skills=JOB["skills"] + ["PostgreSQL"])
+    lacks_skill = dict(has_skill, skills=has_skill["skills"] + ["Ansible"])
+    return [
+        ("match", "first submission", base, JOB, None),
+        ("match", "re-export, whitespace only", [line + "  " for line in base], JOB, "reused"),
+        ("match", "one experience bullet edited", edited, JOB, "updated"),
+        ("match", "skill added (Helm now matched)", with_helm, JOB, "updated"),
+        ("match", "posting adds a skill the candidate has", with_helm, has_skill, "updated"),
+        ("match", "posting adds a skill the candidate lacks", with_helm, lacks_skill, "reused"),
+        ("match", "most bullets rewritten", rewrite(with_helm), lacks_skill, "full"),
+        ("gap", "first submission (No)", base, GAP_JOB, None),
+        ("gap", "one experience bullet edited (No)", edited, GAP_JOB, "updated"),
+    ]
+
+
+async def run(args):
+    llm = CountingLLM()
+    report = {"pages": args.pages, "resubmissions": [], "checks": {}}
+    checks = report["checks"]
+    previous = {}
+    tokens = {} # Session -> the token the server issued for it, as a client would keep it
+    for session, name, lines, job, expected in scenarios(args.pages):
+        resume = "\n".join(lines)
+        timer = StageTimer()
+        calls = len(llm.prompts)
+        result = await run_analysis(resume, None, job, llm, timer=timer, session_token=tokens.setdefault(session, new_session_token()))
+        sent = sum(llm.prompts[calls:])
+        mode = next((mode for mode in ("updated", "reused", "full") if timer.counters.get(f"incremental_{mode}")), None)
+        saved = timer.counters.get("tokens_saved_incremental", 0)
+        entry = {"name": name, "mode": mode, "llm_calls": len(llm.prompts) - calls, "sent_tokens": sent, "tokens_saved": saved}
+        if expected is not None:
+            full = sent + saved
+            entry["full_prompt_tokens"] = full
+            entry["reduction"] = round(1 - sent / full, 3) if full else 0.0
+            checks[f"{name}: {expected}"] = mode == expected
+
+        local = match_skills(job["skills"], resume_text=resume)
+        checks[f"{name}: local skill match"] = (result["Matched Skills"], result["Skill Match Percentage"]) == (local["Matched Skills"], local["Skill Match Percentage"])
+        if mode == "updated" and result["Suitability"] == "Yes":
+            earlier = {item["Question"] for item in previous[session]["Interview Questions"]}
+            questions = [item["Question"] for item in result["Interview Questions"]]
+            new = [question for question in questions if question not in earlier]
+            entry["kept_questions"], entry["new_questions"] = len(questions) - len(new), len(new)
+            # Anything not carried over has to come from this update call
+            checks[f"{name}: kept questions carried over"] = bool(earlier & set(questions)) and all(question.startswith("Updated") for question in new)
+        elif mode == "updated":
+            checks[f"{name}: reasons and suggestions revised"] = all(item.startswith("Updated") for item in result["Reasons for Unsuitability"] + result["Suggestions"])
+        report["resubmissions"].append(entry)
+        previous[session] = result
+
+    steps = {entry["name"]: entry for entry in report["resubmissions"]}
+    bullet = steps["one experience bullet edited"]
+    checks[f"one-entry edit sends at most {args.max_sent_share:.0%} of the full prompt"] = bullet["sent_tokens"] <= args.max_sent_share * bullet["full_prompt_tokens"]
+    checks["Helm gets new questions"] = steps["skill added (Helm now matched)"].get("new_questions", 0) >= 1
+    checks["PostgreSQL gets a new question"] = steps["posting adds a skill the candidate has"].get("new_questions", 0) >= 1
+    checks["reused results make no LLM call"] = all(entry["llm_calls"] == 0 for entry in report["resubmissions"] if entry["mode"] == "reused")
+    report["totals"] = incremental_stats()
+    report["failures"] = [name for name, passed in checks.items() if not passed]
+    return report
+
+
+def main(args):
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt tokens per resubmission with incremental re-analysis.")
+    parser.add_argument("--pages", type=int, default=3, help="Resume length in pages")
+    parser.add_argument("--max-sent-share", type=float, default=0.5, help="Fail if a one-entry edit sends more than this share of the full prompt")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+# bench_prompts.py
+# Prompt construction micro-benchmark, plus a check that every prompt type starts with a byte-identical
+# static prefix (what lets the provider cache it). Prints JSON; exits non-zero if a prefix differs.
+#
+#   python benchmarks/bench_prompts.py --iterations 2000
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompts.posting import JOB_EXTRACTION_PROMPT
+from prompts.resume import RESUME_ANALYSIS_PROMPT, build_resume_analysis_prompt
+from prompts.portfolio import PORTFOLIO_ANALYSIS_PROMPT, build_portfolio_analysis_prompt
+from prompts.combined import COMBINED_ANALYSIS_PROMPT, build_combined_analysis_prompt
+from utility.compact import count_tokens
+from utility.skills import match_skills
+
+JOBS = [
+    {"role": "Backend Engineer", "skills": ["Python", "FastAPI", "PostgreSQL", "Docker"], "description": "Build Python APIs."},
+    {"role": "Data Analyst", "skills": ["SQL", "Tableau", "Pandas"], "description": "Turn data into {insights}."},
+]
+RESUMES = [
+    "Jane Doe\nSkills\nPython, FastAPI, Docker, AWS\nExperience\nBuilt REST APIs for 5 years.\n" * 20,
+    "John Roe\nSkills\nExcel, SQL {curly braces stay literal}\nEducation\nBSc Statistics\n" * 20,
+]
+PORTFOLIOS = ["Python, FastAPI, Docker", "SQL, Tableau"]
+PAGES = ["Backend Engineer\nRequirements: Python, FastAPI\n" * 30, "Data Analyst\nYou'll need SQL and Tableau\n" * 30]
+# Skill matching is measured elsewhere; precompute it so only prompt construction is timed
+MATCHES = [match_skills(job["skills"], resume_text=resume, portfolio_skills=portfolio) for job, resume, portfolio in zip(JOBS, RESUMES, PORTFOLIOS)]
+
+# name -> (compiled prompt, build(i) for input set i)
+BUILDERS = {
+    "job_extraction": (JOB_EXTRACTION_PROMPT, lambda i: JOB_EXTRACTION_PROMPT.format(page_data=PAGES[i])),
+    "resume_analysis": (RESUME_ANALYSIS_PROMPT, lambda i: build_resume_analysis_prompt(RESUMES[i], JOBS[i], MATCHES[i])),
+    "portfolio_analysis": (PORTFOLIO_ANALYSIS_PROMPT, lambda i: build_portfolio_analysis_prompt(PORTFOLIOS[i], JOBS[i], MATCHES[i])),
+    "combined_analysis": (COMBINED_ANALYSIS_PROMPT, lambda i: build_combined_analysis_prompt(RESUMES[i], PORTFOLIOS[i], JOBS[i], MATCHES[i])),
+}
+
+
+def time_per_call_us(func, iterations):
+    start = time.perf_counter()
+    for n in range(iterations):
+        func(n % 2)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def legacy_builder(prompt, build_values):
+    # The old way: a langchain PromptTemplate rebuilt from the full text on every call
+    try:
+        from langchain.prompts import PromptTemplate
+    except ImportError:
+        return None
+    source = prompt.prefix.replace("{", "{{").replace("}", "}}") + prompt.template
+    return lambda i: PromptTemplate.from_template(source).format(**build_values(i))
+
+
+def template_values(name, i):
+    job = JOBS[i]
+    values = {"job_role": job["role"], "job_skills": job["skills"], "job_desc_text": job["description"],
+              "resume_text": RESUMES[i], "candidate_skills": PORTFOLIOS[i], "candidate_portfolio_skills": PORTFOLIOS[i],
+              "page_data": PAGES[i], "skill_match_block": ""}
+    return {field: values[field] for field in BUILDERS[name][0].fields}
+
+
+def main(args):
+    report = {"iterations": args.iterations, "prompts": {}, "failures": []}
+    for name, (prompt, build) in BUILDERS.items():
+        first, second = build(0), build(1)
+        prefix = prompt.prefix.encode("utf-8")
+        identical = first.encode("utf-8").startswith(prefix) and second.encode("utf-8").startswith(prefix)
+        if not identical:
+            report["failures"].append(f"{name}: prompts don't start with the shared static prefix")
+
+        legacy = legacy_builder(prompt, lambda i, name=name: template_values(name, i))
+        entry = {
+            "prefix_identical": identical,
+            "prefix_bytes": len(prefix),
+            "prefix_tokens": count_tokens(prompt.prefix),
+            "prompt_tokens": count_tokens(first),
+            "static_share": round(count_tokens(prompt.prefix) / count_tokens(first), 3),
+            "build_us": round(time_per_call_us(build, args.iterations), 2),
+        }
+        if legacy is not None:
+            entry["legacy_prompttemplate_us"] = round(time_per_call_us(legacy, max(1, args.iterations // 10)), 2)
+        report["prompts"][name] = entry
+
+    print(json.dumps(report, indent=2))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt construction cost and static-prefix check.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    sys.exit(main(parser.parse_args()))
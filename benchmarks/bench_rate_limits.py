@@ -0,0 +1,128 @@
+# bench_rate_limits.py
+# Exercises the per-model LLM scheduler (utility/llm_scheduler.py) against the fake Groq transport with
+# its rate limiting switched on. Three scenarios, each with pass/fail checks:
+#   provider_backoff  - the provider's limit is tighter than ours: 429s are retried after retry-after
+#   priorities        - interactive calls are admitted ahead of batch calls queued earlier
+#   deadline          - calls that can't get a slot in time are rejected early with a 429
+# Prints JSON; exits non-zero if a check fails.
+#
+#   python benchmarks/bench_rate_limits.py
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+
+from fastapi import HTTPException
+import utility.llm_scheduler
+from benchmarks.stubs import stub_reply, fake_chat_transport
+from utility.llm_pool import LLMRegistry
+from utility.llm_scheduler import INTERACTIVE, BATCH
+
+MODEL = "llama-3.1-8b-instant"
+PROMPT = "Analyze the resume content against the job posting details. Resume: Python, FastAPI, Docker."
+
+
+async def call(llm, stream=False):
+    # Returns (ok, seconds, status)
+    started = time.perf_counter()
+    try:
+        if stream:
+            async for _ in llm.astream(PROMPT):
+                pass
+        else:
+            await llm.ainvoke(PROMPT)
+        return True, time.perf_counter() - started, 200
+    except HTTPException as e:
+        return False, time.perf_counter() - started, e.status_code
+
+
+async def provider_backoff(args):
+    transport = fake_chat_transport(stub_reply, latency=0.02, rate_limit=args.provider_limit, window=1.0)
+    registry = LLMRegistry(api_key="benchmark-key", async_transport=transport, rpm=0, tpm=0)
+    llm = registry.get(MODEL)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(call(llm, stream=i % 4 == 0) for i in range(args.calls)))
+    elapsed = time.perf_counter() - started
+    stats = registry.scheduler(MODEL).snapshot()
+    await registry.aclose()
+    ok = sum(result[0] for result in results)
+    report = {"calls": args.calls, "ok": ok, "provider_429s": transport.rejected, "seconds": round(elapsed, 2), "scheduler": stats}
+    checks = {
+        "every call succeeded": ok == args.calls,
+        "provider limit was hit and retried": transport.rejected > 0 and stats["retries"] > 0,
+    }
+    return report, checks
+
+
+async def priorities(args):
+    transport = fake_chat_transport(stub_reply, latency=0.05)
+    registry = LLMRegistry(api_key="benchmark-key", async_transport=transport, rpm=0, tpm=0, max_concurrency=2)
+    finished = []
+
+    async def tracked(priority):
+        ok, seconds, _ = await call(registry.get(MODEL, priority=priority))
+        finished.append(priority)
+        return priority, seconds
+
+    # Batch work is queued first; interactive calls arrive right behind it
+    batch = [asyncio.ensure_future(tracked(BATCH)) for _ in range(args.calls)]
+    await asyncio.sleep(0)
+    interactive = [asyncio.ensure_future(tracked(INTERACTIVE)) for _ in range(args.calls // 4)]
+    results = await asyncio.gather(*batch, *interactive)
+    await registry.aclose()
+
+    mean = lambda priority: sum(s for p, s in results if p == priority) / sum(1 for p, _ in results if p == priority)
+    # Where the last interactive call finished in the overall completion order
+    last_interactive = max(i for i, priority in enumerate(finished) if priority == INTERACTIVE)
+    report = {"batch_calls": len(batch), "interactive_calls": len(interactive),
+              "interactive_mean_s": round(mean(INTERACTIVE), 3), "batch_mean_s": round(mean(BATCH), 3),
+              "last_interactive_position": last_interactive}
+    checks = {
+        "interactive waits less than batch": mean(INTERACTIVE) < mean(BATCH),
+        # Only the batch calls already holding the two slots can finish before the interactive ones
+        "interactive calls overtake queued batch calls": last_interactive < len(interactive) + 2,
+    }
+    return report, checks
+
+
+async def deadline(args):
+    utility.llm_scheduler.LLM_QUEUE_DEADLINE = args.deadline
+    transport = fake_chat_transport(stub_reply, latency=0.02)
+    registry = LLMRegistry(api_key="benchmark-key", async_transport=transport, rpm=args.rpm, tpm=0)
+    results = await asyncio.gather(*(call(registry.get(MODEL)) for _ in range(args.calls)))
+    await registry.aclose()
+    rejected = [seconds for ok, seconds, status in results if status == 429]
+    ok = sum(result[0] for result in results)
+    report = {"calls": args.calls, "rpm": args.rpm, "deadline_s": args.deadline, "ok": ok, "rejected_429": len(rejected),
+              "slowest_rejection_s": round(max(rejected), 3) if rejected else None, "provider_429s": transport.rejected}
+    checks = {
+        "admitted calls stay within the rpm burst": ok <= args.rpm + 1,
+        "the rest are rejected with 429": ok + len(rejected) == args.calls and len(rejected) > 0,
+        "rejections are early, not after the deadline": bool(rejected) and max(rejected) < args.deadline / 2,
+    }
+    return report, checks
+
+
+async def main(args):
+    report = {"scenarios": {}, "failures": []}
+    for name, scenario in (("provider_backoff", provider_backoff), ("priorities", priorities), ("deadline", deadline)):
+        result, checks = await scenario(args)
+        result["checks"] = checks
+        report["scenarios"][name] = result
+        report["failures"] += [f"{name}: {check}" for check, passed in checks.items() if not passed]
+    print(json.dumps(report, indent=2))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM scheduler checks against a rate-limiting fake provider.")
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--provider-limit", type=int, default=10, help="Requests per second the fake provider accepts")
+    parser.add_argument("--rpm", type=int, default=10, help="Scheduler budget for the deadline scenario")
+    parser.add_argument("--deadline", type=float, default=2.0, help="Interactive queue deadline for the deadline scenario")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,88 @@
+# bench_tracing.py
+# Overhead of the always-on instrumentation (utility/observability.py): cost of one span, of a
+# histogram observation, of rendering /metrics, and of the request middleware on a trivial endpoint.
+# Prints JSON; exits non-zero if the per-request overhead is over --max-overhead-us.
+#
+#   python benchmarks/bench_tracing.py
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+
+import httpx
+from fastapi import FastAPI
+from utility.observability import RequestContextMiddleware, STAGE_SECONDS, Trace, current_trace, logger, render_metrics, span
+
+
+def per_call_us(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def one_span():
+    with span("bench"):
+        pass
+
+
+def make_app(instrumented):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if instrumented:
+        app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+async def request_us(app, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50): # Warm up
+            await client.get("/ping")
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/ping")
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+def main(args):
+    # Access logs are formatted as usual but written to /dev/null instead of the terminal
+    for handler in logger.handlers:
+        handler.setStream(open(os.devnull, "w"))
+    token = current_trace.set(Trace("bench"))
+    span_us = per_call_us(one_span, args.iterations)
+    current_trace.reset(token)
+    observe_us = per_call_us(lambda: STAGE_SECONDS.observe(0.123, stage="bench"), args.iterations)
+    render_ms = per_call_us(render_metrics, 100) / 1000
+
+    plain = asyncio.run(request_us(make_app(False), args.requests))
+    instrumented = asyncio.run(request_us(make_app(True), args.requests))
+    report = {
+        "span_us": round(span_us, 2),
+        "histogram_observe_us": round(observe_us, 2),
+        "render_metrics_ms": round(render_ms, 3),
+        "request_us": {"plain": round(plain, 1), "instrumented": round(instrumented, 1)},
+        "middleware_overhead_us": round(instrumented - plain, 1),
+        "failures": [],
+    }
+    if instrumented - plain > args.max_overhead_us:
+        report["failures"].append(f"middleware adds {instrumented - plain:.0f} us per request (limit {args.max_overhead_us} us)")
+    print(json.dumps(report, indent=2))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overhead of request tracing and metrics.")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-overhead-us", type=float, default=200)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,128 @@
+# corpus.py
+# Fixture corpus for the end-to-end benchmark: recorded job-posting pages (fixtures/postings/*.html, with
+# the extraction the fake LLM returns for each in the matching .json), plus deterministic generators for
+# PDF/DOCX resumes and portfolio CSVs of different sizes. Documents are generated, not checked in, so a
+# `salt` can make every request's document distinct (and so miss the caches).
+import glob
+import io
+import json
+import os
+import random
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SKILLS = ["Python", "FastAPI", "Django", "PostgreSQL", "SQL", "AWS", "Docker", "Kubernetes", "Terraform", "Go",
+          "React", "TypeScript", "Tableau", "Pandas", "Snowflake", "Kafka", "Redis", "Linux", "GitHub Actions", "Grafana"]
+# pages per resume / rows per portfolio
+RESUME_SIZES = {"small": 1, "medium": 3, "large": 10}
+PORTFOLIO_SIZES = {"small": 20, "medium": 500, "large": 5000}
+
+ANALYSIS_REPLY = {
+    "Suitability": "Yes",
+    "Skill Match Percentage": 82,
+    "Matched Skills": ["Python", "FastAPI", "PostgreSQL", "Docker", "AWS"],
+    "Interview Questions": [{"Question": f"Technical question {i} about the role's stack?", "Answer": f"A concise answer {i}."} for i in range(5)],
+    "Behavioral Questions": ["Tell me about a production incident you led.", "Describe a time you changed a teammate's mind."],
+}
+
+
+def load_postings():
+    # name -> (html, extraction dict)
+    postings = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "postings", "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        with open(path[:-5] + ".json", encoding="utf-8") as f:
+            postings[name] = (html, json.load(f))
+    return postings
+
+
+def make_fake_reply(postings):
+    # Deterministic fake LLM: the posting's recorded extraction for extraction prompts, a canned analysis otherwise
+    extractions = [job for _, job in postings.values()]
+    posting_reply = json.dumps(extractions[0])
+    analysis_reply = json.dumps(ANALYSIS_REPLY)
+
+    def reply(prompt, model=None):
+        if "job posting page" not in prompt:
+            return analysis_reply
+        for job in extractions:
+            if job["role"] in prompt:
+                return json.dumps(job)
+        return posting_reply
+    return reply
+
+
+def resume_lines(pages: int, salt: str = "", seed: int = 7):
+    rng = random.Random(seed)
+    lines = ["Alex Example", "alex@example.com | Berlin", "", "Summary",
+             "Backend engineer with eight years of experience building data-heavy web services.", "",
+             "Skills", ", ".join(rng.sample(SKILLS, 10)), "", "Experience"]
+    while len(lines) < pages * 45:
+        company = rng.randint(1, 99)
+        lines += [f"Senior Engineer, Company {company} ({2010 + company % 14} - present)"]
+        lines += [f"- Built {rng.choice(['an ingestion pipeline', 'a billing API', 'a search service', 'internal tooling'])} "
+                  f"with {rng.choice(SKILLS)} and {rng.choice(SKILLS)}, serving {rng.randint(2, 900)}k requests a day."
+                  for _ in range(6)]
+        lines.append("")
+    lines += ["Education", "BSc Computer Science, Example University"]
+    if salt:
+        lines.append(f"Reference {salt}")
+    return lines
+
+
+def _pdf_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(lines, lines_per_page: int = 45) -> bytes:
+    # Minimal text PDF (Helvetica, one content stream per page) that PyPDF2 can extract
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for index, page_lines in enumerate(pages):
+        page_id, content_id = 4 + index * 2, 5 + index * 2
+        kids.append(f"{page_id} 0 R")
+        text = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(f"({_pdf_text(line)}) Tj T*" for line in page_lines) + " ET"
+        stream = text.encode("latin-1", "replace")
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> "
+                            f"/Contents {content_id} 0 R >>").encode()
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = out.tell()
+        out.write(b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for number in sorted(objects):
+        out.write(b"%010d 00000 n \n" % offsets[number])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(lines) -> bytes:
+    import docx
+    document = docx.Document()
+    for line in lines:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_portfolio(rows: int, salt: str = "", seed: int = 11) -> bytes:
+    rng = random.Random(seed)
+    lines = ["Project,Technology,Year"]
+    lines += [f"Project {i},{rng.choice(SKILLS)},{2015 + i % 10}" for i in range(rows)]
+    if salt:
+        lines.append(f"Side project,Tool {salt},2025")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def make_resume(kind: str, size: str, salt: str = "") -> bytes:
+    lines = resume_lines(RESUME_SIZES[size], salt)
+    return make_pdf(lines) if kind == "pdf" else make_docx(lines)
@@ -0,0 +1,198 @@
+# resp_server.py
+# Local stand-in for Redis, speaking enough of RESP2 for utility/resp.py: PING, ECHO, AUTH, SELECT,
+# GET, SET (EX/PX/NX/XX), MGET, DEL, EXISTS, EXPIRE, TTL, INCR/INCRBY, SCAN, DBSIZE, FLUSHDB, QUIT.
+# Used to run the job store and shared-cache backends offline. Not a database: everything is in memory.
+# --maxmemory evicts least recently used keys like Redis' allkeys-lru (sizes are key + value bytes).
+#
+#   python benchmarks/resp_server.py --port 6390 --maxmemory 67108864
+#   JOB_BACKEND=redis JOB_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn app:app
+import argparse
+import fnmatch
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def simple(text):
+    return b"+%s\r\n" % text.encode()
+
+
+def error(text):
+    return b"-%s\r\n" % text.encode()
+
+
+def integer(value):
+    return b":%d\r\n" % value
+
+
+def bulk(value):
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class Store:
+    def __init__(self, maxmemory=0):
+        self.dbs = {}
+        self.lock = threading.Lock()
+        self.maxmemory = maxmemory
+        self.used = 0
+        self.evicted = 0
+
+    def db(self, index):
+        return self.dbs.setdefault(index, OrderedDict())
+
+    def live(self, data, key):
+        # (value, expires_at) or None, dropping the key if it has expired
+        entry = data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self.remove(data, key)
+            return None
+        data.move_to_end(key)
+        return entry
+
+    def put(self, data, key, value, expires_at):
+        self.remove(data, key)
+        data[key] = (value, expires_at)
+        self.used += len(key) + len(value)
+        while self.maxmemory and self.used > self.maxmemory and data:
+            self.remove(data, next(iter(data)))
+            self.evicted += 1
+
+    def remove(self, data, key):
+        entry = data.pop(key, None)
+        if entry is not None:
+            self.used -= len(key) + len(entry[0])
+        return entry
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.db_index = 0
+        while True:
+            try:
+                args = self.read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            with self.server.store.lock:
+                reply = self.dispatch(name, args[1:])
+            self.wfile.write(reply)
+            if name == "QUIT":
+                return
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"): # Inline command, e.g. from telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def dispatch(self, name, args):
+        store = self.server.store
+        data = store.db(self.db_index)
+        if name == "PING":
+            return bulk(args[0]) if args else simple("PONG")
+        if name == "ECHO":
+            return bulk(args[0])
+        if name == "QUIT":
+            return simple("OK")
+        if name == "AUTH":
+            return simple("OK") if self.server.password in (None, args[-1].decode()) else error("WRONGPASS invalid password")
+        if name == "SELECT":
+            self.db_index = int(args[0])
+            return simple("OK")
+        if name == "GET":
+            entry = store.live(data, args[0])
+            return bulk(entry[0] if entry else None)
+        if name == "MGET":
+            return b"*%d\r\n" % len(args) + b"".join(bulk((store.live(data, key) or (None,))[0]) for key in args)
+        if name == "SET":
+            key, value, options = args[0], args[1], [arg.decode().upper() for arg in args[2:]]
+            expires_at = None
+            if "EX" in options:
+                expires_at = time.time() + int(options[options.index("EX") + 1])
+            if "PX" in options:
+                expires_at = time.time() + int(options[options.index("PX") + 1]) / 1000
+            exists = store.live(data, key) is not None
+            if ("NX" in options and exists) or ("XX" in options and not exists):
+                return bulk(None)
+            store.put(data, key, value, expires_at)
+            return simple("OK")
+        if name == "DEL":
+            return integer(sum(store.remove(data, key) is not None for key in args))
+        if name == "EXISTS":
+            return integer(sum(store.live(data, key) is not None for key in args))
+        if name == "EXPIRE":
+            entry = store.live(data, args[0])
+            if entry is None:
+                return integer(0)
+            data[args[0]] = (entry[0], time.time() + int(args[1]))
+            return integer(1)
+        if name == "TTL":
+            entry = store.live(data, args[0])
+            if entry is None:
+                return integer(-2)
+            return integer(-1 if entry[1] is None else int(entry[1] - time.time()))
+        if name in ("INCR", "INCRBY"):
+            entry = store.live(data, args[0])
+            try:
+                value = int(entry[0] if entry else 0) + (int(args[1]) if name == "INCRBY" else 1)
+            except ValueError:
+                return error("ERR value is not an integer or out of range")
+            store.put(data, args[0], str(value).encode(), entry[1] if entry else None)
+            return integer(value)
+        if name == "DBSIZE":
+            return integer(sum(store.live(data, key) is not None for key in list(data)))
+        if name == "SCAN":
+            # Whole keyspace in one pass (cursor 0 back), which is a valid SCAN answer
+            options = [arg.decode() for arg in args[1:]]
+            upper = [option.upper() for option in options]
+            pattern = options[upper.index("MATCH") + 1] if "MATCH" in upper else "*"
+            keys = [key for key in list(data) if fnmatch.fnmatchcase(key.decode("utf-8", "replace"), pattern) and store.live(data, key)]
+            return b"*2\r\n" + bulk(b"0") + b"*%d\r\n" % len(keys) + b"".join(bulk(key) for key in keys)
+        if name == "FLUSHDB":
+            for key in list(data):
+                store.remove(data, key)
+            return simple("OK")
+        return error(f"ERR unknown command '{name}'")
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, password=None, maxmemory=0):
+        super().__init__(address, Handler)
+        self.store = Store(maxmemory)
+        self.password = password
+
+
+def start_server(host="127.0.0.1", port=0, password=None, maxmemory=0):
+    # Starts in a background thread; returns (server, url)
+    server = RespServer((host, port), password, maxmemory)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    auth = f":{password}@" if password else ""
+    return server, f"redis://{auth}{host}:{server.server_address[1]}/0"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory Redis stand-in for offline runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--password")
+    parser.add_argument("--maxmemory", type=int, default=0, help="Bytes of keys + values before LRU eviction, 0 for no limit")
+    args = parser.parse_args()
+    server = RespServer((args.host, args.port), args.password, args.maxmemory)
+    print(f"Listening on redis://{args.host}:{args.port}/0", file=sys.stderr)
+    server.serve_forever()
@@ -0,0 +1,140 @@
+# stubs.py
+# Offline stand-ins for the Groq model and the job-page fetch, shared by the benchmarks
+import asyncio
+import json
+import time
+import httpx
+from collections import deque
+
+JOB_JSON = {
+    "role": "Backend Engineer",
+    "skills": ["Python", "FastAPI", "PostgreSQL", "Docker", "AWS"],
+    "description": "Build and operate Python APIs on AWS.",
+}
+
+ANALYSIS_JSON = {
+    "Suitability": "Yes",
+    "Skill Match Percentage": 80,
+    "Matched Skills": ["Python", "FastAPI", "PostgreSQL", "Docker"],
+    "Interview Questions": [{"Question": "What is FastAPI?", "Answer": "An ASGI web framework."}],
+    "Behavioral Questions": ["Tell me about a hard bug you fixed."],
+}
+
+PAGE_TEXT = "Backend Engineer\nWe need Python, FastAPI, PostgreSQL, Docker and AWS experience."
+
+
+def stub_reply(prompt, model=None):
+    # Canned JSON: job extraction for the posting prompt, an analysis for everything else
+    if "job posting page" in str(prompt):
+        return json.dumps(JOB_JSON)
+    return json.dumps(ANALYSIS_JSON)
+
+
+class StubMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubLLM:
+    # Mimics the bits of ChatGroq the prompts modules use, with a fixed per-call latency
+    def __init__(self, latency=0.5, model_name="stub"):
+        self.latency = latency
+        self.model_name = model_name
+        self.calls = 0
+
+    def _reply(self, prompt):
+        self.calls += 1
+        return StubMessage(stub_reply(prompt, self.model_name))
+
+    def invoke(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        return self._reply(prompt)
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._reply(prompt)
+
+
+def make_fetch_stub(latency=0.2, text=PAGE_TEXT):
+    async def fetch_page_text(url):
+        await asyncio.sleep(latency)
+        return text
+    return fetch_page_text
+
+
+def make_portfolio_csv(rows=20, unique=None):
+    # unique: extra technology that makes the document (and so the analysis cache key) distinct
+    lines = ["Project,Technology"]
+    techs = ["Python", "FastAPI", "PostgreSQL", "Docker", "React", "Go"]
+    for i in range(rows):
+        lines.append(f"Project {i},{techs[i % len(techs)]}")
+    if unique is not None:
+        lines.append(f"Side project,Tool {unique}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def chat_completion_payload(content: str, model: str = "fake", prompt_tokens: int = 0) -> dict:
+    # Minimal OpenAI/Groq-style chat completion body (token usage estimated at ~4 characters a token)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4, "total_tokens": prompt_tokens + len(content) // 4},
+    }
+
+
+def chat_completion_stream(content: str, model: str = "fake", chunk_size: int = 16) -> bytes:
+    # The same reply as server-sent chat.completion.chunk events, a few characters per chunk
+    events = []
+    for start in range(0, len(content), chunk_size):
+        delta = {"role": "assistant", "content": content[start:start + chunk_size]}
+        events.append({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+    events.append({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                   "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    lines = [f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"]
+    return "".join(lines).encode()
+
+
+def rate_limit_response(retry_after: float) -> httpx.Response:
+    # What Groq sends when a budget is exhausted
+    error = {"error": {"message": f"Rate limit reached. Please try again in {retry_after:.2f}s.",
+                       "type": "requests", "code": "rate_limit_exceeded"}}
+    return httpx.Response(429, json=error, headers={"retry-after": f"{retry_after:.2f}",
+                                                    "x-ratelimit-reset-requests": f"{retry_after:.2f}s"})
+
+
+def fake_chat_transport(reply, latency: float = 0.0, rate_limit: int = 0, window: float = 60.0) -> httpx.MockTransport:
+    # Offline Groq: reply(prompt_text, model) -> assistant content. Handles streaming requests too.
+    # With latency > 0 the handler sleeps asynchronously, so only use it as an async_transport.
+    # rate_limit > 0 allows that many requests per sliding `window` seconds and answers the rest with
+    # a 429 and retry-after, like the real API. transport.rejected counts them.
+    accepted = deque()
+
+    def respond(request: httpx.Request):
+        if rate_limit:
+            now = time.monotonic()
+            while accepted and accepted[0] <= now - window:
+                accepted.popleft()
+            if len(accepted) >= rate_limit:
+                transport.rejected += 1
+                return rate_limit_response(accepted[0] + window - now)
+            accepted.append(now)
+        body = json.loads(request.content or b"{}")
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        model = body.get("model", "fake")
+        content = reply(prompt, model)
+        if body.get("stream"):
+            return httpx.Response(200, content=chat_completion_stream(content, model),
+                                  headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json=chat_completion_payload(content, model, len(prompt) // 4))
+
+    async def delayed(request: httpx.Request):
+        await asyncio.sleep(latency)
+        return respond(request)
+
+    transport = httpx.MockTransport(delayed if latency else respond)
+    transport.rejected = 0
+    return transport
@@ -1,55 +1,18 @@
 # combined.py
-from langchain.prompts import PromptTemplate
-from fastapi import HTTPException, UploadFile
-from io import StringIO
-# from app import ChatGroq # Assuming app.py defines ChatGroq
-from langchain_groq import ChatGroq # Make sure ChatGroq is imported
-import pandas as pd
-from langchain_core.output_parsers import JsonOutputParser
-import os # Import os if needed for ChatGroq init
-
-def analyze_combined_for_job(resume_text: str, portfolio_file: UploadFile, job_description, llm: ChatGroq):
-    # Process the CSV portfolio file
-    try:
-        portfolio_bytes = portfolio_file.file.read()
-         # Attempt common encodings if utf-8 fails
-        try:
-            portfolio_str = portfolio_bytes.decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                portfolio_str = portfolio_bytes.decode('latin-1')
-            except UnicodeDecodeError:
-                portfolio_str = portfolio_bytes.decode('cp1252') # Another common one
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error reading or decoding portfolio file: {e}")
-
-    try:
-        portfolio_df = pd.read_csv(StringIO(portfolio_str))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid CSV file provided for portfolio. Error: {e}")
-
-    if 'Technology' not in portfolio_df.columns:
-        raise HTTPException(status_code=400, detail="Portfolio CSV file must contain a 'Technology' column.")
-
-    candidate_portfolio_skills = ", ".join(portfolio_df['Technology'].dropna().unique().tolist()) # Use unique skills
-
-    job_role = job_description.get("role", "Unknown Role")
-    job_skills = job_description.get("skills", "No skills provided")
-    job_desc_text = job_description.get("description", "No description provided")
-
-    # Create a combined prompt that includes both resume content and portfolio skills
-    prompt_combined = PromptTemplate.from_template("""
-        ### JOB POSTING DETAILS:
-        Role: {job_role}
-        Skills Required: {job_skills}
-        Job Description: {job_desc_text}
-
-        ### RESUME CONTENT:
-        {resume_text}
-
-        ### PORTFOLIO SKILLS (CSV):
-        {candidate_portfolio_skills}
-
+from utility.prompt_template import CompiledPrompt
+from utility.llm_json import json_mode, parse_llm_json
+from utility.observability import span
+from prompts.schemas import AnalysisResult
+from utility.skills import match_skills, skill_match_prompt_block, apply_skill_match
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+# Compiled once at import. Static instructions and examples come first so every combined analysis prompt
+# shares the same prefix; the job/candidate data goes last.
+COMBINED_ANALYSIS_PROMPT = CompiledPrompt(
+    prefix="""
         ### INSTRUCTION:
         1. Analyze the candidate’s resume content AND portfolio skills together against the job posting.
         2. Synthesize information from BOTH sources (resume and portfolio) to assess skills, experience, and project work.
@@ -62,25 +25,25 @@ def analyze_combined_for_job(resume_text: str, portfolio_file: UploadFile, job_d
         7. Ensure the JSON is valid and contains no preamble or commentary outside the JSON structure.
 
         ### VALID JSON OUTPUT EXAMPLE (Suitability: Yes):
-        {{
+        {
           "Suitability": "Yes",
           "Skill Match Percentage": 88,
           "Matched Skills": ["Python", "Pandas", "SQL", "API Development", "Git", "Data Visualization"],
           "Interview Questions": [
-             {{"Question": "Your resume mentions Python and your portfolio lists Pandas. How have you used them together for data analysis?", "Answer": "Likely used Pandas within Python scripts to load, clean (e.g., handle missing values, transform data types), analyze (e.g., group by, aggregate), and potentially visualize data."}},
-             {{"Question": "The job requires API development, and it's listed in your portfolio. Can you describe an API you built or consumed?", "Answer": "Candidate should describe a specific project, mentioning the framework (e.g., Flask, FastAPI, Node/Express) or method (e.g., REST principles, specific endpoints) used."}},
-             {{"Question": "Explain how you would version control your code using Git, as mentioned on your resume.", "Answer": "Using commands like git clone, git add, git commit, git push, git pull, git branch, git merge. Emphasize commit frequency and meaningful messages."}},
-             {{"Question": "Write a SQL query to find users who have placed more than 5 orders.", "Answer": "SELECT CustomerID, COUNT(OrderID) FROM Orders GROUP BY CustomerID HAVING COUNT(OrderID) > 5;"}},
-             {{"Question": "What data visualization libraries (mentioned in portfolio) have you used and for what purpose?", "Answer": "Candidate should name libraries (e.g., Matplotlib, Seaborn, Plotly) and describe creating charts (e.g., bar, line, scatter) to communicate insights."}}
+             {"Question": "Your resume mentions Python and your portfolio lists Pandas. How have you used them together for data analysis?", "Answer": "Likely used Pandas within Python scripts to load, clean (e.g., handle missing values, transform data types), analyze (e.g., group by, aggregate), and potentially visualize data."},
+             {"Question": "The job requires API development, and it's listed in your portfolio. Can you describe an API you built or consumed?", "Answer": "Candidate should describe a specific project, mentioning the framework (e.g., Flask, FastAPI, Node/Express) or method (e.g., REST principles, specific endpoints) used."},
+             {"Question": "Explain how you would version control your code using Git, as mentioned on your resume.", "Answer": "Using commands like git clone, git add, git commit, git push, git pull, git branch, git merge. Emphasize commit frequency and meaningful messages."},
+             {"Question": "Write a SQL query to find users who have placed more than 5 orders.", "Answer": "SELECT CustomerID, COUNT(OrderID) FROM Orders GROUP BY CustomerID HAVING COUNT(OrderID) > 5;"},
+             {"Question": "What data visualization libraries (mentioned in portfolio) have you used and for what purpose?", "Answer": "Candidate should name libraries (e.g., Matplotlib, Seaborn, Plotly) and describe creating charts (e.g., bar, line, scatter) to communicate insights."}
           ],
           "Behavioral Questions": [
             "Tell me about the 'Data Cleaning Project' listed in your portfolio. What was the most challenging aspect?",
             "Your resume mentions collaborating on a team project. How did you handle disagreements within the team?"
           ]
-        }}
+        }
 
         ### VALID JSON OUTPUT EXAMPLE (Suitability: No):
-        {{
+        {
           "Suitability": "No",
           "Skill Match Percentage": 65,
           "Matched Skills": ["Python", "SQL", "Git"],
@@ -95,46 +58,55 @@ def analyze_combined_for_job(resume_text: str, portfolio_file: UploadFile, job_d
             "Explore data visualization libraries like Matplotlib or Seaborn and add a visualization component to a project.",
             "Update resume to quantify achievements in Python/SQL projects if possible."
           ]
-        }}
+        }
+""",
+    template="""
+        ### JOB POSTING DETAILS:
+        Role: {job_role}
+        Skills Required: {job_skills}
+        Job Description: {job_desc_text}
 
+        ### RESUME CONTENT:
+        {resume_text}
+
+        ### PORTFOLIO SKILLS (CSV):
+        {candidate_portfolio_skills}
+
+        {skill_match_block}
         ### GENERATE JSON:
-    """)
+""",
+)
+
+def build_combined_analysis_prompt(resume_text: str, candidate_portfolio_skills: str, job_description, skill_match: Optional[dict] = None) -> str:
+    if skill_match is None:
+        skill_match = match_skills(job_description.get("skills", []), resume_text=resume_text, portfolio_skills=candidate_portfolio_skills)
+    # candidate_portfolio_skills comes from utility.portfolio_csv.load_portfolio_skills
+    job_role = job_description.get("role", "Unknown Role")
+    job_skills = job_description.get("skills", "No skills provided")
+    job_desc_text = job_description.get("description", "No description provided")
 
-    formatted_prompt = prompt_combined.format(
+    # Create a combined prompt that includes both resume content and portfolio skills
+    formatted_prompt = COMBINED_ANALYSIS_PROMPT.format(
         job_role=job_role,
         job_skills=job_skills,
         job_desc_text=job_desc_text,
         resume_text=resume_text,
-        candidate_portfolio_skills=candidate_portfolio_skills
+        candidate_portfolio_skills=candidate_portfolio_skills,
+        skill_match_block=skill_match_prompt_block(skill_match)
     )
+    return formatted_prompt
+
+async def analyze_combined_for_job(resume_text: str, candidate_portfolio_skills: str, job_description, llm: "ChatGroq", skill_match: Optional[dict] = None):
+    # Matched skills and percentage come from the local matcher, the LLM writes the rest
+    if skill_match is None:
+        skill_match = match_skills(job_description.get("skills", []), resume_text=resume_text, portfolio_skills=candidate_portfolio_skills)
+    with span("prompt_build", prompt="combined_analysis"):
+        formatted_prompt = build_combined_analysis_prompt(resume_text, candidate_portfolio_skills, job_description, skill_match)
     # print("--- Combined Prompt ---")
     # print(formatted_prompt) # For debugging
-    response = llm.invoke(formatted_prompt)
-    response_content = response.content
-    # print("--- Combined LLM Raw Response ---")
-    # print(response_content) # For debugging
-
-    # Clean potential markdown ```json ... ```
-    if response_content.strip().startswith("```json"):
-        response_content = response_content.strip()[7:-3].strip()
-    elif response_content.strip().startswith("```"):
-         response_content = response_content.strip()[3:-3].strip()
-
-    json_parser = JsonOutputParser()
-    try:
-        parsed_response = json_parser.parse(response_content)
-    except Exception as e:
-        print(f"Failed to parse combined analysis JSON. Raw content:\n{response_content}") # Log raw content on error
-        raise HTTPException(status_code=500, detail=f"Failed to parse combined analysis JSON from LLM. Error: {str(e)}. Raw response: {response_content[:500]}...") # Include part of raw response in error
-
-    # Add default empty lists if keys are missing but expected based on suitability
-    suitability = parsed_response.get("Suitability", "N/A").lower()
-    if suitability == "yes":
-        parsed_response.setdefault("Interview Questions", [])
-        parsed_response.setdefault("Behavioral Questions", [])
-    else:
-        parsed_response.setdefault("Reasons for Unsuitability", [])
-        parsed_response.setdefault("Suggestions", [])
-    parsed_response.setdefault("Matched Skills", [])
+    # JSON mode where the provider supports it; repair/validation (and one targeted retry) in parse_llm_json
+    response = await json_mode(llm).ainvoke(formatted_prompt)
+    parsed_response = await parse_llm_json(response.content, AnalysisResult, llm, "combined analysis")
 
-    return parsed_response
+    # Local match overrides the model's numbers; also fills the default empty lists
+    return apply_skill_match(parsed_response, skill_match)
@@ -1,33 +1,72 @@
 # prompts/posting.py
-from app import * # Remove this if ChatGroq is imported directly below
-from langchain_core.output_parsers import JsonOutputParser
 from fastapi import HTTPException
-from langchain.prompts import PromptTemplate
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_groq import ChatGroq # Make sure ChatGroq is imported here
+from utility.fetch import fetch_page_text
+from utility.cache import build_cache, SingleFlight
+from utility.timing import StageTimer
+from utility.compact import compact_job_text
+from utility.prompt_template import CompiledPrompt
+from utility.llm_json import json_mode, parse_llm_json
+from utility.observability import span
+from prompts.schemas import JobPosting
+from typing import Optional, TYPE_CHECKING
+from urllib.parse import urlsplit, urlunsplit
+import hashlib
+import os
 
-def preprocess_job_posting(url: str, llm: ChatGroq):
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+# Level 1: normalized URL -> page text, re-scraped after PAGE_CACHE_TTL seconds
+page_cache = build_cache("page_text", maxsize=int(os.getenv("PAGE_CACHE_SIZE", "512")), ttl=float(os.getenv("PAGE_CACHE_TTL", "3600")))
+# Level 2: hash(page text + model) -> extracted job dict. Content-addressed, so no TTL needed.
+posting_cache = build_cache("job_postings", maxsize=int(os.getenv("POSTING_CACHE_SIZE", "512")))
+# Concurrent requests for the same posting share one fetch and one extraction call
+page_flights = SingleFlight()
+posting_flights = SingleFlight()
+
+def normalize_url(url: str) -> str:
+    # Same posting shared with different casing or #anchors should hit the same entry
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+def posting_cache_key(page_data: str, model_name: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{page_data}".encode("utf-8")).hexdigest()
+
+async def preprocess_job_posting(url: str, llm: "ChatGroq", timer: Optional[StageTimer] = None):
+    timer = timer or StageTimer()
+    cache_url = normalize_url(url)
+    page_data = await page_cache.aget(cache_url)
+    if page_data is None:
+        page_data, _ = await page_flights.run(cache_url, lambda: fetch_posting_page(url, cache_url, timer))
+
+    if not page_data:
+         raise HTTPException(status_code=400, detail="No content found on the page after loading.")
+
+    extraction_key = posting_cache_key(page_data, getattr(llm, "model_name", ""))
+    cached_details = await posting_cache.aget(extraction_key)
+    if cached_details is not None:
+        return dict(cached_details) # Copy so callers can't mutate the cached entry
+
+    job_details_dict, _ = await posting_flights.run(extraction_key, lambda: extract_job_details(page_data, llm, extraction_key, timer))
+    return dict(job_details_dict) # Return the guaranteed dictionary
+
+async def fetch_posting_page(url: str, cache_url: str, timer: StageTimer) -> str:
     try:
-        # Consider adding headers for robustness if needed by the site
-        # headers = {"User-Agent": os.getenv("USER_AGENT", "GenAICareerConsultant/1.0")}
-        # loader = WebBaseLoader(url, header_template=headers)
-        loader = WebBaseLoader(url)
-        docs = loader.load()
-        if not docs:
-             raise HTTPException(status_code=404, detail=f"Could not retrieve content from the URL: {url}")
-        page_data = docs[0].page_content # Use docs[0] instead of pop() for clarity
+        # Async fetch so a slow career site doesn't block the event loop for every other request
+        page_data = await timer.timed("fetch", fetch_page_text(url))
     except Exception as e:
         # Catch more specific exceptions if possible (e.g., network errors)
         raise HTTPException(status_code=400, detail=f"Failed to load or scrape the URL: {str(e)}")
+    if page_data:
+        await page_cache.aset(cache_url, page_data)
+    return page_data
 
-    if not page_data:
-         raise HTTPException(status_code=400, detail="No content found on the page after loading.")
-
-    prompt_extract = PromptTemplate.from_template('''
-        ### SCRAPED TEXT FROM WEBSITE:
-        {page_data}
+# Compiled once at import. Static instructions and the example come first so every extraction prompt
+# shares the same prefix; the scraped page goes last.
+JOB_EXTRACTION_PROMPT = CompiledPrompt(
+    prefix="""
         ### INSTRUCTION:
-        Analyze the scraped text from the job posting page.
+        Analyze the scraped text from the job posting page, given at the end.
         Extract and return ONLY the following information as a single, valid JSON object:
           - "role": The specific job title or role being advertised.
           - "skills": A list of key skills, technologies, or qualifications required for the job. If listed as a string, try to parse into a list. If not found, use an empty list [].
@@ -36,56 +75,36 @@ def preprocess_job_posting(url: str, llm: ChatGroq):
         If you cannot reliably extract a field, use a suitable default like "Not specified" for strings or an empty list for skills.
 
         ### VALID JSON OUTPUT EXAMPLE:
-        {{
+        {
           "role": "Software Engineer",
           "skills": ["Python", "React", "AWS", "SQL"],
           "description": "Develop and maintain web applications using Python and React..."
-        }}
+        }
+""",
+    template="""
+        ### SCRAPED TEXT FROM WEBSITE:
+        {page_data}
 
         ### GENERATE JSON:
-    ''') # Added more specific instructions for the LLM
+""",
+)
 
-    formatted_prompt = prompt_extract.format(page_data=page_data)
+async def extract_job_details(page_data: str, llm: "ChatGroq", extraction_key: str, timer: StageTimer) -> dict:
+    # Trim low-value paragraphs so the page fits the model's budget; the cache key above uses the full text
+    compact_page, tokens_saved = compact_job_text(page_data, getattr(llm, "model_name", ""))
+    timer.count("tokens_saved_posting", tokens_saved)
+    with span("prompt_build", prompt="job_extraction"):
+        formatted_prompt = JOB_EXTRACTION_PROMPT.format(page_data=compact_page)
     try:
-        response = llm.invoke(formatted_prompt)
-        response_content = response.content.strip()
-
-        # Clean potential markdown ```json ... ``` or ``` ... ```
-        if response_content.startswith("```json"):
-            response_content = response_content[7:-3].strip()
-        elif response_content.startswith("```"):
-             response_content = response_content[3:-3].strip()
-
+        response = await timer.timed("extract", json_mode(llm).ainvoke(formatted_prompt))
+    except HTTPException:
+        raise # e.g. the scheduler's 429 when the model's rate limit can't be met in time
     except Exception as e:
          # Handle potential LLM API errors
          raise HTTPException(status_code=503, detail=f"Error invoking LLM for job posting analysis: {str(e)}")
 
-
-    json_parser = JsonOutputParser()
-    try:
-        parsed_output = json_parser.parse(response_content)
-    except Exception as e:
-        print(f"Failed to parse job posting JSON. Raw content:\n{response_content}") # Log raw content
-        raise HTTPException(status_code=500, detail=f"Failed to parse job posting JSON from LLM response. Error: {str(e)}. Raw response snippet: {response_content[:200]}...")
-
-    # --- FIX: Ensure the result is a dictionary ---
-    job_details_dict = None
-    if isinstance(parsed_output, list):
-        if len(parsed_output) == 1 and isinstance(parsed_output[0], dict):
-            # If it's a list containing a single dictionary, extract the dictionary
-            job_details_dict = parsed_output[0]
-            print("Warning: LLM returned a list containing one job details object. Extracted the object.")
-        else:
-            # If it's a list but not the expected format, raise an error
-            raise HTTPException(status_code=500, detail=f"Unexpected format from job posting analysis: Received a list, expected a single dictionary. Content: {str(parsed_output)}")
-    elif isinstance(parsed_output, dict):
-        # If it's already a dictionary, use it directly
-        job_details_dict = parsed_output
-    else:
-        # If it's neither a list nor a dictionary, raise an error
-        raise HTTPException(status_code=500, detail=f"Unexpected data type from job posting analysis: Expected dict, got {type(parsed_output)}. Content: {str(parsed_output)}")
-
-    # --- END FIX ---
+    # Repairs truncated/sloppy JSON, unwraps a one-item list and fills in missing keys (prompts/schemas.py)
+    job_details_dict = await parse_llm_json(response.content, JobPosting, llm, "job posting")
 
     # Optional: Validate essential keys exist, though .get() in consuming functions handles missing keys
     # required_keys = ["role", "skills", "description"]
@@ -93,4 +112,5 @@ def preprocess_job_posting(url: str, llm: ChatGroq):
     #     print(f"Warning: Job details dictionary missing some keys. Found: {job_details_dict.keys()}")
         # Decide if this should be an error or just proceed with defaults
 
-    return job_details_dict # Return the guaranteed dictionary
+    await posting_cache.aset(extraction_key, job_details_dict)
+    return job_details_dict
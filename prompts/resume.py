@@ -1,25 +1,18 @@
 # resume.py
-from langchain.prompts import PromptTemplate
-from fastapi import HTTPException
-# from app import ChatGroq # Assuming app.py defines ChatGroq
-from langchain_groq import ChatGroq # Make sure ChatGroq is imported
-from langchain_core.output_parsers import JsonOutputParser
-import os # Import os if needed for ChatGroq init
+from utility.prompt_template import CompiledPrompt
+from utility.llm_json import json_mode, parse_llm_json
+from utility.observability import span
+from prompts.schemas import AnalysisResult
+from utility.skills import match_skills, skill_match_prompt_block, apply_skill_match
+from typing import Optional, TYPE_CHECKING
 
-def analyze_resume_for_job(resume_text: str, job_description, llm: ChatGroq):
-    job_role = job_description.get("role", "Unknown Role")
-    job_skills = job_description.get("skills", "No skills provided")
-    job_desc_text = job_description.get("description", "No description provided")
-
-    prompt_resume_analysis = PromptTemplate.from_template("""
-        ### JOB POSTING DETAILS:
-        Role: {job_role}
-        Skills Required: {job_skills}
-        Job Description: {job_desc_text}
-
-        ### RESUME CONTENT:
-        {resume_text}
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
 
+# Compiled once at import. Static instructions and examples come first so every resume analysis prompt
+# shares the same prefix; the job/candidate data goes last.
+RESUME_ANALYSIS_PROMPT = CompiledPrompt(
+    prefix="""
         ### INSTRUCTION:
         1. Analyze the resume content against the job posting details.
         2. Compare the skills, experience, and qualifications mentioned in the resume with the required skills and job description.
@@ -31,25 +24,25 @@ def analyze_resume_for_job(resume_text: str, job_description, llm: ChatGroq):
         6. Ensure the JSON is valid and contains no preamble or commentary outside the JSON structure.
 
         ### VALID JSON OUTPUT EXAMPLE (Suitability: Yes):
-        {{
+        {
           "Suitability": "Yes",
           "Skill Match Percentage": 90,
           "Matched Skills": ["Java", "Spring Boot", "SQL", "Microservices", "AWS"],
           "Interview Questions": [
-            {{"Question": "Explain the difference between @Component, @Service, and @Repository in Spring.", "Answer": "@Component is a generic stereotype. @Service is for business logic, @Repository is for data access layers. All are specialized @Components."}},
-            {{"Question": "How would you implement security in a Spring Boot application?", "Answer": "Using Spring Security, configure authentication (e.g., JWT, OAuth2) and authorization (e.g., method security, URL patterns)."}},
-            {{"Question": "Describe your experience with microservices.", "Answer": "Based on the resume, the candidate designed and deployed microservices using Spring Boot, likely involving service discovery (Eureka/Consul) and communication (REST/messaging queues)."}},
-            {{"Question": "What AWS services have you used according to your resume?", "Answer": "The resume mentions EC2, S3, and RDS, suggesting experience with core compute, storage, and database services."}},
-            {{"Question": "Write a SQL query to join two tables: Orders and Customers.", "Answer": "SELECT * FROM Orders o JOIN Customers c ON o.CustomerID = c.CustomerID;"}}
+            {"Question": "Explain the difference between @Component, @Service, and @Repository in Spring.", "Answer": "@Component is a generic stereotype. @Service is for business logic, @Repository is for data access layers. All are specialized @Components."},
+            {"Question": "How would you implement security in a Spring Boot application?", "Answer": "Using Spring Security, configure authentication (e.g., JWT, OAuth2) and authorization (e.g., method security, URL patterns)."},
+            {"Question": "Describe your experience with microservices.", "Answer": "Based on the resume, the candidate designed and deployed microservices using Spring Boot, likely involving service discovery (Eureka/Consul) and communication (REST/messaging queues)."},
+            {"Question": "What AWS services have you used according to your resume?", "Answer": "The resume mentions EC2, S3, and RDS, suggesting experience with core compute, storage, and database services."},
+            {"Question": "Write a SQL query to join two tables: Orders and Customers.", "Answer": "SELECT * FROM Orders o JOIN Customers c ON o.CustomerID = c.CustomerID;"}
           ],
           "Behavioral Questions": [
             "Your resume mentions leading a project migration; can you elaborate on the challenges and your role?",
             "Tell me about the 'XYZ Project' listed on your resume. What was your specific contribution?"
           ]
-        }}
+        }
 
         ### VALID JSON OUTPUT EXAMPLE (Suitability: No):
-        {{
+        {
           "Suitability": "No",
           "Skill Match Percentage": 50,
           "Matched Skills": ["Java", "SQL"],
@@ -64,46 +57,49 @@ def analyze_resume_for_job(resume_text: str, job_description, llm: ChatGroq):
             "Gain hands-on experience with core AWS services (EC2, S3, RDS) via the AWS Free Tier.",
             "Update the resume to clearly highlight any relevant project work, even academic, using Java and SQL."
           ]
-        }}
+        }
+""",
+    template="""
+        ### JOB POSTING DETAILS:
+        Role: {job_role}
+        Skills Required: {job_skills}
+        Job Description: {job_desc_text}
+
+        ### RESUME CONTENT:
+        {resume_text}
 
+        {skill_match_block}
         ### GENERATE JSON:
-    """)
+""",
+)
 
-    formatted_prompt = prompt_resume_analysis.format(
+def build_resume_analysis_prompt(resume_text: str, job_description, skill_match: Optional[dict] = None) -> str:
+    if skill_match is None:
+        skill_match = match_skills(job_description.get("skills", []), resume_text=resume_text)
+    job_role = job_description.get("role", "Unknown Role")
+    job_skills = job_description.get("skills", "No skills provided")
+    job_desc_text = job_description.get("description", "No description provided")
+
+    formatted_prompt = RESUME_ANALYSIS_PROMPT.format(
         job_role=job_role,
         job_skills=job_skills,
         job_desc_text=job_desc_text,
-        resume_text=resume_text
+        resume_text=resume_text,
+        skill_match_block=skill_match_prompt_block(skill_match)
     )
+    return formatted_prompt
+
+async def analyze_resume_for_job(resume_text: str, job_description, llm: "ChatGroq", skill_match: Optional[dict] = None):
+    # Matched skills and percentage come from the local matcher, the LLM writes the rest
+    if skill_match is None:
+        skill_match = match_skills(job_description.get("skills", []), resume_text=resume_text)
+    with span("prompt_build", prompt="resume_analysis"):
+        formatted_prompt = build_resume_analysis_prompt(resume_text, job_description, skill_match)
     # print("--- Resume Prompt ---")
     # print(formatted_prompt) # For debugging
-    response = llm.invoke(formatted_prompt)
-    response_content = response.content
-    # print("--- Resume LLM Raw Response ---")
-    # print(response_content) # For debugging
-
-    # Clean potential markdown ```json ... ```
-    if response_content.strip().startswith("```json"):
-        response_content = response_content.strip()[7:-3].strip()
-    elif response_content.strip().startswith("```"):
-         response_content = response_content.strip()[3:-3].strip()
-
-
-    json_parser = JsonOutputParser()
-    try:
-        parsed_response = json_parser.parse(response_content)
-    except Exception as e:
-        print(f"Failed to parse resume analysis JSON. Raw content:\n{response_content}") # Log raw content on error
-        raise HTTPException(status_code=500, detail=f"Failed to parse resume analysis JSON from LLM. Error: {str(e)}. Raw response: {response_content[:500]}...") # Include part of raw response in error
-
-    # Add default empty lists if keys are missing but expected based on suitability
-    suitability = parsed_response.get("Suitability", "N/A").lower()
-    if suitability == "yes":
-        parsed_response.setdefault("Interview Questions", [])
-        parsed_response.setdefault("Behavioral Questions", [])
-    else:
-        parsed_response.setdefault("Reasons for Unsuitability", [])
-        parsed_response.setdefault("Suggestions", [])
-    parsed_response.setdefault("Matched Skills", [])
+    # JSON mode where the provider supports it; repair/validation (and one targeted retry) in parse_llm_json
+    response = await json_mode(llm).ainvoke(formatted_prompt)
+    parsed_response = await parse_llm_json(response.content, AnalysisResult, llm, "resume analysis")
 
-    return parsed_response
+    # Local match overrides the model's numbers; also fills the default empty lists
+    return apply_skill_match(parsed_response, skill_match)
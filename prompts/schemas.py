@@ -0,0 +1,104 @@
+# schemas.py
+# Response models for the LLM outputs. Validation is lenient on purpose: models often return a string
+# where a list was asked for, or numbers as strings, and those are coerced instead of failing the request.
+import re
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from utility.format import ensure_list, ensure_question_list
+from utility.skills import normalize_job_skills
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class JobPosting(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    role: str = "Not specified"
+    skills: List[str] = Field(default_factory=list)
+    description: str = "Not specified"
+
+    @field_validator("role", "description", mode="before")
+    @classmethod
+    def text_or_default(cls, value):
+        return "Not specified" if value is None else str(value)
+
+    @field_validator("skills", mode="before")
+    @classmethod
+    def skills_as_list(cls, value):
+        return normalize_job_skills(value)
+
+
+class InterviewQuestion(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    Question: str
+    Answer: str = "N/A"
+
+
+def answer_text(value) -> str:
+    # Answers sometimes come back as a list of points
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value if item is not None) or "N/A"
+    return "N/A" if value is None else str(value)
+
+
+def question_item(item):
+    # Question/Answer dicts with the keys matched case-insensitively, or None if there is no question
+    if not isinstance(item, dict):
+        return item
+    keys = {str(key).strip().lower(): key for key in item}
+    question = next((item[keys[name]] for name in ("question", "q") if name in keys), None)
+    if question is None:
+        return None
+    answer = next((item[keys[name]] for name in ("answer", "a") if name in keys), None)
+    extra = {key: value for key, value in item.items() if str(key).strip().lower() not in ("question", "q", "answer", "a")}
+    return {**extra, "Question": answer_text(question), "Answer": answer_text(answer)}
+
+
+class AnalysisResult(BaseModel):
+    # Field names match the JSON keys the prompts ask for (and utility/format.py renders)
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+    suitability: Optional[str] = Field(None, alias="Suitability")
+    skill_match_percentage: Optional[Union[int, float]] = Field(None, alias="Skill Match Percentage")
+    matched_skills: Optional[List[str]] = Field(None, alias="Matched Skills")
+    interview_questions: Optional[List[Union[InterviewQuestion, str]]] = Field(None, alias="Interview Questions")
+    behavioral_questions: Optional[List[str]] = Field(None, alias="Behavioral Questions")
+    reasons_for_unsuitability: Optional[List[str]] = Field(None, alias="Reasons for Unsuitability")
+    suggestions: Optional[List[str]] = Field(None, alias="Suggestions")
+
+    @field_validator("suitability", mode="before")
+    @classmethod
+    def yes_or_no(cls, value):
+        if value is None:
+            return None
+        return "Yes" if str(value).strip().lower() in ("yes", "true", "suitable") else "No"
+
+    @field_validator("skill_match_percentage", mode="before")
+    @classmethod
+    def percentage(cls, value):
+        # "85", "85%", "85% (17/20)" -> 85; anything without a number ("N/A") -> None. The local skill match overrides it anyway.
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return value
+        number = _NUMBER_RE.search(value) if isinstance(value, str) else None
+        if number is None:
+            return None
+        return float(number.group()) if "." in number.group() else int(number.group())
+
+    @field_validator("matched_skills", "behavioral_questions", "reasons_for_unsuitability", "suggestions", mode="before")
+    @classmethod
+    def string_list(cls, value):
+        if value is None:
+            return None
+        return [str(item) for item in ensure_list(value)]
+
+    @field_validator("interview_questions", mode="before")
+    @classmethod
+    def question_list(cls, value):
+        if value is None:
+            return None
+        items = [question_item(item) for item in (value if isinstance(value, list) else ensure_list(value))]
+        # Strings ("Question: ... Answer: ...") and anything else left over go through the renderer's own parser
+        return ensure_question_list([item for item in items if item is not None])
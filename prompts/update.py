@@ -0,0 +1,92 @@
+# update.py
+from utility.prompt_template import CompiledPrompt
+from utility.llm_json import json_mode, parse_llm_json
+from prompts.schemas import AnalysisResult
+from utility.skills import skill_match_prompt_block
+from utility.incremental import section_name
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+# Resubmissions with a session token (utility/incremental.py): the candidate edited part of the resume,
+# so only the changed entries and the parts of the earlier analysis to revise are sent. Same static
+# prefix for every update, so the provider can cache it.
+UPDATE_ANALYSIS_PROMPT = CompiledPrompt(
+    prefix="""
+        ### INSTRUCTION:
+        1. An analysis of this candidate against this job posting already exists. The candidate has since edited parts of their resume (or the posting's skill list changed).
+        2. You get only the new or edited resume entries (labelled with their section) and what was removed, the authoritative skill match for the new version, the focus skills whose match changed, and the parts of the earlier analysis that are being kept.
+        3. Regenerate ONLY the keys listed under KEYS TO REGENERATE, following the note next to each key:
+           - "Interview Questions": exactly the requested number of NEW technical questions with concise answers, as a list of objects with "Question" and "Answer". Cover the focus skills the candidate now has first, then the job's other matched skills. Do not repeat the kept questions.
+           - "Behavioral Questions": the full revised list (at least 2 strings), grounded in the changed entries.
+           - "Reasons for Unsuitability": the full revised list of reasons, dropping any the changes address and naming the skills still missing.
+           - "Suggestions": the full revised list of 3-4 specific, actionable suggestions for the remaining gaps.
+        4. Return a single, valid JSON object with just those keys, no preamble or commentary.
+
+        ### VALID JSON OUTPUT EXAMPLE (regenerating "Interview Questions" with 1 new question, and "Behavioral Questions"):
+        {
+          "Interview Questions": [
+            {"Question": "Your updated resume adds Kubernetes. How did you roll out a zero-downtime deployment?", "Answer": "Rolling updates with readiness probes and a PodDisruptionBudget, watching error rates before completing the rollout."}
+          ],
+          "Behavioral Questions": [
+            "You now describe leading the platform migration; how did you get other teams to adopt it?",
+            "Tell me about a time a deployment went wrong and how you handled it."
+          ]
+        }
+""",
+    template="""
+        ### JOB POSTING:
+        Role: {job_role}
+        Skills Required: {job_skills}
+
+        ### CHANGED RESUME ENTRIES:
+        {changed_sections}
+
+        {skill_match_block}
+        ### FOCUS SKILLS (match changed since the earlier analysis):
+        {focus_skills}
+
+        ### KEPT FROM THE EARLIER ANALYSIS:
+        {kept}
+
+        ### KEYS TO REGENERATE:
+        {keys}
+        ### GENERATE JSON:
+""",
+)
+
+def changed_sections_text(plan: dict) -> str:
+    # New or edited entries labelled with their section, then what was removed
+    parts = [f"[{section_name(section).title()}]\n{entry}" for section, entry in plan["changed"]]
+    parts += [f"[{section_name(section).title()}] {count} {'entry' if count == 1 else 'entries'} removed" for section, count in plan["removed"].items()]
+    return "\n\n".join(parts) or "None (only the posting's skill list changed)"
+
+def kept_text(plan: dict, previous_result: dict) -> str:
+    # Questions that stay, and the earlier versions of the lists being revised
+    lines = [f"- Interview Question: {item.get('Question', 'N/A') if isinstance(item, dict) else item}" for item in plan["kept_questions"]]
+    for key in ("Behavioral Questions", "Reasons for Unsuitability", "Suggestions"):
+        if key in plan["keys"]:
+            lines += [f"- Earlier {key[:-1] if key.endswith('s') else key}: {item}" for item in previous_result.get(key) or []]
+    return "\n".join(lines) or "None"
+
+def keys_text(plan: dict) -> str:
+    notes = {"Interview Questions": f"{plan['question_count']} new question{'' if plan['question_count'] == 1 else 's'}", "Behavioral Questions": "full revised list",
+             "Reasons for Unsuitability": "full revised list", "Suggestions": "full revised list"}
+    return "\n".join(f'- "{key}": {notes[key]}' for key in plan["keys"]) + "\n"
+
+def build_update_analysis_prompt(plan: dict, previous_result: dict, job_description, skill_match: dict) -> str:
+    return UPDATE_ANALYSIS_PROMPT.format(
+        job_role=job_description.get("role", "Unknown Role"),
+        job_skills=job_description.get("skills", "No skills provided"),
+        changed_sections=changed_sections_text(plan),
+        skill_match_block=skill_match_prompt_block(skill_match),
+        focus_skills=", ".join(plan["focus"]) or "None",
+        kept=kept_text(plan, previous_result),
+        keys=keys_text(plan),
+    )
+
+async def analyze_update_for_job(formatted_prompt: str, llm: "ChatGroq") -> dict:
+    # Only the regenerated keys; utility.incremental.merge_update folds them into the earlier analysis
+    response = await json_mode(llm).ainvoke(formatted_prompt)
+    return await parse_llm_json(response.content, AnalysisResult, llm, "incremental analysis")
@@ -1,17 +1,30 @@
 # analyze.py
-from fastapi import APIRouter, Form, UploadFile, HTTPException, File
-from fastapi.responses import HTMLResponse
-# from app import ChatGroq # Assuming app.py defines ChatGroq
-from langchain_groq import ChatGroq # Make sure ChatGroq is imported
+from fastapi import APIRouter, Form, UploadFile, HTTPException, File, Request
+from fastapi.responses import HTMLResponse, JSONResponse
 from typing import Optional
 from prompts.posting import preprocess_job_posting
-from prompts.combined import analyze_combined_for_job
-from prompts.resume import analyze_resume_for_job
+from prompts.combined import analyze_combined_for_job, build_combined_analysis_prompt
+from prompts.resume import analyze_resume_for_job, build_resume_analysis_prompt
 from prompts.portfolio import analyze_portfolio_for_job
+from prompts.update import build_update_analysis_prompt, analyze_update_for_job
+from utility.portfolio_csv import load_portfolio_skills
 from utility.parse import extract_resume_info
-from utility.format import format_string_response
+from utility.format import format_string_response, format_json_response
+from utility.timing import StageTimer
+from utility.llm_pool import get_llm_registry
+from utility.skills import match_skills, is_clearly_unsuitable, fast_mode_result, apply_skill_match
+from utility.compact import compact_resume_text, count_tokens
+from utility.cache import build_cache, cache_stats, SingleFlight
+from utility.llm_json import parse_stats
+from utility.cascade import AUTO_MODEL, ModelCascade, resolve_models, cascade_stats
+from utility.observability import log
+from utility.incremental import (INCREMENTAL_ANALYSIS, MAX_SESSION_TOKEN_LENGTH, NEW_SESSION, new_session_token, session_exists, context_fingerprint,
+                                 resume_sections, load_session, remember_analysis, plan_update, merge_update, record_incremental, incremental_stats)
 from dotenv import load_dotenv
 import os # Import os
+import asyncio
+import hashlib
+import json
 
 load_dotenv()
 groq_api_key = os.getenv("GROQ_API_KEY")
@@ -25,19 +38,44 @@ if not os.getenv("USER_AGENT"):
 
 router = APIRouter()
 
-# --- Main Endpoint ---
-@router.post("/analyze/")
-async def analyze(
-    url: str = Form(...),
-    resume_file: Optional[UploadFile] = File(None),
-    portfolio_file: Optional[UploadFile] = File(None),
-    use_both: str = Form(...),  # Expecting "true" or "false" as string
-    model_choice: str = Form(...)
-):
+ALLOWED_MODELS = {"llama-3.3-70b-versatile", "llama-3.2-3b-preview", "llama-3.1-8b-instant", "gemma2-9b-it", "qwen-2.5-32b", AUTO_MODEL} # Update with current Groq models if needed; "auto" is the small/large cascade (utility/cascade.py)
+
+# Full analysis results: refreshes, retries and double submits of the same document against the
+# same posting reuse the earlier LLM answer. Identical requests already in flight share one call.
+analysis_cache = build_cache("analysis_results", maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "512")), ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "86400")))
+analysis_flights = SingleFlight()
+
+def analysis_cache_key(job_desc, resume_text: Optional[str], portfolio_skills: Optional[str], model_name: str, analyze_both: bool) -> str:
+    # Keyed on the extracted job dict and the parsed text, not the URL or file bytes, so a re-scraped
+    # posting or a re-exported PDF that yields the same content still hits
+    payload = json.dumps([job_desc, resume_text, portfolio_skills, model_name, analyze_both], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+OUTPUT_FORMATS = ("html", "json") # json: the normalized analysis for clients that render it themselves
+
+def validate_output_format(output_format: str) -> str:
+    output_format = output_format.lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid output_format. Choose one of: {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+async def validate_session_token(session_token: Optional[str]) -> Optional[str]:
+    # Links resubmissions for incremental re-analysis; blank means none. "new" issues a token (sent back in
+    # X-Session-Token), anything else must be a token this server issued and still remembers.
+    session_token = (session_token or "").strip()
+    if not session_token:
+        return None
+    if session_token == NEW_SESSION:
+        return new_session_token()
+    if len(session_token) > MAX_SESSION_TOKEN_LENGTH or not await session_exists(session_token):
+        raise HTTPException(status_code=400, detail=f"Unknown or expired session_token. Send session_token={NEW_SESSION} to start a new session.")
+    return session_token
+
+def validate_analysis_inputs(model_choice: str, use_both: str, resume_file: Optional[UploadFile], portfolio_file: Optional[UploadFile]):
+    # Returns (analyze_both, use_resume, use_portfolio) or raises a 400
     # Validate model choice
-    allowed_models = {"llama-3.3-70b-versatile", "llama-3.2-3b-preview", "llama-3.1-8b-instant", "gemma2-9b-it", "qwen-2.5-32b"} # Update with current Groq models if needed
-    if model_choice not in allowed_models:
-        raise HTTPException(status_code=400, detail=f"Invalid model selected. Choose one of: {', '.join(allowed_models)}")
+    if model_choice not in ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid model selected. Choose one of: {', '.join(ALLOWED_MODELS)}")
 
     # Convert use_both to lowercase boolean for easier checking
     analyze_both = use_both.lower() == "true"
@@ -56,43 +94,188 @@ async def analyze(
         # if has_resume and has_portfolio:
         #     raise HTTPException(status_code=400, detail="Please select 'Analyze Both' if you want to submit both files, otherwise submit only one.")
 
+    # Single-file mode prefers the resume when both were uploaded
+    use_resume = bool(has_resume)
+    use_portfolio = bool(has_portfolio) and (analyze_both or not has_resume)
+    return analyze_both, use_resume, use_portfolio
+
+async def parse_inputs(resume_file: Optional[UploadFile], portfolio_file: Optional[UploadFile]):
+    # Resume (PDF/DOCX) and portfolio (CSV) parsing are independent, run them side by side in the parse workers
+    async def parse_resume():
+        if not resume_file:
+            return None
+        resume_info = await extract_resume_info(resume_file)
+        return resume_info["content"]
+
+    async def parse_portfolio():
+        if not portfolio_file:
+            return None
+        return await load_portfolio_skills(portfolio_file)
+
+    resume_text, portfolio_skills = await asyncio.gather(parse_resume(), parse_portfolio())
+    return resume_text, portfolio_skills
+
+def compact_resume_for_prompt(resume_text: Optional[str], llm, analyze_both: bool = False, timer: Optional[StageTimer] = None):
+    # Fit the resume into the model's token budget (the combined prompt leaves half for the portfolio)
+    if resume_text is None:
+        return None
+    compacted, tokens_saved = compact_resume_text(resume_text, getattr(llm, "model_name", ""), 0.5 if analyze_both else 1.0)
+    if timer is not None:
+        timer.count("tokens_saved_resume", tokens_saved)
+    return compacted
+
+async def run_analysis(resume_text: Optional[str], portfolio_skills: Optional[str], job_desc, llm, analyze_both: bool = False, fast_mode: bool = False, timer: Optional[StageTimer] = None, session_token: Optional[str] = None):
+    # Skill match is computed locally on the full text; fast mode skips the LLM when it's clearly below the cutoff
+    skill_match = match_skills(job_desc.get("skills", []), resume_text=resume_text, portfolio_skills=portfolio_skills)
+    if fast_mode and is_clearly_unsuitable(skill_match):
+        return fast_mode_result(skill_match)
+
+    timer = timer or StageTimer()
+    model_name = getattr(llm, "model_name", "")
+    # With a session token, resubmissions of an edited resume are diffed against the session's last analysis
+    session = None
+    if session_token and INCREMENTAL_ANALYSIS and resume_text is not None:
+        session = (session_token, context_fingerprint(job_desc, portfolio_skills, model_name, analyze_both), resume_sections(resume_text))
+
+    key = analysis_cache_key(job_desc, resume_text, portfolio_skills, model_name, analyze_both)
+    cached = await analysis_cache.aget(key)
+    if cached is not None:
+        timer.count("analysis_cache_hit", 1)
+        result = dict(cached)
+    else:
+        async def compute():
+            result = None
+            if session is not None:
+                result = await analyze_incrementally(session, resume_text, portfolio_skills, job_desc, llm, skill_match, analyze_both, timer)
+            if result is None:
+                result = await analyze_with_llm(resume_text, portfolio_skills, job_desc, llm, skill_match, analyze_both, timer)
+            await analysis_cache.aset(key, result)
+            return result
+
+        result, shared = await analysis_flights.run(key, compute)
+        timer.count("analysis_cache_shared" if shared else "analysis_cache_miss", 1)
+        result = dict(result)
+    if session is not None:
+        await remember_analysis(session[0], session[1], job_desc.get("skills", []), session[2], skill_match, result)
+        timer.count("session_saved", 1)
+    return result
+
+async def analyze_incrementally(session, resume_text: str, portfolio_skills: Optional[str], job_desc, llm, skill_match: dict, analyze_both: bool = False, timer: Optional[StageTimer] = None):
+    # The session's last analysis with only the affected keys regenerated, or None when a full analysis is needed.
+    # Counts the prompt tokens a full analysis would have sent against what was actually sent.
+    session_token, context, sections = session
+    previous = await load_session(session_token)
+    if previous is None:
+        return None # First submission in this session
+    full_tokens = full_prompt_tokens(resume_text, portfolio_skills, job_desc, llm, skill_match, analyze_both)
+    plan = plan_update(previous, context, job_desc.get("skills", []), sections, skill_match)
+    if plan is None:
+        timer.count("incremental_full", 1)
+        record_incremental("full", full_tokens, full_tokens)
+        return None
+
+    previous_result = previous["result"]
+    if plan["mode"] == "reused":
+        sent_tokens = 0
+        result = apply_skill_match(dict(previous_result), skill_match)
+    else:
+        formatted_prompt = build_update_analysis_prompt(plan, previous_result, job_desc, skill_match)
+        sent_tokens = count_tokens(formatted_prompt)
+
+        async def update(model):
+            return apply_skill_match(merge_update(previous_result, await analyze_update_for_job(formatted_prompt, model), plan), skill_match)
+
+        # Under "auto" the merged result goes through the same confidence check as a full analysis
+        result = await (llm.run(update, skill_match) if isinstance(llm, ModelCascade) else update(llm))
+    timer.count(f"incremental_{plan['mode']}", 1)
+    timer.count("tokens_saved_incremental", full_tokens - sent_tokens)
+    record_incremental(plan["mode"], full_tokens, sent_tokens)
+    log("incremental_analysis", mode=plan["mode"], sections=plan.get("sections", []), keys=plan.get("keys", []),
+        full_prompt_tokens=full_tokens, sent_tokens=sent_tokens)
+    return result
 
+def full_prompt_tokens(resume_text: str, portfolio_skills: Optional[str], job_desc, llm, skill_match: dict, analyze_both: bool = False) -> int:
+    # Size of the prompt analyze_with_llm would send for these inputs
+    compacted = compact_resume_for_prompt(resume_text, llm, analyze_both)
+    if analyze_both:
+        return count_tokens(build_combined_analysis_prompt(compacted, portfolio_skills, job_desc, skill_match))
+    return count_tokens(build_resume_analysis_prompt(compacted, job_desc, skill_match))
+
+async def analyze_with_llm(resume_text: Optional[str], portfolio_skills: Optional[str], job_desc, llm, skill_match: dict, analyze_both: bool = False, timer: Optional[StageTimer] = None):
+    if isinstance(llm, ModelCascade):
+        # Small model first; the cascade re-runs this on the large model when needed
+        return await llm.run(lambda model: analyze_with_llm(resume_text, portfolio_skills, job_desc, model, skill_match, analyze_both, timer), skill_match)
+    resume_text = compact_resume_for_prompt(resume_text, llm, analyze_both, timer)
+
+    # Pick the prompt for whichever inputs were parsed
+    if analyze_both:
+        # --- Analyze Both ---
+        return await analyze_combined_for_job(resume_text, portfolio_skills, job_desc, llm, skill_match)
+    # --- Analyze Single File ---
+    if resume_text is not None:
+        return await analyze_resume_for_job(resume_text, job_desc, llm, skill_match)
+    if portfolio_skills is not None:
+        return await analyze_portfolio_for_job(portfolio_skills, job_desc, llm, skill_match)
+    # This case should be caught by validation, but as a safeguard:
+    raise HTTPException(status_code=400, detail="No valid file provided for single analysis.")
+
+def analysis_cache_status(timer: StageTimer) -> str:
+    for status in ("hit", "shared", "miss"):
+        if timer.counters.get(f"analysis_cache_{status}"):
+            return status
+    return "skipped" # Fast mode answered without the LLM
+
+def incremental_status(timer: StageTimer) -> Optional[str]:
+    # full|reused|updated for a resubmission with a session token, None otherwise
+    for status in ("updated", "reused", "full"):
+        if timer.counters.get(f"incremental_{status}"):
+            return status
+    return None
+
+async def analyze_documents(registry, url: str, resume_file: Optional[UploadFile], portfolio_file: Optional[UploadFile], analyze_both: bool, model_choice: str, fast_mode: bool = False, output_format: str = "html", session_token: Optional[str] = None):
+    # The /analyze/ pipeline, shared with /analyze/jobs. Pass only the files to analyze (see validate_analysis_inputs).
+    # Returns (content, headers): an HTML string, or the result dict for output_format="json". The uploads are
+    # closed when it finishes.
+    timer = StageTimer()
     try:
-        llm = ChatGroq(temperature=0.1, groq_api_key=groq_api_key, model_name=model_choice) # Slightly lower temp for consistency
-        job_desc = preprocess_job_posting(url, llm)
+        # Pooled clients, reused across requests. Same model for both steps unless model_choice is "auto"
+        posting_llm, llm = resolve_models(registry, model_choice)
+
+        # Posting fetch + extraction doesn't depend on the uploads, so start it now and
+        # parse the documents while it runs. Critical path becomes max(fetch+extract, parse).
+        posting_task = asyncio.create_task(timer.timed("posting", preprocess_job_posting(url, posting_llm, timer)))
+        try:
+            resume_text, portfolio_skills = await timer.timed("parse", parse_inputs(resume_file, portfolio_file))
+            job_desc = await posting_task
+        finally:
+            if not posting_task.done():
+                posting_task.cancel() # Parsing failed, don't leave the LLM call running
 
         result = None
-        formatted_result = ""
-
-        if analyze_both:
-            # --- Analyze Both ---
-            print("Analyzing both Resume and Portfolio...")
-            # Ensure files are readable again if needed (FastAPI might consume them)
-            await resume_file.seek(0)
-            await portfolio_file.seek(0)
-            resume_info = extract_resume_info(resume_file) # Parses PDF/DOCX
-            # Pass the portfolio_file directly to the analysis function
-            result = analyze_combined_for_job(resume_info["content"], portfolio_file, job_desc, llm)
 
-        else:
-            # --- Analyze Single File ---
-            if has_resume:
-                print("Analyzing Resume only...")
-                await resume_file.seek(0)
-                resume_info = extract_resume_info(resume_file)
-                result = analyze_resume_for_job(resume_info["content"], job_desc, llm)
-            elif has_portfolio:
-                print("Analyzing Portfolio only...")
-                await portfolio_file.seek(0)
-                result = analyze_portfolio_for_job(portfolio_file, job_desc, llm)
-            else:
-                # This case should be caught by validation, but as a safeguard:
-                 raise HTTPException(status_code=400, detail="No valid file provided for single analysis.")
+        with timer.stage("analysis"):
+            result = await run_analysis(resume_text, portfolio_skills, job_desc, llm, analyze_both, fast_mode, timer, session_token)
 
         # --- Format and Return ---
         if result:
-            formatted_result = format_string_response(result, job_desc)
-            return HTMLResponse(content=f"<div>{formatted_result}</div>")
+            with timer.stage("format"):
+                if output_format == "json":
+                    content = format_json_response(result, job_desc)
+                else:
+                    content = f"<div>{format_string_response(result, job_desc)}</div>"
+            tokens_saved = sum(value for name, value in timer.counters.items() if name.startswith("tokens_saved"))
+            cache_status = analysis_cache_status(timer)
+            incremental = incremental_status(timer)
+            log("analysis_complete", model=model_choice, inputs="both" if analyze_both else "resume" if resume_file else "portfolio",
+                stages_ms={name: round(ms, 1) for name, ms in timer.stages.items()}, tokens_saved=tokens_saved, analysis_cache=cache_status,
+                incremental=incremental)
+            headers = {"Server-Timing": timer.server_timing_header(), "X-Tokens-Saved": str(tokens_saved), "X-Analysis-Cache": cache_status}
+            if incremental:
+                headers["X-Incremental"] = incremental
+                headers["X-Incremental-Tokens-Saved"] = str(timer.counters.get("tokens_saved_incremental", 0))
+            if timer.counters.get("session_saved"):
+                headers["X-Session-Token"] = session_token # Only once there is an analysis to resubmit against
+            return content, headers
         else:
              # Should not happen if logic is correct, but handle it
              raise HTTPException(status_code=500, detail="Analysis could not be completed.")
@@ -102,9 +285,7 @@ async def analyze(
         raise he
     except Exception as e:
         # Catch broader errors (LLM issues, unexpected problems)
-        print(f"An unexpected error occurred: {e}") # Log the error server-side
-        import traceback
-        traceback.print_exc() # Print detailed traceback for debugging
+        log("analysis_failed", level="error", exc_info=True, error=str(e)) # JSON log line with the traceback
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {str(e)}")
     finally:
         # Ensure files are closed if they were opened
@@ -112,3 +293,58 @@ async def analyze(
             await resume_file.close()
         if portfolio_file:
             await portfolio_file.close()
+
+# --- Main Endpoint ---
+@router.post("/analyze/")
+async def analyze(
+    request: Request,
+    url: str = Form(...),
+    resume_file: Optional[UploadFile] = File(None),
+    portfolio_file: Optional[UploadFile] = File(None),
+    use_both: str = Form(...),  # Expecting "true" or "false" as string
+    model_choice: str = Form(...),
+    fast_mode: str = Form("false"),  # "true" answers clear mismatches without an LLM call
+    output_format: str = Form("html"),  # "json" returns the analysis as data instead of an HTML fragment
+    session_token: Optional[str] = Form(None)  # "new", then the issued token on resubmissions: only what the edit affects is regenerated
+):
+    analyze_both, use_resume, use_portfolio = validate_analysis_inputs(model_choice, use_both, resume_file, portfolio_file)
+    output_format = validate_output_format(output_format)
+    session_token = await validate_session_token(session_token)
+    try:
+        content, headers = await analyze_documents(
+            get_llm_registry(request.app), url, resume_file if use_resume else None, portfolio_file if use_portfolio else None,
+            analyze_both, model_choice, fast_mode.lower() == "true", output_format, session_token,
+        )
+    finally:
+        # The pipeline only closes the files it was given
+        for upload in (resume_file, portfolio_file):
+            if upload:
+                await upload.close()
+    if output_format == "json":
+        return JSONResponse(content=content, headers=headers)
+    return HTMLResponse(content=content, headers=headers)
+
+@router.get("/analyze/cache")
+async def analyze_cache_stats():
+    # Hit/miss counters for every cache in the process, plus requests that joined an identical in-flight analysis
+    return {"caches": cache_stats(), "analysis_shared_in_flight": analysis_flights.shared}
+
+@router.get("/analyze/parse-stats")
+async def analyze_parse_stats():
+    # How often LLM output parsed as-is, needed local repair, needed a "fix this JSON" call, or failed
+    return {"parsers": parse_stats()}
+
+@router.get("/analyze/llm-stats")
+async def analyze_llm_stats(request: Request):
+    # Per-model scheduler state: calls admitted, average queue wait, provider rate limits hit, retries and 429s
+    return {"models": get_llm_registry(request.app).scheduler_stats()}
+
+@router.get("/analyze/cascade-stats")
+async def analyze_cascade_stats():
+    # model_choice="auto": per-tier hit rates and latency, escalation reasons and estimated cost vs. the large model alone
+    return cascade_stats()
+
+@router.get("/analyze/incremental-stats")
+async def analyze_incremental_stats():
+    # Resubmissions with a session token: full re-analyses, reused and updated results, and prompt tokens saved
+    return incremental_stats()
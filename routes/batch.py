@@ -0,0 +1,188 @@
+# batch.py
+from fastapi import APIRouter, Form, UploadFile, HTTPException, File, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+import json
+import os
+import time
+from prompts.posting import preprocess_job_posting
+from utility.portfolio_csv import load_portfolio_skills
+from routes.analyze import ALLOWED_MODELS, run_analysis
+from routes.stream import buffer_uploads, close_uploads
+from utility.parse import extract_resume_info
+from utility.llm_pool import get_llm_registry
+from utility.llm_scheduler import BATCH
+from utility.cascade import resolve_models
+
+router = APIRouter()
+
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+def ndjson_line(data) -> str:
+    return json.dumps(data) + "\n"
+
+def is_portfolio_file(upload: UploadFile) -> bool:
+    # CSV uploads are portfolios, everything else goes through the resume parser (PDF/DOCX)
+    return upload.content_type == "text/csv" or (upload.filename or "").lower().endswith(".csv")
+
+async def parse_document(upload: UploadFile):
+    # Returns (resume_text, portfolio_skills) with exactly one of them set
+    if is_portfolio_file(upload):
+        return None, await load_portfolio_skills(upload)
+    resume_info = await extract_resume_info(upload)
+    return resume_info["content"], None
+
+def error_fields(e: Exception) -> dict:
+    if isinstance(e, HTTPException):
+        return {"status": "error", "status_code": e.status_code, "detail": e.detail}
+    return {"status": "error", "status_code": 500, "detail": f"An internal server error occurred: {str(e)}"}
+
+async def bounded_map(items, worker, concurrency: int):
+    # Run worker(item) with at most `concurrency` in flight and yield results in completion order.
+    # At most `concurrency` finished results wait for the reader; past that the workers block, so a
+    # slow client holds the batch back instead of results piling up in memory.
+    pending = asyncio.Queue()
+    for item in items:
+        pending.put_nowait(item)
+    finished = asyncio.Queue(maxsize=concurrency)
+
+    async def run():
+        while True:
+            try:
+                item = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await finished.put(await worker(item))
+
+    workers = [asyncio.create_task(run()) for _ in range(min(concurrency, len(items)))]
+    try:
+        for _ in range(len(items)):
+            yield await finished.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True) # So nothing still reads an upload the caller closes next
+
+async def posting_batch_events(url, uploads, posting_llm, llm, concurrency, fast_mode=False):
+    # One posting, many resumes/portfolios: extract the posting once, fan the analyses out
+    started = time.perf_counter()
+    try:
+        try:
+            job_desc = await preprocess_job_posting(url, posting_llm)
+        except Exception as e:
+            yield ndjson_line({"type": "posting", "url": url, **error_fields(e)})
+            return
+        yield ndjson_line({"type": "posting", "url": url, "status": "ok", "job": job_desc})
+
+        async def analyze_item(item):
+            index, upload = item
+            item_started = time.perf_counter()
+            line = {"type": "item", "index": index, "filename": upload.filename}
+            try:
+                resume_text, portfolio_skills = await parse_document(upload)
+                result = await run_analysis(resume_text, portfolio_skills, job_desc, llm, fast_mode=fast_mode)
+                line.update(status="ok", result=result)
+            except Exception as e:
+                line.update(error_fields(e))
+            finally:
+                await upload.close()
+            line["ms"] = round((time.perf_counter() - item_started) * 1000, 1)
+            return line
+
+        ok = 0
+        lines = bounded_map(list(enumerate(uploads)), analyze_item, concurrency)
+        try:
+            async for line in lines:
+                ok += line["status"] == "ok"
+                yield ndjson_line(line)
+        finally:
+            await lines.aclose() # Stops the workers before the uploads are closed below
+        yield ndjson_line({"type": "summary", "total": len(uploads), "ok": ok, "errors": len(uploads) - ok,
+                           "ms": round((time.perf_counter() - started) * 1000, 1)})
+    finally:
+        # Each item closes its upload once analyzed; after a failed posting or a client disconnect
+        # the ones no worker reached are still open
+        await close_uploads(*uploads)
+
+async def document_batch_events(urls, upload, posting_llm, llm, concurrency, fast_mode=False):
+    # One resume/portfolio, many postings: parse the document once, extract + analyze per URL
+    started = time.perf_counter()
+    try:
+        resume_text, portfolio_skills = await parse_document(upload)
+    except Exception as e:
+        yield ndjson_line({"type": "document", "filename": upload.filename, **error_fields(e)})
+        return
+    finally:
+        await upload.close()
+    yield ndjson_line({"type": "document", "filename": upload.filename, "status": "ok"})
+
+    async def analyze_item(item):
+        index, url = item
+        item_started = time.perf_counter()
+        line = {"type": "item", "index": index, "url": url}
+        try:
+            job_desc = await preprocess_job_posting(url, posting_llm)
+            result = await run_analysis(resume_text, portfolio_skills, job_desc, llm, fast_mode=fast_mode)
+            line.update(status="ok", job=job_desc, result=result)
+        except Exception as e:
+            line.update(error_fields(e))
+        line["ms"] = round((time.perf_counter() - item_started) * 1000, 1)
+        return line
+
+    ok = 0
+    lines = bounded_map(list(enumerate(urls)), analyze_item, concurrency)
+    try:
+        async for line in lines:
+            ok += line["status"] == "ok"
+            yield ndjson_line(line)
+    finally:
+        await lines.aclose()
+    yield ndjson_line({"type": "summary", "total": len(urls), "ok": ok, "errors": len(urls) - ok,
+                       "ms": round((time.perf_counter() - started) * 1000, 1)})
+
+@router.post("/analyze/batch")
+async def analyze_batch(
+    request: Request,
+    model_choice: str = Form(...),
+    url: Optional[str] = Form(None),  # One posting against every uploaded file
+    urls: Optional[List[str]] = Form(None),  # Or many postings against a single uploaded file
+    files: Optional[List[UploadFile]] = File(None),
+    concurrency: int = Form(BATCH_CONCURRENCY),
+    fast_mode: str = Form("false")  # Worth it for big batches: clear mismatches skip the LLM
+):
+    if model_choice not in ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid model selected. Choose one of: {', '.join(ALLOWED_MODELS)}")
+
+    uploads = [f for f in (files or []) if f and f.filename]
+    # Accept repeated urls fields or one newline-separated field
+    url_list = [u.strip() for value in (urls or []) for u in value.splitlines() if u.strip()]
+
+    if url and url_list:
+        raise HTTPException(status_code=400, detail="Send either 'url' (one posting, many files) or 'urls' (one file, many postings), not both.")
+    if url:
+        if not uploads:
+            raise HTTPException(status_code=400, detail="At least one resume or portfolio file is required.")
+        item_count = len(uploads)
+    elif url_list:
+        if len(uploads) != 1:
+            raise HTTPException(status_code=400, detail="Exactly one resume or portfolio file is required when analyzing against multiple postings.")
+        item_count = len(url_list)
+    else:
+        raise HTTPException(status_code=400, detail="Provide 'url' or 'urls'.")
+    if item_count > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large: {item_count} items, the limit is {MAX_BATCH_ITEMS}.")
+
+    concurrency = max(1, min(concurrency, BATCH_CONCURRENCY))
+    fast = fast_mode.lower() == "true"
+    posting_llm, llm = resolve_models(get_llm_registry(request.app), model_choice, priority=BATCH) # Queues behind single analyses
+    # The request's uploads are closed once we return, keep spooled copies for the stream.
+    # Any file over MAX_UPLOAD_BYTES fails the whole request with a 413 before anything is analyzed.
+    copies = await buffer_uploads(*uploads)
+
+    if url:
+        events = posting_batch_events(url, copies, posting_llm, llm, concurrency, fast)
+    else:
+        events = document_batch_events(url_list, copies[0], posting_llm, llm, concurrency, fast)
+    return StreamingResponse(events, media_type="application/x-ndjson")
@@ -0,0 +1,95 @@
+# jobs.py
+from fastapi import APIRouter, Form, UploadFile, HTTPException, File, Request
+from fastapi.responses import JSONResponse
+from typing import Optional
+import hashlib
+import json
+from prompts.posting import normalize_url
+from routes.analyze import validate_analysis_inputs, validate_output_format, validate_session_token, analyze_documents
+from routes.stream import buffer_uploads, close_uploads
+from utility.llm_pool import get_llm_registry
+from utility.jobs import get_job_queue
+
+router = APIRouter()
+
+async def upload_digest(upload: Optional[UploadFile]) -> Optional[str]:
+    if upload is None:
+        return None
+    digest = hashlib.sha256()
+    while chunk := await upload.read(64 * 1024):
+        digest.update(chunk)
+    await upload.seek(0)
+    return digest.hexdigest()
+
+def job_view(job: dict) -> dict:
+    # What a poll returns: status and timestamps, then the HTML (or JSON result) or the error once finished
+    view = {"job_id": job["id"], "status": job["status"], "created": job["created"]}
+    for field in ("started", "finished"):
+        if field in job:
+            view[field] = job[field]
+    if job["status"] == "done":
+        view.update(job["result"])
+    elif job["status"] == "error":
+        view["error"] = job["error"]
+    return view
+
+@router.post("/analyze/jobs")
+async def submit_analysis_job(
+    request: Request,
+    url: str = Form(...),
+    resume_file: Optional[UploadFile] = File(None),
+    portfolio_file: Optional[UploadFile] = File(None),
+    use_both: str = Form(...),
+    model_choice: str = Form(...),
+    fast_mode: str = Form("false"),
+    output_format: str = Form("html"),
+    session_token: Optional[str] = Form(None)
+):
+    # Same form as /analyze/, but answers right away with a job ID to poll
+    analyze_both, use_resume, use_portfolio = validate_analysis_inputs(model_choice, use_both, resume_file, portfolio_file)
+    output_format = validate_output_format(output_format)
+    session_token = await validate_session_token(session_token)
+    fast = fast_mode.lower() == "true"
+    # The request's uploads are closed once we return, the job gets spooled copies
+    resume_copy, portfolio_copy = await buffer_uploads(resume_file if use_resume else None, portfolio_file if use_portfolio else None)
+
+    # Identical submissions (same posting, file contents and options) while one is pending share it
+    payload = [normalize_url(url), await upload_digest(resume_copy), await upload_digest(portfolio_copy), analyze_both, model_choice, fast, output_format, session_token]
+    key = hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+    registry = get_llm_registry(request.app)
+
+    async def run():
+        content, headers = await analyze_documents(registry, url, resume_copy, portfolio_copy, analyze_both, model_choice, fast, output_format, session_token)
+        result = {"html" if output_format == "html" else "result": content,
+                  "server_timing": headers["Server-Timing"], "analysis_cache": headers["X-Analysis-Cache"]}
+        if "X-Incremental" in headers:
+            result["incremental"] = {"mode": headers["X-Incremental"], "tokens_saved": int(headers["X-Incremental-Tokens-Saved"])}
+        if "X-Session-Token" in headers:
+            result["session_token"] = headers["X-Session-Token"]
+        return result
+
+    try:
+        job, deduplicated = await get_job_queue(request.app).submit(key, run)
+    except BaseException:
+        await close_uploads(resume_copy, portfolio_copy) # Rejected (queue full, store down)
+        raise
+    if deduplicated:
+        await close_uploads(resume_copy, portfolio_copy)
+    location = f"/analyze/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["id"], "status": job["status"], "deduplicated": deduplicated, "poll": location},
+        headers={"Location": location},
+    )
+
+@router.get("/analyze/jobs")
+async def analysis_job_stats(request: Request):
+    # Queue depth, running jobs and outcome counters for this process
+    return get_job_queue(request.app).stats()
+
+@router.get("/analyze/jobs/{job_id}")
+async def get_analysis_job(request: Request, job_id: str):
+    job = await get_job_queue(request.app).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job ID.")
+    return job_view(job)
@@ -0,0 +1,68 @@
+# metrics.py
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from utility.observability import register_collector, render_metrics
+from utility.cache import cache_stats
+from utility.llm_json import parse_stats
+from utility.cascade import CASCADE_STATS
+from utility.llm_pool import get_llm_registry
+from utility.fetch import FETCH_STATS
+from utility.jobs import get_job_queue
+
+router = APIRouter()
+
+
+def collect_caches(app):
+    stats = cache_stats()
+    yield ("cache_requests_total", "counter", "Cache lookups by cache and result (hit, shared_hit, miss); shared hits are also counted as hits.",
+           [({"cache": name, "result": result}, cache[key]) for name, cache in stats.items()
+            for result, key in (("hit", "hits"), ("shared_hit", "shared_hits"), ("miss", "misses"))])
+    yield ("cache_entries", "gauge", "Entries held in memory per cache.",
+           [({"cache": name}, cache["entries"]) for name, cache in stats.items()])
+    yield ("cache_backend_errors_total", "counter", "Failed shared-tier operations per cache (served as misses).",
+           [({"cache": name, "backend": cache["backend"]}, cache["backend_errors"]) for name, cache in stats.items() if "backend" in cache])
+    yield ("cache_evictions_total", "counter", "Entries evicted from the shared sqlite tier to stay under CACHE_MAX_BYTES.",
+           [({"cache": name}, cache["evictions"]) for name, cache in stats.items() if "evictions" in cache])
+    yield ("page_fetches_total", "counter", "Job-page fetches by outcome (downloaded, not_modified, too_large, timeouts, errors).",
+           [({"outcome": outcome}, count) for outcome, count in FETCH_STATS.items() if outcome != "bytes"])
+    yield ("page_fetch_bytes_total", "counter", "Job-page body bytes downloaded.", [({}, FETCH_STATS["bytes"])])
+
+
+def collect_llm(app):
+    schedulers = get_llm_registry(app).scheduler_stats() if app is not None else {}
+    for name, key, kind, help_text in (
+        ("llm_queue_waiting", "waiting", "gauge", "LLM calls waiting for a slot, per model."),
+        ("llm_in_flight", "active", "gauge", "LLM calls in flight, per model."),
+        ("llm_rate_limited_total", "rate_limited", "counter", "Provider 429/503 responses, per model."),
+        ("llm_retries_total", "retries", "counter", "LLM calls retried after back-off, per model."),
+        ("llm_rejected_total", "rejected", "counter", "LLM calls rejected with 429 because the queue deadline couldn't be met."),
+    ):
+        yield name, kind, help_text, [({"model": model}, stats[key]) for model, stats in schedulers.items()]
+    yield ("llm_json_outputs_total", "counter", "LLM JSON outputs by type and outcome (ok, repaired, fixed_by_retry, failed).",
+           [({"output": what, "outcome": outcome}, count) for what, counts in parse_stats().items()
+            for outcome, count in counts.items() if outcome in ("ok", "repaired", "fixed_by_retry", "failed")])
+    yield ("cascade_calls_total", "counter", "model_choice=auto analysis calls per tier.",
+           [({"tier": tier}, stats["calls"]) for tier, stats in CASCADE_STATS["tiers"].items()])
+    yield ("cascade_escalations_total", "counter", "model_choice=auto escalations to the large model, by reason.",
+           [({"reason": reason}, count) for reason, count in CASCADE_STATS["escalations"].items()])
+
+
+def collect_jobs(app):
+    if app is None:
+        return
+    stats = get_job_queue(app).stats()
+    yield "jobs_queued", "gauge", "/analyze/jobs jobs waiting for a worker in this process.", [({}, stats["queued"])]
+    yield "jobs_running", "gauge", "/analyze/jobs jobs running in this process.", [({}, stats["running"])]
+    yield ("jobs_total", "counter", "/analyze/jobs submissions by outcome (submitted, deduplicated, rejected, done, failed).",
+           [({"outcome": outcome}, stats[outcome]) for outcome in ("submitted", "deduplicated", "rejected", "done", "failed")])
+
+
+register_collector(collect_caches)
+register_collector(collect_llm)
+register_collector(collect_jobs)
+
+
+@router.get("/metrics")
+async def metrics(request: Request):
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(request.app), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,181 @@
+# stream.py
+from fastapi import APIRouter, Form, UploadFile, HTTPException, File, Request
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile as BufferedUploadFile
+from typing import Optional
+from tempfile import SpooledTemporaryFile
+import asyncio
+import json
+from prompts.posting import preprocess_job_posting
+from prompts.combined import build_combined_analysis_prompt
+from prompts.resume import build_resume_analysis_prompt
+from prompts.portfolio import build_portfolio_analysis_prompt
+from routes.analyze import validate_analysis_inputs, parse_inputs, compact_resume_for_prompt, analysis_cache, analysis_cache_key
+from utility.format import format_string_response, format_job_details_section, format_stream_section
+from utility.stream_json import IncrementalJSONObject
+from utility.llm_json import parse_llm_json, validate_output
+from utility.parse import MAX_UPLOAD_BYTES
+from prompts.schemas import AnalysisResult
+from utility.timing import StageTimer
+from utility.llm_pool import get_llm_registry
+from utility.cascade import ModelCascade, resolve_models
+from utility.observability import log
+from utility.skills import match_skills, is_clearly_unsuitable, fast_mode_result, apply_skill_match, is_authoritative
+
+router = APIRouter()
+
+UPLOAD_SPOOL_BYTES = 1024 * 1024 # Same threshold Starlette uses for form uploads
+
+# Computed by utility.skills before the LLM starts, so these sections go out first
+LOCAL_KEYS = ("Suitability", "Matched Skills")
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def buffer_upload(upload: Optional[UploadFile]):
+    # FastAPI closes form uploads when the endpoint returns, before a streamed body runs,
+    # so keep a copy the generator can parse later. Small files stay in memory, big ones spill to disk.
+    # The size cap is enforced while copying, so an oversized file is never copied in full.
+    if not upload:
+        return None
+    await upload.seek(0)
+    copy = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    size = 0
+    while chunk := await upload.read(64 * 1024):
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            copy.close()
+            raise HTTPException(status_code=413, detail=f"File too large. The limit is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+        copy.write(chunk)
+    copy.seek(0)
+    return BufferedUploadFile(file=copy, filename=upload.filename, headers=upload.headers)
+
+async def buffer_uploads(*uploads):
+    # buffer_upload for each; if one fails (too large), the copies already made are closed
+    copies = []
+    try:
+        for upload in uploads:
+            copies.append(await buffer_upload(upload))
+    except BaseException:
+        await close_uploads(*copies)
+        raise
+    return copies
+
+async def close_uploads(*uploads):
+    # Spooled copies nothing is going to read any more (skips the None placeholders)
+    for upload in uploads:
+        if upload:
+            await upload.close()
+
+def build_analysis_prompt(analyze_both: bool, resume_text, portfolio_skills, job_desc, skill_match=None) -> str:
+    if analyze_both:
+        return build_combined_analysis_prompt(resume_text, portfolio_skills, job_desc, skill_match)
+    if resume_text is not None:
+        return build_resume_analysis_prompt(resume_text, job_desc, skill_match)
+    return build_portfolio_analysis_prompt(portfolio_skills, job_desc, skill_match)
+
+async def analysis_events(url, posting_llm, llm, analyze_both, resume_file, portfolio_file, fast_mode=False):
+    # Event order: stage (posting / document, whichever finishes first), section (job details),
+    # token + section while the LLM streams, then done with the canonical fragment.
+    timer = StageTimer()
+    posting_task = asyncio.create_task(timer.timed("posting", preprocess_job_posting(url, posting_llm, timer)))
+    parse_task = asyncio.create_task(timer.timed("parse", parse_inputs(resume_file, portfolio_file)))
+    try:
+        pending = {posting_task, parse_task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is posting_task:
+                    job_desc = task.result()
+                    yield sse_event("stage", {"stage": "posting", "ms": round(timer.stages.get("posting", 0), 1), "role": job_desc.get("role")})
+                    yield sse_event("section", {"key": "Job Details", "html": format_job_details_section(job_desc)})
+                else:
+                    resume_text, portfolio_skills = task.result()
+                    yield sse_event("stage", {"stage": "document", "ms": round(timer.stages.get("parse", 0), 1)})
+
+        # The deterministic sections don't need the LLM, send them right away
+        skill_match = match_skills(job_desc.get("skills", []), resume_text=resume_text, portfolio_skills=portfolio_skills)
+        # A posting without skills has no local verdict; those sections then come from the LLM like the rest
+        local_keys = LOCAL_KEYS if is_authoritative(skill_match) else ()
+        for key in local_keys:
+            yield sse_event("section", {"key": key, "html": format_stream_section(key, skill_match[key], skill_match)})
+
+        cache_key = analysis_cache_key(job_desc, resume_text, portfolio_skills, getattr(llm, "model_name", ""), analyze_both)
+        if fast_mode and is_clearly_unsuitable(skill_match):
+            result = fast_mode_result(skill_match)
+            for key in ("Reasons for Unsuitability", "Suggestions"):
+                yield sse_event("section", {"key": key, "html": format_stream_section(key, result[key], result)})
+        elif (cached := await analysis_cache.aget(cache_key)) is not None:
+            # Same document, posting and model as an earlier analysis: replay its sections, no LLM call
+            timer.count("analysis_cache_hit", 1)
+            result = dict(cached)
+            for key, value in result.items():
+                html = format_stream_section(key, value, result) if key not in local_keys else None
+                if html:
+                    yield sse_event("section", {"key": key, "html": html})
+        else:
+            timer.count("analysis_cache_miss", 1)
+            if isinstance(llm, ModelCascade):
+                llm = llm.pick(skill_match) # Streamed tokens can't be retracted, so the tier is chosen up front
+            prompt_resume = compact_resume_for_prompt(resume_text, llm, analyze_both, timer)
+            formatted_prompt = build_analysis_prompt(analyze_both, prompt_resume, portfolio_skills, job_desc, skill_match)
+            parser = IncrementalJSONObject()
+            with timer.stage("analysis"):
+                async for chunk in llm.astream(formatted_prompt):
+                    token = chunk.content
+                    if not token:
+                        continue
+                    yield sse_event("token", {"text": token})
+                    for key, value in parser.feed(token):
+                        html = format_stream_section(key, value, parser.result) if key not in local_keys else None
+                        if html:
+                            yield sse_event("section", {"key": key, "html": html})
+
+            result = None
+            if parser.done:
+                try:
+                    result = validate_output(parser.result, AnalysisResult)
+                except ValueError: # Well-formed JSON the schema rejects (ValidationError is a ValueError)
+                    pass
+            if result is None:
+                # Truncated, malformed or invalid stream: repair locally, else one "fix this JSON" call
+                result = await parse_llm_json(parser.buffer, AnalysisResult, llm, "streamed analysis")
+            result = apply_skill_match(result, skill_match)
+            await analysis_cache.aset(cache_key, result)
+
+        with timer.stage("format"):
+            formatted_result = format_string_response(result, job_desc)
+        yield sse_event("done", {"html": f"<div>{formatted_result}</div>", "timings": timer.stages, "counters": timer.counters})
+
+    except HTTPException as he:
+        yield sse_event("error", {"status": he.status_code, "detail": he.detail})
+    except Exception as e:
+        log("stream_failed", level="error", exc_info=True, error=str(e))
+        yield sse_event("error", {"status": 500, "detail": f"An internal server error occurred: {str(e)}"})
+    finally:
+        for task in (posting_task, parse_task):
+            if not task.done():
+                task.cancel()
+        await close_uploads(resume_file, portfolio_file) # Our spooled copies, not the request's originals
+
+@router.post("/analyze/stream")
+async def analyze_stream(
+    request: Request,
+    url: str = Form(...),
+    resume_file: Optional[UploadFile] = File(None),
+    portfolio_file: Optional[UploadFile] = File(None),
+    use_both: str = Form(...),  # Expecting "true" or "false" as string
+    model_choice: str = Form(...),
+    fast_mode: str = Form("false")
+):
+    # Validation errors still come back as regular 400s, before the stream starts
+    analyze_both, use_resume, use_portfolio = validate_analysis_inputs(model_choice, use_both, resume_file, portfolio_file)
+    posting_llm, llm = resolve_models(get_llm_registry(request.app), model_choice)
+
+    resume_copy, portfolio_copy = await buffer_uploads(resume_file if use_resume else None, portfolio_file if use_portfolio else None)
+
+    return StreamingResponse(
+        analysis_events(url, posting_llm, llm, analyze_both, resume_copy, portfolio_copy, fast_mode.lower() == "true"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # Don't let proxies buffer the stream
+    )
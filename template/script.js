@@ -31,6 +31,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const urlInput = document.getElementById('url');
     const modelChoiceSelect = document.getElementById('modelChoice');
     const useBothCheckbox = document.getElementById('useBoth');
+    const fastModeCheckbox = document.getElementById('fastMode');
     const submitButton = document.getElementById('submitButton');
     const buttonText = document.getElementById('buttonText');
     const buttonLoader = document.getElementById('buttonLoader');
@@ -142,37 +143,93 @@ document.addEventListener('DOMContentLoaded', () => {
         if (resumeInput.files[0]) formData.append('resume_file', resumeInput.files[0]);
         if (portfolioInput.files[0]) formData.append('portfolio_file', portfolioInput.files[0]);
         formData.append('use_both', useBothCheckbox.checked ? 'true' : 'false');
+        formData.append('fast_mode', fastModeCheckbox.checked ? 'true' : 'false');
         formData.append('model_choice', modelChoiceSelect.value);
 
         try {
-            const response = await axios.post('http://127.0.0.1:8000/analyze/', formData, {
-                // timeout: 90000 // Longer timeout might be needed
-            });
-
-            // Inject and animate results
-            resultDiv.innerHTML = processResultHtml(response.data); // Process HTML before injecting
-            // Delay slightly before adding class to ensure transition works
-            setTimeout(() => {
-                 resultDiv.style.display = 'block'; // Make sure it's visible before animating
-                 resultDiv.classList.add('is-active');
-                 resultDiv.scrollIntoView({ behavior: 'smooth', block: 'start' });
-            }, 100);
-
-
+            await streamAnalysis(formData);
         } catch (err) {
-            const message = err.response?.data?.detail || err.message || 'An unexpected error occurred.';
+            const message = err.detail || err.message || 'An unexpected error occurred.';
             errorMessageSpan.textContent = message;
             errorDiv.classList.add('is-active');
              errorDiv.scrollIntoView({ behavior: 'smooth', block: 'center' });
-            console.error("Analysis Error:", err.response || err);
+            console.error("Analysis Error:", err);
         } finally {
             // Hide loading state
             submitButton.classList.remove('is-loading');
             submitButton.disabled = false;
             loadingOverlay.classList.remove('is-active');
+            loadingText.textContent = defaultLoadingText;
         }
     });
 
+    // --- Streaming Analysis (SSE over POST) ---
+    // Sections are rendered as soon as the backend finishes each one, in this order on screen
+    const SECTION_ORDER = ['Suitability', 'Job Details', 'Matched Skills', 'Interview Questions',
+        'Behavioral Questions', 'Reasons for Unsuitability', 'Suggestions'];
+    const loadingText = loadingOverlay.querySelector('p');
+    const defaultLoadingText = loadingText.textContent;
+
+    const showResult = (html) => {
+        resultDiv.innerHTML = processResultHtml(html); // Process HTML before injecting
+        if (!resultDiv.classList.contains('is-active')) {
+            resultDiv.style.display = 'block'; // Make sure it's visible before animating
+            // Delay slightly before adding class to ensure transition works
+            setTimeout(() => resultDiv.classList.add('is-active'), 100);
+            // First meaningful content is on screen, the overlay would only hide it now
+            loadingOverlay.classList.remove('is-active');
+        }
+    };
+
+    async function streamAnalysis(formData) {
+        const response = await fetch('http://127.0.0.1:8000/analyze/stream', { method: 'POST', body: formData });
+        if (!response.ok) {
+            const body = await response.json().catch(() => ({}));
+            throw { detail: body.detail || `Request failed with status ${response.status}` };
+        }
+
+        const sections = {};
+        const renderSections = () => {
+            const html = SECTION_ORDER.filter(key => sections[key]).map(key => sections[key]).join('');
+            showResult(`<div class="analysis-result">${html}</div>`);
+        };
+
+        const handleEvent = (event, data) => {
+            if (event === 'stage') {
+                loadingText.textContent = data.stage === 'posting' ? 'Job posting extracted...' : 'Document parsed...';
+            } else if (event === 'section') {
+                sections[data.key] = data.html;
+                renderSections();
+            } else if (event === 'done') {
+                showResult(data.html); // Canonical fragment replaces the progressive one
+                resultDiv.scrollIntoView({ behavior: 'smooth', block: 'start' });
+            } else if (event === 'error') {
+                throw { detail: data.detail };
+            }
+        };
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (data) handleEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
     // Dismiss error notification
     errorDiv.querySelector('.close-button').addEventListener('click', () => {
         errorDiv.classList.remove('is-active');
@@ -0,0 +1,114 @@
+# test_analysis_cache.py
+# Full analyses are cached by content, and identical requests already in flight share one LLM call.
+import asyncio
+import pytest
+import routes.analyze as analyze
+from benchmarks.stubs import JOB_JSON, StubLLM
+from routes.analyze import analysis_cache_key, run_analysis
+from utility.cache import SingleFlight
+
+RESUME = "Jane Doe\nSkills\nPython, FastAPI, PostgreSQL, Docker\nExperience\nBackend Engineer at Acme"
+
+
+def counting(result="done", delay=0.05, error=None):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return compute, calls
+
+
+def test_single_flight_shares_one_computation():
+    flights = SingleFlight()
+    compute, calls = counting()
+
+    async def main():
+        return await asyncio.gather(*(flights.run("key", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert [result for result, _ in results] == ["done"] * 5
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert len(calls) == 1 and flights.shared == 4
+
+
+def test_single_flight_keys_and_later_calls_run_separately():
+    flights = SingleFlight()
+    compute, calls = counting()
+
+    async def main():
+        await asyncio.gather(flights.run("a", compute), flights.run("b", compute))
+        return await flights.run("a", compute) # The earlier flight is over; nothing is remembered
+
+    assert asyncio.run(main()) == ("done", False)
+    assert len(calls) == 3
+
+
+def test_single_flight_shares_errors_but_does_not_remember_them():
+    flights = SingleFlight()
+    failing, failed_calls = counting(error=ValueError("boom"))
+    compute, calls = counting()
+
+    async def main():
+        results = await asyncio.gather(*(flights.run("key", failing) for _ in range(3)), return_exceptions=True)
+        return results, await flights.run("key", compute)
+
+    results, retry = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(failed_calls) == 1
+    assert retry == ("done", False) and len(calls) == 1
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    flights = SingleFlight()
+    compute, calls = counting(delay=0.1)
+
+    async def main():
+        first = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel() # A client that disconnected
+        return await second
+
+    assert asyncio.run(main()) == ("done", True)
+    assert len(calls) == 1
+
+
+def test_cache_key_is_content_based():
+    job = {"role": "Backend Engineer", "skills": ["Python"], "description": "APIs"}
+    reordered = {"description": "APIs", "skills": ["Python"], "role": "Backend Engineer"}
+    key = analysis_cache_key(job, RESUME, None, "llama-3.3-70b-versatile", False)
+    assert key == analysis_cache_key(reordered, RESUME, None, "llama-3.3-70b-versatile", False)
+    assert key != analysis_cache_key(job, RESUME + ".", None, "llama-3.3-70b-versatile", False)
+    assert key != analysis_cache_key(job, RESUME, None, "llama-3.1-8b-instant", False)
+    assert key != analysis_cache_key(job, RESUME, None, "llama-3.3-70b-versatile", True)
+    assert key != analysis_cache_key(job, None, RESUME, "llama-3.3-70b-versatile", False)
+
+
+@pytest.fixture
+def empty_cache():
+    analyze.analysis_cache.clear()
+    yield
+    analyze.analysis_cache.clear()
+
+
+def test_repeated_and_concurrent_analyses_call_the_llm_once(empty_cache):
+    llm = StubLLM(latency=0.05)
+
+    async def main():
+        together = await asyncio.gather(*(run_analysis(RESUME, None, dict(JOB_JSON), llm) for _ in range(3)))
+        together[0]["Suitability"] = "mutated by the caller"
+        again = await run_analysis(RESUME, None, dict(JOB_JSON), llm)
+        return together, again
+
+    together, again = asyncio.run(main())
+    assert llm.calls == 1
+    assert together[1] == together[2] == again
+    assert again["Suitability"] != "mutated by the caller"
+    other_model = StubLLM(latency=0, model_name="other")
+    asyncio.run(run_analysis(RESUME, None, dict(JOB_JSON), other_model))
+    assert other_model.calls == 1
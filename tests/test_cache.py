@@ -0,0 +1,143 @@
+# test_cache.py
+# The in-process LRU and the shared tiers behind it: TTLs, size-based eviction, promotion of shared hits,
+# and a failing shared tier counting as a miss.
+import asyncio
+import time
+import pytest
+import utility.cache as cache
+from benchmarks.resp_server import start_server
+from utility.cache import LRUCache, RedisCache, SQLiteCache, TieredCache
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1 # "a" is now the most recently used
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c"), len(lru)) == (1, 3, 2)
+
+
+def test_lru_ttl():
+    lru = LRUCache(maxsize=10, ttl=0.2)
+    lru.set("default", 1)
+    lru.set("short", 2, ttl=0.05)
+    lru.set("forever", 3, ttl=0) # 0 turns the TTL off for this entry
+    time.sleep(0.1)
+    assert lru.get("short", "gone") == "gone"
+    assert lru.get("default") == 1
+    time.sleep(0.15)
+    assert lru.get("default") is None
+    assert lru.get("forever") == 3 and len(lru) == 1
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    store = SQLiteCache(str(tmp_path / "cache.db"), "test", max_bytes=10_000)
+    yield store
+    store.close()
+
+
+def test_sqlite_round_trip_and_ttl(sqlite_cache):
+    sqlite_cache.set("job", {"role": "Engineer", "skills": ["Python"]}, ttl=0.2)
+    sqlite_cache.set("short", "x", ttl=0.05)
+    sqlite_cache.set("forever", "y")
+    assert sqlite_cache.get("job") == {"role": "Engineer", "skills": ["Python"]}
+    time.sleep(0.1)
+    assert sqlite_cache.get("short", "gone") == "gone"
+    assert sqlite_cache.get("job")["role"] == "Engineer"
+    time.sleep(0.15)
+    assert sqlite_cache.get("job") is None
+    assert sqlite_cache.get("forever") == "y"
+
+
+def test_sqlite_evicts_least_recently_used_over_the_cap(sqlite_cache, monkeypatch):
+    monkeypatch.setattr(cache, "TOUCH_INTERVAL", 0) # Every read refreshes last-used
+    for i in range(40): # ~400 bytes each, well over the 10 kB cap in total
+        sqlite_cache.set(f"k{i}", "v" * 400)
+        if i >= 1:
+            sqlite_cache.get("k0") # Keep the first entry in use
+    assert sqlite_cache.evictions > 0
+    total = sqlite_cache._conn.execute("SELECT SUM(size) FROM test").fetchone()[0]
+    assert total <= sqlite_cache.max_bytes
+    assert sqlite_cache.get("k0") is not None
+    assert sqlite_cache.get("k1") is None
+    assert sqlite_cache.get("k39") is not None
+
+
+def test_sqlite_skips_oversized_values(sqlite_cache, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_VALUE_BYTES", 100)
+    sqlite_cache.set("big", "x" * 200)
+    assert sqlite_cache.get("big") is None
+
+
+def test_sqlite_is_shared_between_connections(tmp_path):
+    # Two workers on one host open the same file
+    first = SQLiteCache(str(tmp_path / "cache.db"), "shared")
+    second = SQLiteCache(str(tmp_path / "cache.db"), "shared")
+    first.set("k", [1, 2])
+    assert second.get("k") == [1, 2]
+    first.close()
+    second.close()
+
+
+def test_redis_round_trip_and_ttl():
+    server, url = start_server()
+    try:
+        store = RedisCache(url, "test", ttl=60)
+        store.set("job", {"role": "Engineer"})
+        store.set("short", "x", ttl=0.05)
+        assert store.get("job") == {"role": "Engineer"}
+        time.sleep(0.1)
+        assert store.get("short") is None
+        store.clear()
+        assert store.get("job") is None
+        store.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_tiered_promotes_shared_hits(tmp_path):
+    shared = SQLiteCache(str(tmp_path / "cache.db"), "tiered")
+    writer = TieredCache(LRUCache(), shared)
+    reader = TieredCache(LRUCache(), shared) # Another worker: empty memory tier, same shared tier
+
+    async def main():
+        await writer.aset("k", "v")
+        return await reader.aget("k"), await reader.aget("k")
+
+    assert asyncio.run(main()) == ("v", "v")
+    assert reader.stats()["shared_hits"] == 1 and reader.stats()["hits"] == 2
+    assert reader.memory.get("k") == "v"
+    shared.close()
+
+
+class BrokenTier:
+    name = "broken"
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key, default=None):
+        self.calls += 1
+        raise ConnectionError("down")
+
+    def set(self, key, value, ttl=None):
+        self.calls += 1
+        raise ConnectionError("down")
+
+
+def test_failing_shared_tier_is_a_miss_and_skipped_for_a_while():
+    shared = BrokenTier()
+    tiered = TieredCache(LRUCache(), shared)
+
+    async def main():
+        first = await tiered.aget("k", "default")
+        await tiered.aset("k", "v") # Still stored in memory
+        return first, await tiered.aget("k"), await tiered.aget("other")
+
+    assert asyncio.run(main()) == ("default", "v", None)
+    assert shared.calls == 1 # Skipped for CACHE_RETRY_AFTER seconds after the first error
+    assert tiered.stats()["backend_errors"] == 1
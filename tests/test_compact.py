@@ -0,0 +1,42 @@
+# test_compact.py
+# normalize_resume_text runs on every resume before it is budgeted and before the section diff, so anything it
+# drops never reaches the model.
+from utility.compact import normalize_resume_text
+
+
+def pdf(*pages):
+    # utility/parse.py parse_pdf separates pages with a form feed
+    return "\f".join("\n".join(page) for page in pages)
+
+
+def test_repeated_content_lines_are_kept():
+    text = "\n".join([
+        "Experience",
+        "Backend Engineer, Acme", "Remote", "Python", "- Built the billing API",
+        "Data Engineer, Globex", "Remote", "Python", "- Ran the Spark pipelines",
+        "Platform Engineer, Initech", "Remote", "Python", "- Moved CI to GitHub Actions",
+    ])
+    assert normalize_resume_text(text) == text
+
+
+def test_page_numbers_are_dropped():
+    text = pdf(["Jane Doe", "Skills", "Python", "Page 1 of 2"], ["Experience", "Acme", "2"])
+    assert normalize_resume_text(text) == "Jane Doe\nSkills\nPython\nExperience\nAcme"
+
+
+def test_running_headers_and_footers_are_dropped():
+    header, footer = "Jane Doe - Resume", "jane@example.com | +1 555 0100"
+    text = pdf(
+        [header, "Summary", "Backend engineer", "Experience", "Acme", "Remote", "- Built the billing API", footer, "1"],
+        [header, "Globex", "Remote", "- Ran the Spark pipelines", footer, "2"],
+        [header, "Education", "BSc Computer Science", footer, "3"],
+    )
+    lines = normalize_resume_text(text).splitlines()
+    assert header not in lines and footer not in lines
+    assert lines == ["Summary", "Backend engineer", "Experience", "Acme", "Remote", "- Built the billing API",
+                     "Globex", "Remote", "- Ran the Spark pipelines", "Education", "BSc Computer Science"]
+
+
+def test_first_line_of_a_single_page_is_kept():
+    text = "Jane Doe\nBackend engineer\n\n\nSkills:   Python,  Go\nJane Doe"
+    assert normalize_resume_text(text) == "Jane Doe\nBackend engineer\n\nSkills: Python, Go\nJane Doe"
@@ -0,0 +1,60 @@
+# test_embeddings.py
+# The precomputed skill matrix at SKILL_VECTORS_PATH is reused across restarts, and rebuilt when the
+# vocabulary it was built from has changed.
+import json
+import pytest
+import utility.embeddings as embeddings
+import utility.skills as skills
+from utility.embeddings import get_vocabulary, labels_path
+
+
+@pytest.fixture
+def vectors(tmp_path, monkeypatch):
+    # Path of the .npy; builds counts every time the matrix is written
+    path, builds = str(tmp_path / "skill_vectors.npy"), []
+    save = embeddings.save_vocabulary
+
+    def save_vocabulary(*args):
+        builds.append(args[0])
+        save(*args)
+    monkeypatch.setattr(embeddings, "save_vocabulary", save_vocabulary)
+    monkeypatch.setattr(embeddings, "SKILL_VECTORS_PATH", path)
+    monkeypatch.setattr(embeddings, "SKILL_VOCAB_FILE", None)
+    monkeypatch.setattr(skills, "SKILL_SYNONYMS", {"PostgreSQL": ["postgres"], "Python": []})
+    monkeypatch.setattr(embeddings, "_vocabulary", None)
+    yield path, builds
+    embeddings._vocabulary = None
+
+
+def restart():
+    # A new worker: nothing in memory, only the files on disk
+    embeddings._vocabulary = None
+    return get_vocabulary()
+
+
+def test_matrix_is_built_once_and_reused(vectors):
+    path, builds = vectors
+    assert restart().labels == ["PostgreSQL", "PostgreSQL", "Python"]
+    assert restart().labels == ["PostgreSQL", "PostgreSQL", "Python"]
+    assert builds == [path]
+
+
+def test_changed_vocabulary_rebuilds_the_matrix(vectors, monkeypatch):
+    path, builds = vectors
+    restart()
+    monkeypatch.setattr(skills, "SKILL_SYNONYMS", {"PostgreSQL": ["postgres"], "Python": [], "Kafka": ["apache kafka"]})
+    vocabulary = restart()
+    assert len(builds) == 2
+    assert "Kafka" in vocabulary.labels and vocabulary.matrix.shape[0] == len(vocabulary.labels)
+
+
+def test_matrix_without_a_vocabulary_hash_is_rebuilt(vectors):
+    path, builds = vectors
+    restart()
+    with open(labels_path(path), encoding="utf-8") as f:
+        meta = json.load(f)
+    del meta["vocab_hash"] # Written before the hash was stored
+    with open(labels_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    restart()
+    assert len(builds) == 2
@@ -0,0 +1,57 @@
+# test_executor.py
+# A document that times out takes its worker down; the other documents parsing in that pool shouldn't
+# fail with it. Uses builtins as tasks, since the workers have to unpickle them.
+import asyncio
+import os
+import time
+import pytest
+import utility.executor as executor
+
+
+@pytest.fixture
+def two_workers(monkeypatch):
+    monkeypatch.setattr(executor, "PARSE_WORKERS", 2)
+    monkeypatch.setattr(executor, "PARSE_WARM_MODULES", ())
+    yield
+    executor.shutdown_executor()
+
+
+async def timed(coro):
+    started = time.monotonic()
+    try:
+        return await coro, time.monotonic() - started
+    except Exception as e:
+        return e, time.monotonic() - started
+
+
+def test_timeout_spares_the_other_running_tasks(two_workers):
+    async def main():
+        await executor.warm_process_pool()
+        old = executor.get_process_pool()
+        stuck, other = await asyncio.gather(
+            timed(executor.run_in_process(time.sleep, 5, timeout=0.5)),
+            timed(executor.run_in_process(time.sleep, 1.5, timeout=5, retries=0)),
+        )
+        pid = await executor.run_in_process(os.getpid)
+        return old, stuck, other, pid
+
+    old, (stuck, stuck_s), (other, _), pid = asyncio.run(main())
+    assert isinstance(stuck, TimeoutError) and stuck_s < 1
+    assert other is None # Finished on the old pool instead of failing with BrokenProcessPool
+    assert executor.get_process_pool() is not old
+    assert pid not in (old._processes or {})
+
+
+def test_retired_pool_is_killed_once_its_tasks_finish(two_workers):
+    async def main():
+        await executor.warm_process_pool()
+        old = executor.get_process_pool()
+        processes = list(old._processes.values())
+        await asyncio.gather(executor.run_in_process(time.sleep, 30, timeout=0.5),
+                             executor.run_in_process(time.sleep, 1, timeout=5), return_exceptions=True)
+        await asyncio.sleep(0.5)
+        return processes
+
+    processes = asyncio.run(main())
+    assert not any(process.is_alive() for process in processes)
+    assert not executor._retiring and not executor._in_flight.get(executor._process_pool)
@@ -0,0 +1,116 @@
+# test_fetch.py
+# Job pages are revalidated with If-None-Match / If-Modified-Since; a 304 reuses the text extracted from
+# the cached version instead of downloading and parsing the page again.
+import asyncio
+import httpx
+import pytest
+import utility.fetch as fetch
+from utility.fetch import PageTooLarge, decode_html, fetch_page_text, read_capped
+
+PAGE = "<html><body><main><h1>Backend Engineer</h1><p>We need Python and FastAPI.</p></main></body></html>"
+
+
+class Site:
+    # One page whose version (ETag) and Last-Modified the test controls; records each request's headers
+    def __init__(self, etag='"v1"', last_modified=None, body=PAGE):
+        self.etag, self.last_modified, self.body = etag, last_modified, body
+        self.requests = []
+        self.extracted = [] # HTML that went through extract_job_text
+
+    def handle(self, request: httpx.Request):
+        self.requests.append(request.headers)
+        headers = {"content-type": "text/html; charset=utf-8"}
+        if self.etag:
+            headers["etag"] = self.etag
+            if request.headers.get("if-none-match") == self.etag:
+                return httpx.Response(304, headers=headers)
+        if self.last_modified:
+            headers["last-modified"] = self.last_modified
+            if request.headers.get("if-modified-since") == self.last_modified:
+                return httpx.Response(304, headers=headers)
+        return httpx.Response(200, content=self.body.encode(), headers=headers)
+
+
+@pytest.fixture
+def site(monkeypatch):
+    site = Site()
+
+    def extract_job_text(html):
+        site.extracted.append(html)
+        return f"text of {len(html)} chars: " + html[html.index("<h1>") + 4:html.index("</h1>")]
+    monkeypatch.setattr(fetch, "extract_job_text", extract_job_text)
+    monkeypatch.setattr(fetch, "_client", httpx.AsyncClient(transport=httpx.MockTransport(site.handle)))
+    fetch.validator_cache.clear()
+    yield site
+    fetch.validator_cache.clear()
+
+
+def fetch_twice(url="https://jobs.example.com/1"):
+    async def main():
+        return await fetch_page_text(url), await fetch_page_text(url)
+    return asyncio.run(main())
+
+
+def test_unchanged_page_is_revalidated_not_downloaded(site):
+    before = dict(fetch.FETCH_STATS)
+    first, second = fetch_twice()
+    assert first == second and "Backend Engineer" in first
+    assert "if-none-match" not in site.requests[0]
+    assert site.requests[1]["if-none-match"] == '"v1"'
+    assert len(site.extracted) == 1
+    assert fetch.FETCH_STATS["not_modified"] - before["not_modified"] == 1
+    assert fetch.FETCH_STATS["downloaded"] - before["downloaded"] == 1
+
+
+def test_changed_page_is_downloaded_again(site):
+    async def main():
+        first = await fetch_page_text("https://jobs.example.com/1")
+        site.etag, site.body = '"v2"', PAGE.replace("Backend", "Frontend")
+        second = await fetch_page_text("https://jobs.example.com/1")
+        third = await fetch_page_text("https://jobs.example.com/1")
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert "Backend" in first and "Frontend" in second and third == second
+    assert [headers.get("if-none-match") for headers in site.requests] == [None, '"v1"', '"v2"']
+    assert len(site.extracted) == 2
+
+
+def test_last_modified_is_sent_back(site):
+    site.etag, site.last_modified = None, "Wed, 01 Oct 2025 10:00:00 GMT"
+    first, second = fetch_twice()
+    assert first == second
+    assert site.requests[1]["if-modified-since"] == site.last_modified
+    assert len(site.extracted) == 1
+
+
+def test_pages_without_validators_are_always_downloaded(site):
+    site.etag = None
+    fetch_twice()
+    assert all("if-none-match" not in h and "if-modified-since" not in h for h in site.requests)
+    assert len(site.extracted) == 2
+
+
+def test_body_over_the_cap_is_rejected():
+    async def read(headers, chunks, limit):
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+        response = httpx.Response(200, headers=headers, content=stream())
+        return await read_capped(response, limit)
+
+    assert asyncio.run(read({}, [b"a" * 10] * 3, 30)) == b"a" * 30
+    with pytest.raises(PageTooLarge):
+        asyncio.run(read({"content-length": "1000"}, [b"a"], 100)) # Refused before reading
+    with pytest.raises(PageTooLarge):
+        asyncio.run(read({}, [b"a" * 60] * 2, 100)) # No length: cut off while streaming
+
+
+@pytest.mark.parametrize("body, content_type, text", [
+    ("café".encode("utf-8"), "text/html", "café"),
+    ("café".encode("cp1252"), "text/html; charset=iso-8859-1", "café"),
+    (b'<meta charset="windows-1252">caf\xe9', "text/html", '<meta charset="windows-1252">café'),
+    (b"caf\xe9", "text/html", "café"),
+])
+def test_decode_html(body, content_type, text):
+    assert decode_html(body, content_type) == text
@@ -0,0 +1,40 @@
+# test_format.py
+# Model output and scraped job text go into the HTML fragment; none of it may reach the page as markup.
+from utility.format import Markup, Template, format_stream_section, format_string_response
+
+HOSTILE = """<script>alert("x")</script> & 'quoted'"""
+ESCAPED = "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; &#x27;quoted&#x27;"
+
+
+def test_model_text_is_escaped_in_the_fragment():
+    result = {
+        "Suitability": "Yes",
+        "Skill Match Percentage": HOSTILE,
+        "Matched Skills": [HOSTILE],
+        "Interview Questions": [{"Question": HOSTILE, "Answer": HOSTILE}],
+        "Behavioral Questions": [HOSTILE],
+    }
+    job_info = {"role": HOSTILE, "description": HOSTILE, "skills": [HOSTILE]}
+    html = format_string_response(result, job_info)
+    assert "<script>" not in html and '"x"' not in html and "'quoted'" not in html
+    assert html.count(ESCAPED) == 8
+
+
+def test_unsuitable_sections_are_escaped():
+    result = {"Suitability": "No", "Reasons for Unsuitability": [HOSTILE], "Suggestions": HOSTILE}
+    html = format_string_response(result, {})
+    assert "<script>" not in html
+    assert html.count(ESCAPED) == 2
+
+
+def test_stream_sections_are_escaped():
+    html = format_stream_section("Suggestions", [HOSTILE, "Learn Go"], {})
+    assert f"<li>{ESCAPED}</li><li>Learn Go</li>" in html
+
+
+def test_template_keeps_markup_and_literal_text():
+    template = Template("<p>{label}: {value}</p>")
+    assert template.render(label=Markup("<b>Role</b>"), value="R&D") == "<p><b>Role</b>: R&amp;D</p>"
+    assert Template("<li>{text}</li>").render_rows(["a<b", 3, None]) == "<li>a&lt;b</li><li>3</li><li>None</li>"
+    assert Template("<li>{q}/{a}</li>").render_rows([("1", "&"), ("2", 2)]) == "<li>1/&amp;</li><li>2/2</li>"
+    assert Template("<li>{text}</li>").render_rows([]) == ""
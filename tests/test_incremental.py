@@ -0,0 +1,147 @@
+# test_incremental.py
+# Resubmissions with a session token are diffed entry by entry against the session's last analysis, and
+# only the affected keys are regenerated and merged back in.
+import pytest
+from utility.incremental import diff_sections, merge_update, plan_update, resume_sections, section_hashes
+
+RESUME = """Jane Doe
+Backend engineer
+
+Skills
+Python, FastAPI, PostgreSQL
+
+Experience
+Backend Engineer, Acme
+Remote
+- Built the billing API in Python
+
+Data Engineer, Globex
+Remote
+- Ran the nightly ETL jobs
+
+Interests
+Chess, climbing
+"""
+JOB_SKILLS = ["Python", "FastAPI", "Docker"]
+QUESTIONS = [{"Question": f"How do you use {skill}?", "Answer": "..."} for skill in ("Python", "FastAPI", "PostgreSQL", "APIs", "testing")]
+RESULT = {"Suitability": "Yes", "Skill Match Percentage": 67, "Matched Skills": ["Python", "FastAPI"],
+          "Interview Questions": QUESTIONS, "Behavioral Questions": ["Tell me about Acme."]}
+
+
+def edit(old, new, text=RESUME):
+    assert old in text
+    return text.replace(old, new)
+
+
+def diff(before, after):
+    return diff_sections(section_hashes(resume_sections(before)), resume_sections(after))
+
+
+def previous(matched=("Python", "FastAPI"), suitability="Yes", context="ctx", result=RESULT):
+    return {"context": context, "job_skills": JOB_SKILLS, "sections": section_hashes(resume_sections(RESUME)),
+            "matched": list(matched), "suitability": suitability, "result": result}
+
+
+def match(matched=("Python", "FastAPI"), suitability="Yes"):
+    return {"Matched Skills": list(matched), "Suitability": suitability}
+
+
+def test_sections_split_into_entries():
+    sections = resume_sections(RESUME)
+    assert list(sections) == ["summary", "skills", "experience", "interests"]
+    assert len(sections["experience"]) == 2 and sections["experience"][0].startswith("Experience\nBackend Engineer")
+    assert sum(entry.count("Remote") for entry in sections["experience"]) == 2
+
+
+def test_repeated_headings_get_numbered_ids():
+    sections = resume_sections(RESUME + "\nExperience\nFreelance\n")
+    assert "experience#2" in sections
+
+
+def test_whitespace_and_reordering_change_nothing():
+    assert diff(RESUME, RESUME.replace("Python, FastAPI", "Python,   FastAPI").replace("\n\n", "  \n\n\n")) == ([], {})
+    first, second = "Skills\nPython, FastAPI, PostgreSQL", "Interests\nChess, climbing"
+    reordered = RESUME.replace(first, "@@").replace(second, first).replace("@@", second) # Sections moved around
+    assert diff(RESUME, reordered) == ([], {})
+
+
+def test_edited_added_and_removed_entries():
+    changed, removed = diff(RESUME, edit("nightly ETL jobs", "nightly ETL jobs in Airflow"))
+    assert changed == [("experience", "Data Engineer, Globex\nRemote\n- Ran the nightly ETL jobs in Airflow")] and removed == {}
+
+    changed, removed = diff(RESUME, edit("Interests\n", "Projects\nA Docker build cache\n\nInterests\n"))
+    assert [section for section, _ in changed] == ["projects"] and removed == {}
+
+    changed, removed = diff(RESUME, edit("\nData Engineer, Globex\nRemote\n- Ran the nightly ETL jobs\n", ""))
+    assert changed == [] and removed == {"experience": 1}
+
+    changed, removed = diff(RESUME, edit("Interests\nChess, climbing\n", ""))
+    assert changed == [] and removed == {"interests": 1}
+
+
+def test_unchanged_resume_reuses_the_analysis():
+    assert plan_update(previous(), "ctx", JOB_SKILLS, resume_sections(RESUME), match()) == {"mode": "reused"}
+
+
+@pytest.mark.parametrize("prev, skill_match", [
+    (None, match()),
+    (previous(context="other posting"), match()),
+    (previous(), match(suitability="No")), # The verdict flipped
+    (previous(suitability=None), match(suitability=None)), # No local verdict to hold the LLM to
+])
+def test_full_analysis_when_the_previous_one_doesnt_apply(prev, skill_match):
+    assert plan_update(prev, "ctx", JOB_SKILLS, resume_sections(RESUME), skill_match) is None
+
+
+def test_full_analysis_when_most_of_the_resume_changed():
+    rewritten = "Jane Doe\n\nExperience\n" + "\n\n".join(f"Job {i}\n- Wrote a lot of new things {i}" for i in range(20))
+    assert plan_update(previous(), "ctx", JOB_SKILLS, resume_sections(rewritten), match()) is None
+
+
+def test_experience_edit_regenerates_behavioral_questions_only():
+    sections = resume_sections(edit("nightly ETL jobs", "nightly ETL jobs, then moved them to Airflow"))
+    plan = plan_update(previous(), "ctx", JOB_SKILLS, sections, match())
+    assert plan["mode"] == "updated" and plan["keys"] == ["Behavioral Questions"]
+    assert plan["sections"] == ["experience"] and plan["focus"] == []
+
+
+def test_newly_matched_skill_gets_questions():
+    sections = resume_sections(edit("Python, FastAPI, PostgreSQL", "Python, FastAPI, PostgreSQL, Docker"))
+    plan = plan_update(previous(), "ctx", JOB_SKILLS, sections, match(("Python", "FastAPI", "Docker")))
+    assert plan["keys"] == ["Interview Questions"] and plan["focus"] == ["Docker"]
+    assert plan["kept_questions"] == QUESTIONS and plan["question_count"] == 1
+
+
+def test_lost_skill_drops_its_questions():
+    sections = resume_sections(edit("Python, FastAPI, PostgreSQL", "Python, PostgreSQL"))
+    plan = plan_update(previous(), "ctx", JOB_SKILLS, sections, match(("Python",)))
+    assert plan["focus"] == ["FastAPI"]
+    assert [item["Question"] for item in plan["kept_questions"]] == [q["Question"] for q in QUESTIONS if "FastAPI" not in q["Question"]]
+    assert plan["question_count"] == 1
+
+
+def test_unsuitable_edit_regenerates_reasons_and_suggestions():
+    no = dict(RESULT, Suitability="No", **{"Reasons for Unsuitability": ["No Docker"], "Suggestions": ["Learn Docker"]})
+    sections = resume_sections(edit("Chess, climbing", "Chess"))
+    plan = plan_update(previous(suitability="No", result=no), "ctx", JOB_SKILLS, sections, match(suitability="No"))
+    assert plan["keys"] == ["Reasons for Unsuitability", "Suggestions"]
+
+
+def test_merge_update_swaps_in_only_the_planned_keys():
+    kept = QUESTIONS[:4]
+    plan = {"keys": ["Interview Questions", "Behavioral Questions"], "kept_questions": kept}
+    update = {"Interview Questions": [{"Question": "Docker?", "Answer": "..."}], "Behavioral Questions": ["Tell me about Globex."],
+              "Suggestions": ["not planned, ignored"]}
+    merged = merge_update(RESULT, update, plan)
+    assert merged["Interview Questions"] == kept + update["Interview Questions"]
+    assert merged["Behavioral Questions"] == ["Tell me about Globex."]
+    assert "Suggestions" not in merged
+    assert merged["Matched Skills"] == RESULT["Matched Skills"]
+    assert RESULT["Interview Questions"] == QUESTIONS # The previous result isn't modified
+
+
+def test_merge_update_keeps_the_old_value_when_the_update_is_empty():
+    plan = {"keys": ["Behavioral Questions", "Interview Questions"], "kept_questions": QUESTIONS[:2]}
+    merged = merge_update(RESULT, {"Behavioral Questions": []}, plan)
+    assert merged["Behavioral Questions"] == RESULT["Behavioral Questions"]
+    assert merged["Interview Questions"] == QUESTIONS[:2]
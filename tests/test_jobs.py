@@ -0,0 +1,109 @@
+# test_jobs.py
+# /analyze/jobs dedup and backpressure, against every store backend. Two JobQueues on one shared store
+# stand in for two uvicorn workers.
+import asyncio
+import pytest
+from fastapi import HTTPException
+from benchmarks.resp_server import start_server
+from utility.jobs import JobQueue, MemoryJobStore, RedisJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_store(request, tmp_path):
+    # Returns a factory: each call is another worker's view of the same store
+    if request.param == "memory":
+        store = MemoryJobStore()
+        yield lambda: store
+    elif request.param == "sqlite":
+        yield lambda: SQLiteJobStore(str(tmp_path / "jobs.db"))
+    else:
+        server, url = start_server()
+        yield lambda: RedisJobStore(url)
+        server.shutdown()
+        server.server_close()
+
+
+def blocked_run(release: asyncio.Event, ran: list):
+    async def run():
+        ran.append(1)
+        await release.wait()
+        return {"html": "ok"}
+    return run
+
+
+async def wait_for_status(queue, job_id, statuses=("done", "error")):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+
+def test_identical_submits_on_two_workers_share_one_job(make_store):
+    async def main():
+        queues = [JobQueue(make_store(), workers=1), JobQueue(make_store(), workers=1)]
+        release, ran = asyncio.Event(), []
+        results = await asyncio.gather(*(queue.submit("same", blocked_run(release, ran))
+                                         for queue in queues for _ in range(3)))
+        await asyncio.sleep(0.05)
+        release.set()
+        job = await wait_for_status(queues[0], results[0][0]["id"])
+        for queue in queues:
+            await queue.stop()
+        return results, ran, job
+
+    results, ran, job = asyncio.run(main())
+    assert len({job["id"] for job, _ in results}) == 1
+    assert sorted(deduplicated for _, deduplicated in results) == [False] + [True] * 5
+    assert len(ran) == 1
+    assert job["status"] == "done" and job["result"] == {"html": "ok"}
+
+
+def test_finished_job_frees_its_key(make_store):
+    async def main():
+        queue = JobQueue(make_store(), workers=1)
+        release, ran = asyncio.Event(), []
+        release.set()
+        first, _ = await queue.submit("key", blocked_run(release, ran))
+        await wait_for_status(queue, first["id"])
+        second, deduplicated = await queue.submit("key", blocked_run(release, ran))
+        await wait_for_status(queue, second["id"])
+        await queue.stop()
+        return first, second, deduplicated
+
+    first, second, deduplicated = asyncio.run(main())
+    assert not deduplicated and second["id"] != first["id"]
+
+
+def test_full_queue_rejects_new_work_but_still_deduplicates(make_store):
+    async def main():
+        queue = JobQueue(make_store(), workers=1, max_pending=1)
+        release, ran = asyncio.Event(), []
+        running, _ = await queue.submit("a", blocked_run(release, ran))
+        await asyncio.sleep(0.05) # The worker picks up "a"
+        queued, _ = await queue.submit("b", blocked_run(release, ran))
+        with pytest.raises(HTTPException) as rejected:
+            await queue.submit("c", blocked_run(release, ran))
+        duplicate, deduplicated = await queue.submit("b", blocked_run(release, ran))
+        stats = queue.stats()
+        release.set()
+        await wait_for_status(queue, queued["id"])
+        await queue.stop()
+        return rejected.value, queued, duplicate, deduplicated, stats
+
+    rejected, queued, duplicate, deduplicated, stats = asyncio.run(main())
+    assert rejected.status_code == 503 and int(rejected.headers["Retry-After"]) >= 1
+    assert deduplicated and duplicate["id"] == queued["id"]
+    assert stats["rejected"] == 1 and stats["submitted"] == 2 and stats["deduplicated"] == 1
+
+
+def test_stale_holder_is_replaced(tmp_path):
+    # A job not updated within JOB_TIMEOUT belonged to a worker that died; its key is free again
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"), timeout=0)
+    assert store.claim({"id": "1", "key": "k", "status": "running"}) is None
+    assert store.claim({"id": "2", "key": "k", "status": "queued"}) is None
+    assert store.load("2")["status"] == "queued"
+    fresh = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    assert fresh.claim({"id": "3", "key": "k", "status": "queued"}) == "2"
+    assert fresh.load("3") is None
@@ -0,0 +1,80 @@
+# test_llm_json.py
+# Model output the renderer can show must parse without a "fix this JSON" call: lenient schema coercion,
+# plus the local repair of fenced, chatty, truncated or Python-flavoured JSON.
+import asyncio
+import json
+import pytest
+from prompts.schemas import AnalysisResult
+from utility.llm_json import parse_llm_json, repair_json, validate_output
+
+
+class NoCallLLM:
+    # Fails the test if parse_llm_json falls back to an LLM call
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt, **kwargs):
+        raise AssertionError("unexpected fix-JSON call")
+
+
+def parse(data):
+    return asyncio.run(parse_llm_json(json.dumps(data), AnalysisResult, NoCallLLM(), "test"))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("N/A", None),
+    ("85% (17/20)", 85),
+    ("85%", 85),
+    (" 72.5 ", 72.5),
+    (60, 60),
+    ("unknown", None),
+    ([85], None),
+    (True, None),
+])
+def test_percentage_is_coerced_or_dropped(value, expected):
+    assert parse({"Suitability": "Yes", "Skill Match Percentage": value}).get("Skill Match Percentage") == expected
+
+
+def test_question_keys_match_case_insensitively():
+    result = parse({"Interview Questions": [{"question": "What is a goroutine?", "answer": "A lightweight thread."},
+                                            {"QUESTION": "Why Go?", "Answer": "Simple concurrency."}]})
+    assert result["Interview Questions"] == [
+        {"Question": "What is a goroutine?", "Answer": "A lightweight thread."},
+        {"Question": "Why Go?", "Answer": "Simple concurrency."},
+    ]
+
+
+def test_list_answers_are_joined():
+    result = parse({"Interview Questions": [{"Question": "How do you scale Kafka?", "Answer": ["Add partitions.", "Add brokers."]}]})
+    assert result["Interview Questions"] == [{"Question": "How do you scale Kafka?", "Answer": "Add partitions. Add brokers."}]
+
+
+def test_odd_question_items_fall_back_instead_of_raising():
+    result = parse({"Interview Questions": ["Question: What is Docker? Answer: Containers.", {"topic": "no question"}, 7]})
+    assert result["Interview Questions"] == [{"Question": "What is Docker?", "Answer": "Containers."}]
+    assert parse({"Interview Questions": "1. What is SQL?\n2. What is an index?"})["Interview Questions"] == [
+        {"Question": "What is SQL?", "Answer": "N/A"}, {"Question": "What is an index?", "Answer": "N/A"}]
+
+
+def test_validate_output_unwraps_single_item_list():
+    assert validate_output([{"Suitability": "yes"}], AnalysisResult) == {"Suitability": "Yes"}
+
+
+@pytest.mark.parametrize("text, expected, repaired", [
+    ('{"a": 1}', {"a": 1}, False),
+    ('```json\n{"a": 1}\n```', {"a": 1}, False),
+    ('Here is the analysis:\n{"a": [1, 2]} Hope this helps!', {"a": [1, 2]}, True),
+    ('{"a": [1, 2,], "b": 2,}', {"a": [1, 2], "b": 2}, True),
+    ('{"a": True, "b": None}', {"a": True, "b": None}, True),
+    ('{"a": "line one\nline two"}', {"a": "line one\nline two"}, True),
+    ('{"a": [1, 2', {"a": [1, 2]}, True),
+    ('{"a": "cut off mid', {"a": "cut off mid"}, True),
+    ('{"a": 1, "b":', {"a": 1}, True),
+])
+def test_repair_json(text, expected, repaired):
+    assert repair_json(text) == (expected, repaired)
+
+
+def test_repair_json_gives_up_on_prose():
+    with pytest.raises(ValueError):
+        repair_json("I could not analyze this resume.")
@@ -0,0 +1,143 @@
+# test_llm_scheduler.py
+# ChatGroq runs with max_retries=0, so the scheduler's retry and deadline handling is all there is between a
+# provider hiccup and a failed request.
+import asyncio
+import time
+import groq
+import httpx
+import pytest
+from fastapi import HTTPException
+import utility.llm_scheduler as llm_scheduler
+from utility.llm_scheduler import ModelScheduler, retry_delay
+
+
+class StatusError(Exception):
+    # Stands in for groq.APIStatusError: a status code and the response headers
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = httpx.Response(status_code, headers=headers or {})
+
+
+def flaky(*errors, result="ok"):
+    # A call that raises each error in turn, then returns `result`; calls["n"] counts attempts
+    calls = {"n": 0}
+
+    async def call():
+        calls["n"] += 1
+        if calls["n"] <= len(errors):
+            raise errors[calls["n"] - 1]
+        return result
+    return call, calls
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm_scheduler, "LLM_BACKOFF_MAX", 0.05)
+    monkeypatch.setattr(llm_scheduler, "LLM_MAX_RETRIES", 3)
+
+
+@pytest.mark.parametrize("error", [
+    StatusError(408), StatusError(429), StatusError(500), StatusError(502), StatusError(503), StatusError(504),
+    httpx.ConnectError("refused"), httpx.ReadTimeout("slow"), httpx.RemoteProtocolError("closed"),
+    asyncio.TimeoutError(),
+    groq.APIConnectionError(request=httpx.Request("POST", "https://api.groq.com")),
+    groq.APITimeoutError(request=httpx.Request("POST", "https://api.groq.com")),
+])
+def test_retryable_errors_back_off(error):
+    assert retry_delay(error, 0) is not None
+
+
+@pytest.mark.parametrize("error", [StatusError(400), StatusError(401), StatusError(404), ValueError("bad")])
+def test_other_errors_are_not_retried(error):
+    assert retry_delay(error, 0) is None
+
+
+def test_retry_after_is_a_floor():
+    error = StatusError(429, {"retry-after": "2"})
+    assert all(2 <= retry_delay(error, 0) <= 2.6 for _ in range(20))
+    assert 7.66 <= retry_delay(StatusError(429, {"x-ratelimit-reset-tokens": "7.66s"}), 0) <= 9.7
+
+
+@pytest.mark.parametrize("error", [StatusError(500), StatusError(503), httpx.ConnectError("refused"), httpx.ReadTimeout("slow")])
+def test_run_retries_until_success(error):
+    scheduler = ModelScheduler("test")
+    call, calls = flaky(error, error)
+    assert asyncio.run(scheduler.run(call, 0, 10, time.monotonic() + 5)) == "ok"
+    assert calls["n"] == 3
+    assert scheduler.stats["retries"] == 2
+    assert scheduler.active == 0
+
+
+def test_run_raises_non_retryable_errors_at_once():
+    scheduler = ModelScheduler("test")
+    call, calls = flaky(StatusError(400))
+    with pytest.raises(StatusError):
+        asyncio.run(scheduler.run(call, 0, 10, time.monotonic() + 5))
+    assert calls["n"] == 1
+    assert scheduler.active == 0
+
+
+def test_run_gives_up_after_max_retries():
+    scheduler = ModelScheduler("test")
+    call, calls = flaky(*[StatusError(502)] * 10)
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(scheduler.run(call, 0, 10, time.monotonic() + 5))
+    assert raised.value.status_code == 429
+    assert calls["n"] == llm_scheduler.LLM_MAX_RETRIES + 1
+    assert scheduler.stats["rejected"] == 1
+
+
+def test_retry_after_past_the_deadline_rejects_without_waiting():
+    scheduler = ModelScheduler("test")
+    call, calls = flaky(StatusError(429, {"retry-after": "30"}))
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(scheduler.run(call, 0, 10, started + 2))
+    assert time.monotonic() - started < 1
+    assert raised.value.status_code == 429
+    assert int(raised.value.headers["Retry-After"]) >= 30
+    assert calls["n"] == 1
+
+
+def test_queue_over_budget_is_rejected_up_front():
+    # One request a minute: the second call can't be admitted before its deadline, so it fails right away
+    scheduler = ModelScheduler("test", rpm=1)
+
+    async def main():
+        assert await scheduler.run(flaky()[0], 0, 10, time.monotonic() + 5) == "ok"
+        started = time.monotonic()
+        with pytest.raises(HTTPException) as raised:
+            await scheduler.run(flaky()[0], 0, 10, time.monotonic() + 5)
+        return time.monotonic() - started, raised.value
+
+    elapsed, error = asyncio.run(main())
+    assert elapsed < 1
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) > 5
+
+
+def test_stream_is_only_retried_before_the_first_chunk():
+    scheduler = ModelScheduler("test")
+    opened = {"n": 0}
+
+    def open_stream(fail_after):
+        async def chunks():
+            opened["n"] += 1
+            for i in range(3):
+                if i == fail_after and opened["n"] == 1:
+                    raise httpx.ReadError("reset")
+                yield i
+        return chunks
+
+    async def collect(fail_after):
+        opened["n"] = 0
+        return [chunk async for chunk in scheduler.stream(open_stream(fail_after), 0, 10, time.monotonic() + 5)]
+
+    assert asyncio.run(collect(0)) == [0, 1, 2]
+    assert opened["n"] == 2
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(collect(1))
+    assert opened["n"] == 1
+    assert scheduler.active == 0
@@ -0,0 +1,84 @@
+# test_posting_cache.py
+# Job postings are cached at two levels: URL -> page text, and hash(page text + model) -> extracted job.
+import asyncio
+import pytest
+import prompts.posting as posting
+from benchmarks.stubs import JOB_JSON, StubLLM
+from prompts.posting import normalize_url, posting_cache_key, preprocess_job_posting
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    # url -> page text served by the stubbed fetcher; fetched lists every URL actually fetched
+    pages, fetched = {}, []
+
+    async def fetch_page_text(url):
+        fetched.append(url)
+        await asyncio.sleep(0.05)
+        return pages[url]
+    monkeypatch.setattr(posting, "fetch_page_text", fetch_page_text)
+    posting.page_cache.clear()
+    posting.posting_cache.clear()
+    yield pages, fetched
+    posting.page_cache.clear()
+    posting.posting_cache.clear()
+
+
+@pytest.mark.parametrize("url, same_as", [
+    ("HTTPS://Jobs.Example.com/123#apply", "https://jobs.example.com/123"),
+    ("https://jobs.example.com", "https://jobs.example.com/"),
+    ("  https://jobs.example.com/123?ref=a  ", "https://jobs.example.com/123?ref=a"),
+])
+def test_normalize_url(url, same_as):
+    assert normalize_url(url) == normalize_url(same_as)
+
+
+def test_key_depends_on_page_text_and_model():
+    key = posting_cache_key("We need Python.", "llama-3.3-70b-versatile")
+    assert key == posting_cache_key("We need Python.", "llama-3.3-70b-versatile")
+    assert key != posting_cache_key("We need Python!", "llama-3.3-70b-versatile")
+    assert key != posting_cache_key("We need Python.", "llama-3.1-8b-instant")
+
+
+def test_repeat_requests_hit_the_cache(fetches):
+    pages, fetched = fetches
+    pages["https://jobs.example.com/1"] = "Backend Engineer. Python, FastAPI, PostgreSQL."
+    llm = StubLLM(latency=0)
+
+    async def main():
+        first = await preprocess_job_posting("https://jobs.example.com/1", llm)
+        first["role"] = "mutated by the caller"
+        second = await preprocess_job_posting("https://JOBS.example.com/1#top", llm)
+        return second
+
+    assert asyncio.run(main()) == JOB_JSON
+    assert fetched == ["https://jobs.example.com/1"]
+    assert llm.calls == 1
+
+
+def test_same_page_at_another_url_reuses_the_extraction(fetches):
+    pages, fetched = fetches
+    pages["https://a.example.com/job"] = pages["https://b.example.com/job"] = "Backend Engineer. Python."
+    llm = StubLLM(latency=0)
+
+    async def main():
+        await preprocess_job_posting("https://a.example.com/job", llm)
+        await preprocess_job_posting("https://b.example.com/job", llm)
+
+    asyncio.run(main())
+    assert len(fetched) == 2 # Different URLs are fetched...
+    assert llm.calls == 1 # ...but identical text is only extracted once
+
+
+def test_concurrent_requests_share_one_fetch_and_extraction(fetches):
+    pages, fetched = fetches
+    pages["https://jobs.example.com/2"] = "Data Engineer. Spark, Airflow."
+    llm = StubLLM(latency=0.05)
+
+    async def main():
+        return await asyncio.gather(*(preprocess_job_posting("https://jobs.example.com/2", llm) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert all(result == JOB_JSON for result in results)
+    assert fetched == ["https://jobs.example.com/2"]
+    assert llm.calls == 1
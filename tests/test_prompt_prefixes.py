@@ -0,0 +1,54 @@
+# test_prompt_prefixes.py
+# Every prompt must start with its static prefix, byte for byte, whatever the request data: that is what
+# lets the provider's prompt cache reuse it. Inputs differ in every field, including literal braces.
+import pytest
+from prompts.combined import COMBINED_ANALYSIS_PROMPT, build_combined_analysis_prompt
+from prompts.portfolio import PORTFOLIO_ANALYSIS_PROMPT, build_portfolio_analysis_prompt
+from prompts.posting import JOB_EXTRACTION_PROMPT
+from prompts.resume import RESUME_ANALYSIS_PROMPT, build_resume_analysis_prompt
+from prompts.update import UPDATE_ANALYSIS_PROMPT, build_update_analysis_prompt
+from utility.llm_json import FIX_JSON_PROMPT
+from utility.skills import match_skills
+
+JOBS = [
+    {"role": "Backend Engineer", "skills": ["Python", "FastAPI", "PostgreSQL", "Docker"], "description": "Build Python APIs."},
+    {"role": "Data Analyst", "skills": ["SQL", "Tableau", "Pandas"], "description": "Turn data into {insights}."},
+]
+RESUMES = [
+    "Jane Doe\nSkills\nPython, FastAPI, Docker, AWS\nExperience\nBuilt REST APIs for 5 years.\n",
+    "John Roe\nSkills\nExcel, SQL {curly braces stay literal}\nEducation\nBSc Statistics\n",
+]
+PORTFOLIOS = ["Python, FastAPI, Docker", "SQL, Tableau"]
+PAGES = ["Backend Engineer\nRequirements: Python, FastAPI\n", "Data Analyst\nYou'll need SQL and Tableau {now}\n"]
+MATCHES = [match_skills(job["skills"], resume_text=resume, portfolio_skills=portfolio) for job, resume, portfolio in zip(JOBS, RESUMES, PORTFOLIOS)]
+PLANS = [
+    {"keys": ["Interview Questions", "Behavioral Questions"], "changed": [("experience", "- Added Kubernetes rollouts.")], "removed": {},
+     "focus": ["Docker"], "kept_questions": [{"Question": "How do you test FastAPI apps?", "Answer": "With TestClient."}], "question_count": 2},
+    {"keys": ["Reasons for Unsuitability", "Suggestions"], "changed": [], "removed": {"skills": 1},
+     "focus": [], "kept_questions": [], "question_count": 0},
+]
+PREVIOUS = [
+    {"Behavioral Questions": ["Tell me about a migration you led."]},
+    {"Reasons for Unsuitability": ["No Tableau {dashboards}."], "Suggestions": ["Publish a dashboard."]},
+]
+
+# name -> (compiled prompt, build(i) for input set i)
+BUILDERS = {
+    "job_extraction": (JOB_EXTRACTION_PROMPT, lambda i: JOB_EXTRACTION_PROMPT.format(page_data=PAGES[i])),
+    "resume_analysis": (RESUME_ANALYSIS_PROMPT, lambda i: build_resume_analysis_prompt(RESUMES[i], JOBS[i], MATCHES[i])),
+    "portfolio_analysis": (PORTFOLIO_ANALYSIS_PROMPT, lambda i: build_portfolio_analysis_prompt(PORTFOLIOS[i], JOBS[i], MATCHES[i])),
+    "combined_analysis": (COMBINED_ANALYSIS_PROMPT, lambda i: build_combined_analysis_prompt(RESUMES[i], PORTFOLIOS[i], JOBS[i], MATCHES[i])),
+    "update_analysis": (UPDATE_ANALYSIS_PROMPT, lambda i: build_update_analysis_prompt(PLANS[i], PREVIOUS[i], JOBS[i], MATCHES[i])),
+    "fix_json": (FIX_JSON_PROMPT, lambda i: FIX_JSON_PROMPT.format(keys=f'"key{i}"', error=f"error {i}", content=PAGES[i])),
+}
+
+
+@pytest.mark.parametrize("name", BUILDERS)
+def test_rendered_prompts_share_the_static_prefix_bytes(name):
+    prompt, build = BUILDERS[name]
+    prefix = prompt.prefix.encode("utf-8")
+    first, second = build(0).encode("utf-8"), build(1).encode("utf-8")
+    assert first != second
+    assert first[:len(prefix)] == prefix
+    assert second[:len(prefix)] == prefix
+
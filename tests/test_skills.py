@@ -0,0 +1,65 @@
+# test_skills.py
+# match_skills sets the percentage and verdict the analysis uses (and fast mode answers "No" from),
+# so the cases that used to skew it are pinned down here.
+import pytest
+from utility.skills import match_skills, skill_match_prompt_block
+
+
+def matched(job_skills, resume_text="", portfolio_skills=""):
+    return match_skills(job_skills, resume_text=resume_text, portfolio_skills=portfolio_skills)["Matched Skills"]
+
+
+@pytest.mark.parametrize("skill, text", [
+    ("Go", "I go to the gym and go hiking."),
+    ("REST APIs", "Took a rest between sprints."),
+    ("Spark", "It sparked my interest; a spark of an idea."),
+    ("R", "Led the R&D group. John R. Smith"),
+    ("Machine Learning", "html and xml parsing"),
+    ("Kubernetes", "kube"),
+])
+def test_ambiguous_words_in_prose_dont_match(skill, text):
+    assert matched([skill], resume_text=text) == []
+
+
+@pytest.mark.parametrize("skill, text", [
+    ("Go", "Skills: Go, Python, Docker"),
+    ("Go", "Built the billing services in Go."),
+    ("Golang", "Built the billing services in Go."),
+    ("Go programming", "golang"),
+    ("Apache Spark", "Data pipelines in Spark and Scala"),
+    ("Spark", "PySpark jobs on EMR"),
+    ("REST", "Designed REST/GraphQL services"),
+    ("R", "Statistics in R, Python"),
+    ("ML", "Shipped ML models to production"),
+])
+def test_ambiguous_skills_written_as_technology_match(skill, text):
+    assert matched([skill], resume_text=text) == [skill]
+
+
+def test_portfolio_lists_count_ambiguous_words():
+    assert matched(["Spark", "Go", "Kubernetes"], portfolio_skills="python, spark, go, kube") == ["Spark", "Go", "Kubernetes"]
+
+
+def test_whole_skill_must_match():
+    assert matched(["Java"], resume_text="JavaScript") == []
+    assert matched(["Azure DevOps"], resume_text="Azure") == []
+    assert matched(["Python and Java"], resume_text="Python") == []
+    assert matched(["5+ years of Python experience"], resume_text="Python") == ["5+ years of Python experience"]
+
+
+def test_non_technical_requirements_stay_out_of_the_percentage():
+    job = ["Python", "Docker", "Bachelor's degree in Computer Science", "5+ years of experience", "Communication skills"]
+    match = match_skills(job, resume_text="Python and Docker developer")
+    assert match["Skill Match Percentage"] == 100
+    assert match["Suitability"] == "Yes"
+    assert match["Other Requirements"] == job[2:]
+    assert "Communication skills" in skill_match_prompt_block(match)
+
+
+def test_only_non_technical_requirements_leave_the_verdict_to_the_llm():
+    match = match_skills(["Excellent communication", "BSc in any field"], resume_text="Python")
+    assert match["Skill Match Percentage"] is None and match["Suitability"] is None
+
+
+def test_no_skills_is_not_a_zero():
+    assert match_skills([], resume_text="Python")["Skill Match Percentage"] is None
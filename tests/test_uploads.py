@@ -0,0 +1,49 @@
+# test_uploads.py
+# Streamed, batch and job requests copy their uploads before returning; the size cap applies to each copy.
+import asyncio
+import io
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+import routes.stream
+from routes.stream import buffer_uploads
+
+
+def upload(size, name="resume.pdf"):
+    return UploadFile(file=io.BytesIO(b"x" * size), filename=name)
+
+
+def test_copies_hold_the_upload(monkeypatch):
+    monkeypatch.setattr(routes.stream, "MAX_UPLOAD_BYTES", 200 * 1024)
+    copies = asyncio.run(buffer_uploads(upload(150 * 1024), None))
+    assert copies[1] is None
+    assert copies[0].filename == "resume.pdf"
+    assert len(copies[0].file.read()) == 150 * 1024
+
+
+def test_oversized_upload_is_rejected_and_earlier_copies_closed(monkeypatch):
+    monkeypatch.setattr(routes.stream, "MAX_UPLOAD_BYTES", 200 * 1024)
+    first, oversized = upload(10), upload(300 * 1024, "huge.pdf")
+    read = []
+    original_read = oversized.read
+
+    async def counting_read(size=-1):
+        chunk = await original_read(size)
+        read.append(len(chunk))
+        return chunk
+    oversized.read = counting_read
+
+    copies = []
+    original = routes.stream.buffer_upload
+
+    async def tracking(item):
+        copy = await original(item)
+        copies.append(copy)
+        return copy
+    monkeypatch.setattr(routes.stream, "buffer_upload", tracking)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(buffer_uploads(first, oversized))
+    assert raised.value.status_code == 413
+    assert sum(read) <= 200 * 1024 + 64 * 1024 # Stopped at the cap, not copied in full
+    assert copies[0].file.closed
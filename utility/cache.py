@@ -0,0 +1,369 @@
+# cache.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError: # Plain json works, just slower and larger
+    orjson = None
+from utility.executor import run_blocking
+from utility.observability import log
+
+# Shared tier behind every cache's in-process LRU, so uvicorn workers (and, with redis, hosts) reuse
+# each other's postings, parsed documents and analyses:
+#   memory - no shared tier
+#   sqlite - one WAL-mode database file per host (CACHE_DB); reads go through mmap
+#   redis  - any Redis-protocol server (CACHE_REDIS_URL); benchmarks/resp_server.py for local runs
+CACHE_DB = os.getenv("CACHE_DB")
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite" if CACHE_DB else "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "career_cache:")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024))) # Per cache in sqlite; least recently used go first
+CACHE_MAX_VALUE_BYTES = int(os.getenv("CACHE_MAX_VALUE_BYTES", str(1024 * 1024))) # Bigger values stay in memory only
+CACHE_MMAP_BYTES = int(os.getenv("CACHE_MMAP_BYTES", str(256 * 1024 * 1024)))
+TOUCH_INTERVAL = 60 # Seconds between last-used updates for one sqlite entry, so reads rarely write
+EVICT_CHECK_EVERY = 50 # sqlite writes between size checks (or sooner, after 5% of the cap was written)
+CACHE_REDIS_TIMEOUT = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.5")) # Keep a slow server from tying up a blocking-pool thread
+CACHE_RETRY_AFTER = 5 # Seconds the shared tier is skipped after an error
+ERROR_LOG_INTERVAL = 60 # Seconds between log lines while the shared tier is failing
+
+_MISSING = object()
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class LRUCache:
+    # In-process, size-bounded LRU with an optional per-entry TTL (seconds)
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    # Shared-on-host tier: every worker opens the same file. WAL lets readers run alongside the one
+    # writer, and mmap serves reads from the page cache without copying through read() calls.
+    name = "sqlite"
+
+    def __init__(self, path, table, ttl=None, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._writes = 0
+        self._written_bytes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL") # A crash may lose the last writes, fine for a cache
+        self._conn.execute(f"PRAGMA mmap_size={CACHE_MMAP_BYTES}")
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if columns and "size" not in columns:
+            self._conn.execute(f"DROP TABLE {table}") # Written by an older version (JSON text values)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_used_at ON {table} (used_at)")
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, expires_at, used_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            value, expires_at, used_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return default
+            if used_at < now - TOUCH_INTERVAL:
+                self._conn.execute(f"UPDATE {self.table} SET used_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        return loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        data = dumps(value)
+        if len(data) > CACHE_MAX_VALUE_BYTES:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, expires_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now + ttl if ttl else None, now),
+            )
+            self._writes += 1
+            self._written_bytes += len(data)
+            if self._writes % EVICT_CHECK_EVERY == 0 or self._written_bytes >= self.max_bytes // 20:
+                self._written_bytes = 0
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        # Expired rows first, then least recently used. Trimming starts at 90% of the cap and goes down
+        # to 85%, so the writes until the next check still fit under it.
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes * 0.9:
+            return
+        excess = total - int(self.max_bytes * 0.85)
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY used_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisCache:
+    # Shared across hosts. Entries expire with their TTL; size-based eviction is the server's job
+    # (maxmemory with an allkeys-lru policy), and oversized values are never sent.
+    name = "redis"
+
+    def __init__(self, url, namespace, ttl=None):
+        from utility.resp import RespClient
+        self.client = RespClient(url, timeout=CACHE_REDIS_TIMEOUT)
+        self.prefix = f"{CACHE_KEY_PREFIX}{namespace}:"
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        data = self.client.execute("GET", self.prefix + key)
+        return default if data is None else loads(data)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        data = dumps(value)
+        if len(data) > CACHE_MAX_VALUE_BYTES:
+            return
+        if ttl:
+            self.client.execute("SET", self.prefix + key, data, "PX", int(ttl * 1000))
+        else:
+            self.client.execute("SET", self.prefix + key, data)
+
+    def delete(self, key):
+        self.client.execute("DEL", self.prefix + key)
+
+    def clear(self):
+        cursor = "0"
+        while True:
+            cursor, keys = self.client.execute("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            if keys:
+                self.client.execute("DEL", *keys)
+            if cursor in (b"0", "0"):
+                return
+
+    def close(self):
+        self.client.close()
+
+
+class TieredCache:
+    # Memory LRU in front of an optional shared tier; shared hits are promoted into memory. A failing
+    # shared tier (server down, disk full) counts as a miss instead of failing the request.
+    # Request handlers use aget/aset: the shared tier does blocking socket and sqlite I/O (up to
+    # CACHE_REDIS_TIMEOUT, plus a reconnect), so it runs in the blocking pool, never on the event loop.
+    def __init__(self, memory, shared=None):
+        self.memory = memory
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._down_until = 0.0
+        self._error_logged_at = 0.0
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            value = self._shared_call("get", key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                self.hits += 1
+                self.shared_hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.shared is not None:
+            self._shared_call("set", key, value, ttl)
+
+    async def aget(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if self.shared is not None and not self._skipping():
+            value = await run_blocking(self._shared_call, "get", key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                self.hits += 1
+                self.shared_hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    async def aset(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.shared is not None and not self._skipping():
+            await run_blocking(self._shared_call, "set", key, value, ttl)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.shared is not None:
+            self._shared_call("delete", key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            self._shared_call("clear")
+
+    def _skipping(self):
+        # Shared tier failed recently; don't queue work for the pool just to skip it
+        return bool(self._down_until) and time.time() < self._down_until
+
+    def _shared_call(self, method, *args):
+        if self._skipping():
+            return args[-1] if method == "get" else None
+        try:
+            return getattr(self.shared, method)(*args)
+        except Exception as e:
+            self.errors += 1
+            self._down_until = time.time() + CACHE_RETRY_AFTER
+            if time.time() - self._error_logged_at > ERROR_LOG_INTERVAL:
+                self._error_logged_at = time.time()
+                log("cache_backend_error", level="warning", backend=self.shared.name, operation=method, error=str(e))
+            return args[-1] if method == "get" else None # get's default
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "entries": len(self.memory),
+        }
+        if self.shared is not None:
+            stats.update(backend=self.shared.name, backend_errors=self.errors)
+            if hasattr(self.shared, "evictions"):
+                stats["evictions"] = self.shared.evictions
+        return stats
+
+
+class SingleFlight:
+    # Concurrent callers with the same key share one in-flight computation instead of each running it.
+    # Errors are shared too but never remembered: the next call after a failure runs again.
+    def __init__(self):
+        self._inflight = {}
+        self.shared = 0
+
+    async def run(self, key, compute):
+        # Returns (result, shared) where shared is True if another caller's computation was reused
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+            return await asyncio.shield(task), True
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a caller that disconnects doesn't cancel the work others are waiting on
+        return await asyncio.shield(task), False
+
+
+# name -> cache, for the stats endpoint
+_caches = {}
+
+
+def build_shared_tier(backend, name, ttl=None):
+    if backend == "sqlite":
+        if not CACHE_DB:
+            raise ValueError("CACHE_BACKEND=sqlite needs CACHE_DB, the database file shared by the workers")
+        return SQLiteCache(CACHE_DB, name, ttl=ttl)
+    if backend == "redis":
+        return RedisCache(CACHE_REDIS_URL, name, ttl=ttl)
+    if backend != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND {backend!r}, expected memory, sqlite or redis")
+    return None
+
+
+def build_cache(name, maxsize=256, ttl=None, backend=None):
+    # In-process LRU, plus the CACHE_BACKEND shared tier (or `backend`) when one is configured
+    cache = TieredCache(LRUCache(maxsize=maxsize, ttl=ttl), build_shared_tier(backend or CACHE_BACKEND, name, ttl))
+    _caches[name] = cache
+    return cache
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}
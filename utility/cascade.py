@@ -0,0 +1,150 @@
+# cascade.py
+import os
+import time
+from collections import deque
+from fastapi import HTTPException
+from utility.llm_scheduler import INTERACTIVE
+from utility.observability import log
+from utility.skills import SUITABILITY_THRESHOLD, is_authoritative
+
+# model_choice="auto": job extraction always runs on the fast model; the analysis runs on the small
+# model and is re-run on the large one only when the small model's answer isn't good enough.
+AUTO_MODEL = "auto"
+CASCADE_EXTRACTION_MODEL = os.getenv("CASCADE_EXTRACTION_MODEL", "llama-3.1-8b-instant")
+CASCADE_SMALL_MODEL = os.getenv("CASCADE_SMALL_MODEL", "llama-3.1-8b-instant")
+CASCADE_LARGE_MODEL = os.getenv("CASCADE_LARGE_MODEL", "llama-3.3-70b-versatile")
+# Matches within this many points of the 80% cutoff go straight to the large model
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "5"))
+# Fewer interview questions than this (for a "Yes") counts as a low-confidence answer
+CASCADE_MIN_QUESTIONS = int(os.getenv("CASCADE_MIN_QUESTIONS", "3"))
+
+# USD per million input tokens (Groq list prices), used to estimate what the cascade saves vs. the large model.
+# Add an entry when pointing CASCADE_*_MODEL at another model; without prices the estimate is left out.
+MODEL_PRICES = {"llama-3.1-8b-instant": 0.05, "llama-3.3-70b-versatile": 0.59}
+LATENCY_SAMPLES = 1000
+
+CASCADE_STATS = {
+    "requests": 0,
+    "tiers": {tier: {"calls": 0, "served": 0, "latencies_ms": deque(maxlen=LATENCY_SAMPLES)} for tier in ("small", "large")},
+    "escalations": {"near_cutoff": 0, "invalid_output": 0, "low_confidence": 0},
+    "latencies_ms": deque(maxlen=LATENCY_SAMPLES), # End to end, per auto analysis
+}
+
+
+class ModelCascade:
+    # Stands in for a single LLM in run_analysis/analyze_with_llm. model_name "auto" keeps its cached
+    # results apart from single-model ones.
+    model_name = AUTO_MODEL
+
+    def __init__(self, small, large):
+        self.small = small
+        self.large = large
+
+    def route(self, skill_match: dict) -> str:
+        # Borderline matches are where the wording of the analysis matters most; don't spend a small call on them
+        if is_authoritative(skill_match) and abs(skill_match["Skill Match Percentage"] - SUITABILITY_THRESHOLD) <= CASCADE_MARGIN:
+            return "large"
+        return "small"
+
+    def pick(self, skill_match: dict):
+        # For streaming, where an answer can't be taken back once sent: choose the tier up front
+        tier = self.route(skill_match)
+        if tier == "large":
+            CASCADE_STATS["escalations"]["near_cutoff"] += 1
+        CASCADE_STATS["requests"] += 1
+        CASCADE_STATS["tiers"][tier]["calls"] += 1
+        CASCADE_STATS["tiers"][tier]["served"] += 1
+        return self.large if tier == "large" else self.small
+
+    async def run(self, analyze, skill_match: dict) -> dict:
+        # analyze(llm) -> analysis dict for that model
+        started = time.perf_counter()
+        CASCADE_STATS["requests"] += 1
+        reason = "near_cutoff" if self.route(skill_match) == "large" else None
+        if reason is None:
+            result, reason = await self._try_small(analyze)
+            if reason is None:
+                CASCADE_STATS["latencies_ms"].append((time.perf_counter() - started) * 1000)
+                return result
+        CASCADE_STATS["escalations"][reason] += 1
+        log("cascade_escalation", model=self.large.model_name, reason=reason)
+        result = await self._timed("large", analyze(self.large))
+        CASCADE_STATS["tiers"]["large"]["served"] += 1
+        CASCADE_STATS["latencies_ms"].append((time.perf_counter() - started) * 1000)
+        return result
+
+    async def _try_small(self, analyze):
+        try:
+            result = await self._timed("small", analyze(self.small))
+        except HTTPException as e:
+            if e.status_code != 500: # Only unusable output escalates; rate limits etc. still reach the caller
+                raise
+            return None, "invalid_output"
+        reason = confidence_problem(result)
+        if reason is None:
+            CASCADE_STATS["tiers"]["small"]["served"] += 1
+        return result, reason
+
+    async def _timed(self, tier, call):
+        stats = CASCADE_STATS["tiers"][tier]
+        stats["calls"] += 1
+        started = time.perf_counter()
+        try:
+            return await call
+        finally:
+            stats["latencies_ms"].append((time.perf_counter() - started) * 1000)
+
+
+def confidence_problem(result: dict):
+    # A thin answer for the verdict the local skill match gave: too few questions, or no reasons/suggestions
+    if result.get("Suitability") == "Yes":
+        if len(result.get("Interview Questions") or []) < CASCADE_MIN_QUESTIONS or not result.get("Behavioral Questions"):
+            return "low_confidence"
+    elif not result.get("Reasons for Unsuitability") or not result.get("Suggestions"):
+        return "low_confidence"
+    return None
+
+
+def resolve_models(registry, model_choice: str, priority: int = INTERACTIVE):
+    # Returns (posting_llm, analysis_llm); for "auto" the analysis side is a ModelCascade
+    if model_choice != AUTO_MODEL:
+        llm = registry.get(model_choice, priority)
+        return llm, llm
+    cascade = ModelCascade(registry.get(CASCADE_SMALL_MODEL, priority), registry.get(CASCADE_LARGE_MODEL, priority))
+    return registry.get(CASCADE_EXTRACTION_MODEL, priority), cascade
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+def cascade_stats() -> dict:
+    tiers = {}
+    for tier, stats in CASCADE_STATS["tiers"].items():
+        latencies = stats["latencies_ms"]
+        tiers[tier] = {"model": CASCADE_SMALL_MODEL if tier == "small" else CASCADE_LARGE_MODEL,
+                       "calls": stats["calls"], "served": stats["served"],
+                       "hit_rate": round(stats["served"] / stats["calls"], 3) if stats["calls"] else None,
+                       "p50_ms": percentile(latencies, 0.5), "p95_ms": percentile(latencies, 0.95)}
+
+    requests = CASCADE_STATS["requests"]
+    small_price = MODEL_PRICES.get(CASCADE_SMALL_MODEL)
+    large_price = MODEL_PRICES.get(CASCADE_LARGE_MODEL)
+    cost_ratio = None
+    if requests and small_price and large_price:
+        # Prompt sizes are about the same on both tiers, so calls x price approximates spend
+        spent = tiers["small"]["calls"] * small_price + tiers["large"]["calls"] * large_price
+        cost_ratio = round(spent / (requests * large_price), 3)
+    return {
+        "requests": requests,
+        "tiers": tiers,
+        "escalations": dict(CASCADE_STATS["escalations"]),
+        "escalation_rate": round(tiers["large"]["calls"] / requests, 3) if requests else None,
+        "p50_ms": percentile(CASCADE_STATS["latencies_ms"], 0.5),
+        "p95_ms": percentile(CASCADE_STATS["latencies_ms"], 0.95),
+        # Estimated spend relative to sending every analysis to the large model (1.0 = no savings)
+        "cost_vs_large_only": cost_ratio,
+    }
@@ -0,0 +1,235 @@
+# compact.py
+import json
+import os
+import re
+
+# --- Token counting ---
+# tiktoken is optional. Groq's Llama/Gemma/Qwen tokenizers aren't shipped, so cl100k is used as a close
+# stand-in when available and a chars/4 estimate otherwise. Budgets have headroom for the difference.
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+# Context windows of the models in routes/analyze.py ALLOWED_MODELS
+MODEL_CONTEXT_TOKENS = {
+    "llama-3.3-70b-versatile": 128000,
+    "llama-3.1-8b-instant": 128000,
+    "llama-3.2-3b-preview": 8192,
+    "gemma2-9b-it": 8192,
+    "qwen-2.5-32b": 128000,
+}
+# Room for the static instructions/examples and the JSON answer
+PROMPT_OVERHEAD_TOKENS = 2500
+# Even large-context models don't need more than this to read a posting or resume, and it keeps latency down
+PAGE_TOKEN_BUDGET = int(os.getenv("PAGE_TOKEN_BUDGET", "3000"))
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+
+
+def input_budget(model_name: str, cap: int, share: float = 1.0) -> int:
+    # share: fraction of the model's free context this input may use (the combined prompt splits it)
+    context = MODEL_CONTEXT_TOKENS.get(model_name, 8192)
+    return max(256, min(cap, int((context - PROMPT_OVERHEAD_TOKENS) * share)))
+
+
+# --- HTML boilerplate removal ---
+# <header> is kept: job pages often put the title there, and site navigation is in <nav> anyway
+_DROP_TAGS = ("script", "style", "noscript", "template", "svg", "nav", "footer", "aside",
+              "form", "iframe", "button", "select")
+_BOILERPLATE_RE = re.compile(
+    r"cookie|consent|gdpr|banner|navbar|nav-|menu|breadcrumb|footer|share|social|newsletter|"
+    r"signup|sign-up|login|modal|popup|related|recommend|similar-jobs|sidebar",
+    re.I,
+)
+_JOB_SECTION_RE = re.compile(r"job[-_]?(description|details|posting|body|content)|posting|vacancy|description", re.I)
+_MIN_SECTION_CHARS = 400
+
+
+def _json_ld_job_description(doc):
+    # Many career sites embed schema.org JobPosting JSON-LD, the cleanest source there is
+    for script in doc.iter("script"):
+        if (script.get("type") or "").lower() != "application/ld+json" or not script.text:
+            continue
+        try:
+            data = json.loads(script.text)
+        except ValueError:
+            continue
+        for item in (data if isinstance(data, list) else data.get("@graph", [data])):
+            if isinstance(item, dict) and item.get("@type") == "JobPosting" and item.get("description"):
+                title = item.get("title", "")
+                import lxml.html
+                description = lxml.html.fromstring(item["description"]).text_content() if "<" in item["description"] else item["description"]
+                return f"{title}\n{description}".strip()
+    return None
+
+
+def _element_text(element) -> str:
+    # One text node per line so block elements don't run together ("RolePython")
+    lines = (" ".join(chunk.split()) for chunk in element.itertext())
+    return "\n".join(line for line in lines if line)
+
+
+def extract_job_text(html: str) -> str:
+    # Page HTML -> text of the job posting with navigation, footers, cookie banners etc. removed
+    if not html or not html.strip():
+        return ""
+    import lxml.html
+    doc = lxml.html.fromstring(html)
+    json_ld = _json_ld_job_description(doc)
+    if json_ld and len(json_ld) >= _MIN_SECTION_CHARS:
+        return json_ld
+
+    for element in list(doc.iter(*_DROP_TAGS)):
+        element.drop_tree()
+    for element in list(doc.iter()):
+        if not isinstance(element.tag, str) or element.getparent() is None:
+            continue
+        marker = f"{element.get('id', '')} {element.get('class', '')} {element.get('role', '')}"
+        if marker.strip() and _BOILERPLATE_RE.search(marker) and not _JOB_SECTION_RE.search(marker):
+            element.drop_tree()
+
+    # Prefer an element that looks like the posting body, then <main>/<article>, then the whole page
+    candidates = [el for el in doc.iter() if isinstance(el.tag, str)
+                  and _JOB_SECTION_RE.search(f"{el.get('id', '')} {el.get('class', '')}")]
+    candidates += list(doc.iter("main", "article"))
+    for element in candidates:
+        text = _element_text(element)
+        if len(text) >= _MIN_SECTION_CHARS:
+            return text
+    return _element_text(doc)
+
+
+# --- Section-aware trimming ---
+_JOB_KEYWORDS = re.compile(
+    r"responsibilit|requirement|qualification|skill|experience|you will|you'll|must have|nice to have|"
+    r"preferred|proficien|knowledge of|familiar|degree|years|role|about the job|what you|tech stack|stack",
+    re.I,
+)
+
+# Resume section headings, highest value first. Unknown sections rank between Education and Awards.
+RESUME_SECTION_PRIORITY = [
+    "skills", "experience", "projects", "summary", "certifications", "education", "other",
+    "publications", "awards", "volunteer", "languages", "interests", "references",
+]
+_RESUME_HEADINGS = {
+    "skills": ["skills", "technical skills", "core competencies", "technologies", "tech stack", "tools"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history"],
+    "projects": ["projects", "personal projects", "key projects", "portfolio"],
+    "summary": ["summary", "professional summary", "profile", "objective", "about me", "about"],
+    "certifications": ["certifications", "certificates", "licenses", "licenses & certifications"],
+    "education": ["education", "academic background", "qualifications"],
+    "publications": ["publications", "research", "papers"],
+    "awards": ["awards", "honors", "achievements", "honors & awards"],
+    "volunteer": ["volunteer", "volunteering", "volunteer experience", "community"],
+    "languages": ["languages"],
+    "interests": ["interests", "hobbies", "hobbies & interests", "activities"],
+    "references": ["references", "referees"],
+}
+_HEADING_LOOKUP = {alias: name for name, aliases in _RESUME_HEADINGS.items() for alias in aliases}
+_PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?\d+\s*(of\s*\d+)?\s*$", re.I)
+
+
+def normalize_resume_text(text: str) -> str:
+    # Collapse whitespace and drop page numbers. PDF pages are separated by form feeds (utility/parse.py);
+    # a short line at the top or bottom of several pages is a running header/footer and is dropped too.
+    # Repeated lines anywhere else ("Remote", "Python" under each job) are content and stay.
+    pages = [[" ".join(line.split()) for line in page.splitlines()] for page in (text or "").split("\f")]
+    edges = {}
+    for page in pages:
+        content = [line for line in page if line and not _PAGE_NUMBER_RE.match(line)]
+        for line in set(content[:2] + content[-2:]):
+            edges[line] = edges.get(line, 0) + 1
+    running = {line for line, count in edges.items() if count > 1 and len(line) < 80}
+    out, blank = [], False
+    for line in (line for page in pages for line in page):
+        if not line:
+            if out and not blank:
+                out.append("")
+            blank = True
+            continue
+        if _PAGE_NUMBER_RE.match(line) or line in running:
+            continue
+        out.append(line)
+        blank = False
+    return "\n".join(out).strip()
+
+
+def split_resume_sections(text: str):
+    # [(section_name, text)], keeping document order. Text before the first heading counts as summary.
+    sections = []
+    name, buffer = "summary", []
+    for line in text.splitlines():
+        key = line.strip().strip(":").lower()
+        if key in _HEADING_LOOKUP and len(line) < 50:
+            if buffer:
+                sections.append((name, "\n".join(buffer)))
+            name, buffer = _HEADING_LOOKUP[key], [line]
+        else:
+            buffer.append(line)
+    if buffer:
+        sections.append((name, "\n".join(buffer)))
+    return sections
+
+
+def _trim_to_budget(blocks, budget: int):
+    # blocks: [(priority, text)] in document order, lower priority number = more valuable.
+    # Drops the least valuable blocks first; the last one standing is cut to fit.
+    kept = [[priority, text, count_tokens(text)] for priority, text in blocks]
+    total = sum(block[2] for block in kept)
+    for block in sorted(kept, key=lambda b: b[0], reverse=True):
+        if total <= budget:
+            break
+        overflow = total - block[2]
+        if overflow >= budget:
+            total -= block[2]
+            block[1], block[2] = "", 0
+        else:
+            # Keep the head of this block, it usually holds the most important lines
+            room = budget - overflow
+            block[1] = block[1][: max(0, room * 4)]
+            new_count = count_tokens(block[1])
+            total = total - block[2] + new_count
+            block[2] = new_count
+    return "\n\n".join(text for _, text, _ in kept if text)
+
+
+def compact_job_text(page_text: str, model_name: str):
+    # Returns (compacted_text, tokens_saved). Paragraphs with no job vocabulary go first.
+    before = count_tokens(page_text)
+    budget = input_budget(model_name, PAGE_TOKEN_BUDGET)
+    if before <= budget:
+        return page_text, 0
+    paragraphs = [p for p in re.split(r"\n\s*\n|\n(?=[A-Z][^\n]{0,60}:?\n)", page_text) if p.strip()]
+    if len(paragraphs) < 3:
+        paragraphs = [line for line in page_text.splitlines() if line.strip()]
+    blocks = []
+    for paragraph in paragraphs:
+        hits = len(_JOB_KEYWORDS.findall(paragraph))
+        priority = 0 if hits >= 2 else 1 if hits == 1 else 2
+        blocks.append((priority, paragraph))
+    compacted = _trim_to_budget(blocks, budget)
+    return compacted, before - count_tokens(compacted)
+
+
+def compact_resume_text(resume_text: str, model_name: str, share: float = 1.0):
+    # Returns (compacted_text, tokens_saved). Normalization always runs; sections are trimmed by priority.
+    before = count_tokens(resume_text)
+    text = normalize_resume_text(resume_text)
+    budget = input_budget(model_name, RESUME_TOKEN_BUDGET, share)
+    if count_tokens(text) > budget:
+        blocks = []
+        for name, section in split_resume_sections(text):
+            rank = RESUME_SECTION_PRIORITY.index(name) if name in RESUME_SECTION_PRIORITY else RESUME_SECTION_PRIORITY.index("other")
+            blocks.append((rank, section))
+        text = _trim_to_budget(blocks, budget)
+    return text, max(0, before - count_tokens(text))
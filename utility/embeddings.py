@@ -0,0 +1,179 @@
+# embeddings.py
+import hashlib
+import json
+import os
+import re
+import zlib
+from functools import lru_cache
+
+# Local, deterministic phrase embeddings: hashed character n-grams (2-4, word-boundary padded) plus the
+# whole words, signed-hashed into EMBED_DIM buckets and L2-normalized. No model download, no network,
+# and "PostgresSQL"/"Postgres SQL"/"postgresql" land close together while "Java" and "JavaScript" don't.
+# The skill vocabulary is embedded ahead of time into a matrix that is memory-mapped at runtime
+# (SKILL_VECTORS_PATH), so every uvicorn worker shares one copy through the page cache.
+EMBED_DIM = int(os.getenv("EMBED_DIM", "512"))
+NGRAM_SIZES = (2, 3, 4)
+SKILL_VECTORS_PATH = os.getenv("SKILL_VECTORS_PATH") # .npy; labels go next to it as .json
+SKILL_VOCAB_FILE = os.getenv("SKILL_VOCAB_FILE") # "phrase,canonical" lines to extend the vocabulary
+PHRASE_CACHE_SIZE = 50000
+
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+_vocabulary = None
+
+
+def phrase_words(phrase: str):
+    return _WORD_RE.findall(phrase.lower())
+
+
+@lru_cache(maxsize=PHRASE_CACHE_SIZE)
+def phrase_features(phrase: str):
+    # (bucket indices, signs) arrays for one phrase; resumes repeat words across requests, so this is cached
+    import numpy as np
+    words = phrase_words(phrase)
+    features = [f"w:{word}" for word in words]
+    for word in words:
+        padded = f"<{word}>"
+        for size in NGRAM_SIZES:
+            features.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+    codes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features))
+    signs = np.where(codes & 0x80000000, 1.0, -1.0).astype(np.float32)
+    return (codes % EMBED_DIM).astype(np.intp), signs
+
+
+def embed(phrases):
+    # (len(phrases), EMBED_DIM) float32, rows L2-normalized (all-zero rows stay zero). One bincount
+    # over the flattened (row, bucket) indices instead of a Python loop per phrase.
+    import numpy as np
+    if not phrases:
+        return np.zeros((0, EMBED_DIM), dtype=np.float32)
+    features = [phrase_features(phrase) for phrase in phrases]
+    lengths = np.fromiter((len(buckets) for buckets, _ in features), dtype=np.intp, count=len(features))
+    flat = np.repeat(np.arange(len(features), dtype=np.intp) * EMBED_DIM, lengths) + np.concatenate([buckets for buckets, _ in features])
+    weights = np.concatenate([signs for _, signs in features])
+    matrix = np.bincount(flat, weights=weights, minlength=len(features) * EMBED_DIM).astype(np.float32).reshape(len(features), EMBED_DIM)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class SkillVocabulary:
+    # Embedded skill phrases (aliases included) with the canonical skill each one stands for
+    def __init__(self, matrix, phrases, labels):
+        self.matrix = matrix
+        self.phrases = phrases
+        self.labels = labels
+
+    def top_k(self, queries, k: int = 5):
+        # For each query row: [(canonical, phrase, score), ...] best first. One matrix product for the
+        # whole batch, then argpartition so only k entries per query get sorted.
+        import numpy as np
+        if len(queries) == 0 or len(self.labels) == 0:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self.matrix.T # (queries, vocabulary)
+        k = min(k, scores.shape[1])
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1).tolist()
+        best_scores = np.take_along_axis(best_scores, order, axis=1).tolist()
+        return [[(self.labels[i], self.phrases[i], score) for i, score in zip(row, row_scores)]
+                for row, row_scores in zip(best, best_scores)]
+
+
+def vocabulary_phrases(synonyms, vocab_file=None):
+    # (phrases, canonical labels): every canonical name and alias, plus the extra file if given
+    phrases, labels, seen = [], [], set()
+
+    def add(phrase, canonical):
+        key = phrase.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            phrases.append(phrase.strip())
+            labels.append(canonical.strip())
+
+    for canonical, aliases in synonyms.items():
+        add(canonical, canonical)
+        for alias in aliases:
+            add(alias, canonical)
+    if vocab_file:
+        with open(vocab_file, encoding="utf-8") as f:
+            for line in f:
+                phrase, _, canonical = line.rstrip("\n").partition(",")
+                add(phrase, canonical or phrase)
+    return phrases, labels
+
+
+def vocabulary_hash(phrases, labels) -> str:
+    # Fingerprint of what the matrix was built from: the skill dictionary, SKILL_VOCAB_FILE and the embedding settings
+    payload = json.dumps([EMBED_DIM, list(NGRAM_SIZES), phrases, labels], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def save_vocabulary(path: str, phrases, labels):
+    # Precompute: embed the vocabulary once and write the matrix (.npy), then its labels and vocabulary hash
+    # (.json). Both go through a temp file and a rename, so workers building it at the same time never read
+    # half a file, and a .json with the current hash always sits next to the matching matrix.
+    import numpy as np
+    suffix = f".{os.getpid()}.tmp"
+    with open(path + suffix, "wb") as f:
+        np.save(f, embed(phrases))
+    os.replace(path + suffix, path)
+    meta = {"dim": EMBED_DIM, "ngrams": list(NGRAM_SIZES), "vocab_hash": vocabulary_hash(phrases, labels),
+            "phrases": phrases, "labels": labels}
+    with open(labels_path(path) + suffix, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(labels_path(path) + suffix, labels_path(path))
+
+
+def stored_hash(path: str):
+    # The vocabulary hash saved next to the matrix, or None if either file is missing or unreadable
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(labels_path(path), encoding="utf-8") as f:
+            return json.load(f).get("vocab_hash")
+    except (OSError, ValueError):
+        return None
+
+
+def load_vocabulary(path: str) -> SkillVocabulary:
+    import numpy as np
+    with open(labels_path(path), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta["dim"] != EMBED_DIM or meta["ngrams"] != list(NGRAM_SIZES):
+        raise ValueError(f"{path} was built with different embedding settings; rebuild it")
+    return SkillVocabulary(np.load(path, mmap_mode="r"), meta["phrases"], meta["labels"])
+
+
+def labels_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+def get_vocabulary() -> SkillVocabulary:
+    # The skill dictionary (utility/skills.py) plus SKILL_VOCAB_FILE. With SKILL_VECTORS_PATH the matrix is
+    # built on first use if missing or built from a different vocabulary (hash mismatch), then memory-mapped;
+    # without it, it's small enough to embed in memory.
+    global _vocabulary
+    if _vocabulary is None:
+        from utility.skills import SKILL_SYNONYMS
+        phrases, labels = vocabulary_phrases(SKILL_SYNONYMS, SKILL_VOCAB_FILE)
+        if SKILL_VECTORS_PATH:
+            if stored_hash(SKILL_VECTORS_PATH) != vocabulary_hash(phrases, labels):
+                save_vocabulary(SKILL_VECTORS_PATH, phrases, labels)
+            _vocabulary = load_vocabulary(SKILL_VECTORS_PATH)
+        else:
+            _vocabulary = SkillVocabulary(embed(phrases), phrases, labels)
+    return _vocabulary
+
+
+if __name__ == "__main__":
+    # python -m utility.embeddings skill_vectors.npy [--vocab skills.csv]
+    import argparse
+    from utility.skills import SKILL_SYNONYMS
+    parser = argparse.ArgumentParser(description="Precompute the skill vocabulary matrix for SKILL_VECTORS_PATH.")
+    parser.add_argument("output")
+    parser.add_argument("--vocab", default=SKILL_VOCAB_FILE, help="Extra 'phrase,canonical' lines")
+    args = parser.parse_args()
+    phrases, labels = vocabulary_phrases(SKILL_SYNONYMS, args.vocab)
+    save_vocabulary(args.output, phrases, labels)
+    print(f"{len(phrases)} phrases x {EMBED_DIM} dims -> {args.output}")
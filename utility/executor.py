@@ -0,0 +1,160 @@
+# executor.py
+import asyncio
+import importlib
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from utility.observability import log
+
+# Bounded pool for the blocking bits that release the GIL or wait on I/O (HTML to text, CSV reading)
+# so they never run on the event loop thread. Size it with BLOCKING_WORKERS.
+MAX_BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "8"))
+
+# CPU-heavy document parsing (PyPDF2 is pure Python) goes to worker processes instead, so a huge or
+# hostile upload burns its own CPU/memory rather than stalling every request on the event loop.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", "20"))  # Seconds per document before the worker is killed
+# After a timeout, how long the other documents already running in that pool get to finish before it's killed
+PARSE_RETIRE_GRACE = float(os.getenv("PARSE_RETIRE_GRACE", "5"))
+PARSE_MAX_TASKS_PER_CHILD = int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", "100"))  # Recycle workers to return leaked memory
+PARSE_MEMORY_LIMIT_MB = int(os.getenv("PARSE_MEMORY_LIMIT_MB", "1024"))  # Address-space cap per worker, 0 disables
+# forkserver: workers don't inherit the server's threads/sockets, and it's required for max_tasks_per_child
+PARSE_START_METHOD = os.getenv("PARSE_START_METHOD", "forkserver")
+# Imported in each worker at startup so the first real task doesn't pay for it
+PARSE_WARM_MODULES = ("utility.parse", "PyPDF2", "docx")
+
+_executor = None
+_process_pool = None
+_in_flight = {} # pool -> concurrent futures of the tasks submitted to it that haven't finished
+_retiring = {} # pool -> task that kills it once its other tasks are done
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_BLOCKING_WORKERS, thread_name_prefix="blocking")
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    # Run a sync function in the bounded pool and await its result
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
+
+
+def _init_parse_worker(memory_limit_mb, warm_modules):
+    for module in warm_modules:
+        importlib.import_module(module)
+    if memory_limit_mb > 0:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            log("parse_worker_memory_limit_not_applied", level="warning", error=str(e))
+
+
+def _worker_ready():
+    return True
+
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context(PARSE_START_METHOD),
+            initializer=_init_parse_worker,
+            initargs=(PARSE_MEMORY_LIMIT_MB, PARSE_WARM_MODULES),
+            max_tasks_per_child=PARSE_MAX_TASKS_PER_CHILD or None,
+        )
+    return _process_pool
+
+
+async def warm_process_pool():
+    # Start every worker up front (one no-op task each) so the first uploads don't wait on process startup
+    pool = get_process_pool()
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(pool, _worker_ready) for _ in range(PARSE_WORKERS)))
+    log("parse_pool_started", workers=PARSE_WORKERS, start_method=PARSE_START_METHOD)
+
+
+def _discard_process_pool(pool):
+    # Kill the pool's workers and drop it. Tasks still running on it fail with BrokenProcessPool and get
+    # retried on the replacement pool.
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    _in_flight.pop(pool, None)
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _retire_process_pool(pool):
+    # A stuck worker can't be cancelled, only killed, and killing any worker breaks the whole pool. So new
+    # tasks go to a fresh pool right away. Tasks no worker has picked up yet are moved there too, and the
+    # ones already running get PARSE_RETIRE_GRACE seconds to finish before the pool is killed; any still
+    # running then fail with BrokenProcessPool and are retried on the new pool.
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    if pool in _retiring:
+        return
+    for task in list(_in_flight.get(pool, ())):
+        task.cancel() # Only succeeds for tasks that haven't been handed to a worker
+    others = [task for task in _in_flight.get(pool, ()) if not task.done()]
+    if not others or pool._max_workers == 1: # With one worker, nothing else can be running
+        _discard_process_pool(pool)
+        return
+
+    async def discard_when_done():
+        await asyncio.wait([asyncio.wrap_future(task) for task in others], timeout=PARSE_RETIRE_GRACE)
+        _retiring.pop(pool, None)
+        _discard_process_pool(pool)
+    _retiring[pool] = asyncio.get_running_loop().create_task(discard_when_done())
+
+
+async def run_in_process(func, *args, timeout: float = PARSE_TIMEOUT, retries: int = 1):
+    # func and args must be picklable: pass bytes, not UploadFile. Raises TimeoutError when the task
+    # runs past `timeout` and MemoryError when it hits the worker's memory limit.
+    pool = get_process_pool()
+    task = pool.submit(func, *args)
+    _in_flight.setdefault(pool, set()).add(task)
+    future = asyncio.wrap_future(task)
+    try:
+        done, _ = await asyncio.wait({future}, timeout=timeout)
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        _in_flight.get(pool, set()).discard(task)
+    if not done:
+        future.cancel()
+        _retire_process_pool(pool)
+        raise TimeoutError(f"{getattr(func, '__name__', 'task')} took longer than {timeout:g}s")
+    if future.cancelled(): # Never started: its pool was retired, run it on the new one
+        return await run_in_process(func, *args, timeout=timeout, retries=retries)
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _discard_process_pool(pool)
+        if retries > 0:
+            return await run_in_process(func, *args, timeout=timeout, retries=retries - 1)
+        raise
+
+
+def shutdown_executor():
+    global _executor, _process_pool
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+    for pool, task in list(_retiring.items()): # Still running a stuck task: don't wait for it
+        task.cancel()
+        _discard_process_pool(pool)
+    _retiring.clear()
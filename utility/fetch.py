@@ -0,0 +1,172 @@
+# fetch.py
+import asyncio
+import codecs
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+import httpx
+from utility.executor import run_blocking
+from utility.compact import extract_job_text
+from utility.cache import build_cache
+from utility.observability import span
+
+# One pooled client for every job-page fetch. Timeouts are per phase (connect, then each read), plus
+# FETCH_DEADLINE for the whole fetch so a site trickling bytes can't hold a request forever.
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", "5"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "20")) # Seconds, including the wait for a per-host slot
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(3 * 1024 * 1024))) # Decoded body size cap
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", "4")) # Concurrent fetches per host
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "64"))
+# ETag / Last-Modified per URL with the text extracted from that version. When the page cache entry
+# expires the page is revalidated, and a 304 reuses the text instead of downloading and parsing it again.
+validator_cache = build_cache("page_validators", maxsize=int(os.getenv("FETCH_VALIDATOR_CACHE_SIZE", "1024")))
+
+FETCH_STATS = {"downloaded": 0, "not_modified": 0, "too_large": 0, "timeouts": 0, "errors": 0, "bytes": 0}
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+# Per the HTML spec these labels mean windows-1252
+_CP1252_ALIASES = {"ascii", "us-ascii", "iso-8859-1", "iso8859-1", "latin-1", "latin1"}
+
+_client = None
+
+
+class PageTooLarge(Exception):
+    pass
+
+
+class HostLimiter:
+    # A semaphore per host, dropped again once nobody holds or waits on it so the map stays small
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._hosts = {} # host -> [semaphore, holders + waiters]
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._hosts.pop(host, None)
+
+
+host_limiter = HostLimiter(FETCH_PER_HOST)
+
+
+def get_fetch_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=FETCH_MAX_CONNECTIONS, max_keepalive_connections=FETCH_MAX_CONNECTIONS // 2),
+            follow_redirects=True,
+            headers={"User-Agent": os.getenv("USER_AGENT", "GenAICareerConsultant/1.0")},
+        )
+    return _client
+
+
+async def close_fetch_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _codec(label) -> Optional[str]:
+    # Normalized codec name, or None if Python doesn't know the label
+    if not label:
+        return None
+    label = label.strip().strip("\"'").lower()
+    if label in _CP1252_ALIASES:
+        return "cp1252"
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def decode_html(body: bytes, content_type: str = "") -> str:
+    # BOM, then the Content-Type charset, then a <meta charset> near the top, then UTF-8 if it decodes
+    # cleanly, else windows-1252 (what browsers assume for legacy pages)
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be")):
+        if body.startswith(bom):
+            return body[len(bom):].decode(encoding, errors="replace")
+    encoding = _codec(content_type.partition("charset=")[2].split(";")[0]) if "charset=" in content_type else None
+    if encoding is None:
+        match = _META_CHARSET.search(body[:4096])
+        encoding = _codec(match.group(1).decode("ascii")) if match else None
+    if encoding is not None:
+        return body.decode(encoding, errors="replace")
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode("cp1252", errors="replace")
+
+
+async def read_capped(response: httpx.Response, limit: int = FETCH_MAX_BYTES) -> bytes:
+    length = response.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise PageTooLarge(f"Page is larger than {limit} bytes")
+    chunks, size = [], 0
+    # aiter_bytes is after gzip/brotli decoding, so the cap also covers compressed bombs
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > limit:
+            raise PageTooLarge(f"Page is larger than {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def fetch_page_text(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    try:
+        return await asyncio.wait_for(_fetch(url, host), FETCH_DEADLINE)
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        FETCH_STATS["timeouts"] += 1
+        raise TimeoutError(f"Fetching {host} took longer than {FETCH_DEADLINE:g}s")
+    except PageTooLarge:
+        FETCH_STATS["too_large"] += 1
+        raise
+    except Exception:
+        FETCH_STATS["errors"] += 1
+        raise
+
+
+async def _fetch(url: str, host: str) -> str:
+    cached = await validator_cache.aget(url)
+    headers = {}
+    if cached is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    with span("fetch", host=host) as attrs:
+        async with host_limiter.slot(host):
+            async with get_fetch_client().stream("GET", url, headers=headers) as response:
+                attrs["status"] = response.status_code
+                if response.status_code == 304 and cached is not None:
+                    FETCH_STATS["not_modified"] += 1
+                    return cached["text"]
+                response.raise_for_status()
+                body = await read_capped(response)
+        attrs["bytes"] = len(body)
+    FETCH_STATS["downloaded"] += 1
+    FETCH_STATS["bytes"] += len(body)
+
+    html = decode_html(body, response.headers.get("content-type", ""))
+    # lxml parsing and boilerplate removal are CPU-bound, keep them off the event loop
+    with span("html_extract"):
+        text = await run_blocking(extract_job_text, html)
+    etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+    if etag or last_modified:
+        await validator_cache.aset(url, {"etag": etag, "last_modified": last_modified, "text": text})
+    return text
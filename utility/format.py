@@ -1,4 +1,8 @@
 # format.py
+import html
+import string
+from itertools import chain
+from operator import itemgetter
 
 # Helper to ensure list format, especially for potentially string-based list returns from LLM
 def ensure_list(val):
@@ -52,66 +56,224 @@ def ensure_question_list(val):
      return [] # Default to empty list
 
 
-# --- Format the Analysis Output as an HTML Fragment ---
-def format_string_response(result, job_info):
-    # Extract data using .get() with defaults and ensure correct types
-    suitability = result.get("Suitability", "N/A")
-    # Use helpers to ensure lists
-    interview_questions = ensure_question_list(result.get("Interview Questions", []))
-    behavioral_questions = ensure_list(result.get("Behavioral Questions", []))
-    unsuitability_reasons = ensure_list(result.get("Reasons for Unsuitability", []))
-    suggestions = ensure_list(result.get("Suggestions", []))
-    matched_skills = ensure_list(result.get("Matched Skills", []))
-    skill_match_percentage = result.get("Skill Match Percentage", "N/A")
-    
-    # Format HTML base structure
-    html = f"""
-    <div class="analysis-result">
-        <h2>Suitability: {suitability}</h2>
+# --- Templates ---
+# Every section is a Template turned once at import into a %-format string with one %s per field. Field
+# values are HTML-escaped unless they are Markup (already rendered): model output and scraped job text can
+# contain markup, and none of it may reach the page as HTML. The whole result is assembled from a list of
+# sections joined once.
+class Markup(str):
+    # Trusted HTML, inserted as is
+    __slots__ = ()
 
-        <h3>Job Details</h3>
-        <p><strong>Role:</strong> {job_info.get("role", "N/A")}</p>
-        <p><strong>Description:</strong> {job_info.get("description", "N/A")}</p>
-        <p><strong>Skills Required:</strong> {', '.join(job_info.get("skills", []))}</p>
 
+_ESCAPED_CHARS = ("&", "<", ">", '"', "'")
+
+
+def needs_escape(text: str) -> bool:
+    return any(char in text for char in _ESCAPED_CHARS)
+
+
+def escape(value) -> str:
+    if isinstance(value, Markup):
+        return value
+    return html.escape(value if isinstance(value, str) else str(value))
+
+
+class Template:
+    # The template's own text goes into the format string with "%" doubled, so only the escaped values are
+    # ever interpolated; nothing is compiled or evaluated
+    def __init__(self, source: str):
+        literals, fields = [], []
+        for literal, field, _, _ in string.Formatter().parse(source):
+            literals.append(literal)
+            if field is not None:
+                fields.append(field)
+        if len(literals) == len(fields):
+            literals.append("")
+        self.format = "%s".join(literal.replace("%", "%%") for literal in literals)
+        self.fields = tuple(fields)
+        # A one-field template's rows are just the values joined with the text around the field
+        self.prefix, self.suffix = literals[0], literals[-1]
+
+    def render(self, **values) -> Markup:
+        return Markup(self.format % tuple([escape(values[field]) for field in self.fields]))
+
+    def render_rows(self, rows) -> Markup:
+        # rows: one value per row for a one-field template, else a tuple per row. One scan of the joined
+        # values decides whether anything needs escaping; usually nothing does and the rows are formatted
+        # as they are.
+        if not rows:
+            return Markup("")
+        single = len(self.fields) == 1
+        values = rows if single else list(chain.from_iterable(rows))
+        try:
+            probe = "".join(values)
+        except TypeError: # Numbers, None and the like: format them as text first
+            values = list(map(str, values))
+            probe = "".join(values)
+            rows = values if single else list(zip(*[iter(values)] * len(self.fields)))
+        if needs_escape(probe):
+            rows = list(map(html.escape, rows)) if single else [tuple(map(html.escape, row)) for row in rows]
+        if single:
+            return Markup(self.prefix + (self.suffix + self.prefix).join(rows) + self.suffix)
+        fmt = self.format
+        return Markup("".join([fmt % row for row in rows]))
+
+
+SUITABILITY = Template("<h2>Suitability: {suitability}</h2>")
+JOB_DETAILS = Template("""
+        <h3>Job Details</h3>
+        <p><strong>Role:</strong> {role}</p>
+        <p><strong>Description:</strong> {description}</p>
+        <p><strong>Skills Required:</strong> {skills}</p>
+    """)
+MATCHED_SKILLS = Template("""
         <h3>Matched Skills</h3>
-        <p><strong>Percentage:</strong> {skill_match_percentage}%</p>
+        <p><strong>Percentage:</strong> {percentage}%</p>
         <ul>
-            {''.join(f'<li>{skill}</li>' for skill in matched_skills)}
+            {items}
         </ul>
-    """
-    
-    # Add conditional sections based on suitability
-    if suitability.lower() == "yes":
-        tech_questions_html = "".join(
-            f"<li><strong>Q:</strong> {item.get('Question', 'N/A')}<br><strong>A:</strong> {item.get('Answer', 'N/A')}</li>"
-            for item in interview_questions
-        )
-        behav_questions_html = "".join(
-            f"<li>{q}</li>"
-            for q in behavioral_questions
-        )
-
-        html += f"""
-            <h3>Interview Questions</h3>
-            <h4>Technical Questions:</h4>
-            <ul>{tech_questions_html if tech_questions_html else "<li>No technical questions generated.</li>"}</ul>
-            <h4>Behavioral Questions:</h4>
-            <ul>{behav_questions_html if behav_questions_html else "<li>No behavioral questions generated.</li>"}</ul>
-        """
-    elif suitability.lower() == "no":
-        reasons_html = "".join(f"<li>{r}</li>" for r in unsuitability_reasons)
-        suggestions_html = "".join(f"<li>{s}</li>" for s in suggestions)
-        html += f"""
-            <h3>Reasons for Unsuitability</h3>
-            <ul>{reasons_html if reasons_html else "<li>No specific reasons provided.</li>"}</ul>
-            <h3>Suggestions for Improvement</h3>
-            <ul>{suggestions_html if suggestions_html else "<li>No specific suggestions provided.</li>"}</ul>
+    """)
+LIST_SECTION = Template("""
+            {header}
+            <ul>{items}</ul>""")
+ITEM = Template("<li>{text}</li>")
+QUESTION_ITEM = Template("<li><strong>Q:</strong> {question}<br><strong>A:</strong> {answer}</li>")
+
+RESULT_START = """
+    <div class="analysis-result">
         """
+INTERVIEW_QUESTIONS_HEADER = "\n            <h3>Interview Questions</h3>"
+UNCLEAR_SUITABILITY = "<p>Analysis result did not clearly indicate suitability.</p>"
+SECTION_END = "\n        "
+RESULT_END = "</div>"
+
+TECHNICAL_HEADER = Markup("<h4>Technical Questions:</h4>")
+BEHAVIORAL_HEADER = Markup("<h4>Behavioral Questions:</h4>")
+REASONS_HEADER = Markup("<h3>Reasons for Unsuitability</h3>")
+SUGGESTIONS_HEADER = Markup("<h3>Suggestions for Improvement</h3>")
+NO_TECHNICAL = Markup("<li>No technical questions generated.</li>")
+NO_BEHAVIORAL = Markup("<li>No behavioral questions generated.</li>")
+NO_REASONS = Markup("<li>No specific reasons provided.</li>")
+NO_SUGGESTIONS = Markup("<li>No specific suggestions provided.</li>")
+
+
+# --- Section Renderers ---
+# Each renderer returns one self-contained piece of the result fragment, so the streaming
+# endpoint can send sections as soon as the matching JSON key is complete. The render_* ones take
+# already-normalized values (see analysis_view); the format_* ones accept raw model output.
+def join_text(values, separator=", ") -> str:
+    try:
+        return separator.join(values)
+    except TypeError:
+        return separator.join(map(str, values))
+
+def render_job_details(job_info):
+    skills = job_info.get("skills", [])
+    return JOB_DETAILS.render(
+        role=job_info.get("role", "N/A"),
+        description=job_info.get("description", "N/A"),
+        skills=join_text(skills) if isinstance(skills, list) else skills,
+    )
+
+def render_matched_skills(matched_skills, skill_match_percentage="N/A"):
+    return MATCHED_SKILLS.render(percentage=skill_match_percentage, items=ITEM.render_rows(matched_skills))
+
+QUESTION_AND_ANSWER = itemgetter("Question", "Answer")
+
+def render_technical_questions(questions):
+    try:
+        rows = list(map(QUESTION_AND_ANSWER, questions))
+    except KeyError: # Questions parsed out of plain strings may lack a key
+        rows = [(item.get("Question", "N/A"), item.get("Answer", "N/A")) for item in questions]
+    items = QUESTION_ITEM.render_rows(rows)
+    return LIST_SECTION.render(header=TECHNICAL_HEADER, items=items or NO_TECHNICAL)
+
+def render_list_section(header, items, empty):
+    return LIST_SECTION.render(header=header, items=ITEM.render_rows(items) or empty)
+
+def format_suitability_section(suitability):
+    return SUITABILITY.render(suitability=suitability)
+
+def format_job_details_section(job_info):
+    return render_job_details(job_info)
+
+def format_matched_skills_section(matched_skills, skill_match_percentage="N/A"):
+    return render_matched_skills(ensure_list(matched_skills), skill_match_percentage)
+
+def format_technical_questions_section(interview_questions):
+    return render_technical_questions(ensure_question_list(interview_questions))
+
+def format_behavioral_questions_section(behavioral_questions):
+    return render_list_section(BEHAVIORAL_HEADER, ensure_list(behavioral_questions), NO_BEHAVIORAL)
+
+def format_reasons_section(unsuitability_reasons):
+    return render_list_section(REASONS_HEADER, ensure_list(unsuitability_reasons), NO_REASONS)
+
+def format_suggestions_section(suggestions):
+    return render_list_section(SUGGESTIONS_HEADER, ensure_list(suggestions), NO_SUGGESTIONS)
+
+def format_stream_section(key, value, partial_result):
+    # HTML for one completed top-level key of the analysis JSON, or None if the key has no section of its own
+    if key == "Suitability":
+        return format_suitability_section(value)
+    if key == "Matched Skills":
+        return format_matched_skills_section(value, partial_result.get("Skill Match Percentage", "N/A"))
+    if key == "Interview Questions":
+        return INTERVIEW_QUESTIONS_HEADER + format_technical_questions_section(value)
+    if key == "Behavioral Questions":
+        header = "" if "Interview Questions" in partial_result else INTERVIEW_QUESTIONS_HEADER
+        return header + format_behavioral_questions_section(value)
+    if key == "Reasons for Unsuitability":
+        return format_reasons_section(value)
+    if key == "Suggestions":
+        return format_suggestions_section(value)
+    return None
+
+
+# --- Normalized Result ---
+def analysis_view(result, job_info) -> dict:
+    # The analysis with every field coerced once (lists parsed, questions as dicts), shared by the HTML
+    # renderer and the JSON output mode. Keys match the analysis JSON the prompts ask for.
+    suitability = result.get("Suitability", "N/A")
+    view = {
+        "Suitability": suitability if isinstance(suitability, str) else str(suitability),
+        "Skill Match Percentage": result.get("Skill Match Percentage", "N/A"),
+        "Job Details": {
+            "role": job_info.get("role", "N/A"),
+            "description": job_info.get("description", "N/A"),
+            "skills": ensure_list(job_info.get("skills", [])),
+        },
+        "Matched Skills": ensure_list(result.get("Matched Skills", [])),
+    }
+    if view["Suitability"].lower() == "yes":
+        view["Interview Questions"] = ensure_question_list(result.get("Interview Questions", []))
+        view["Behavioral Questions"] = ensure_list(result.get("Behavioral Questions", []))
+    elif view["Suitability"].lower() == "no":
+        view["Reasons for Unsuitability"] = ensure_list(result.get("Reasons for Unsuitability", []))
+        view["Suggestions"] = ensure_list(result.get("Suggestions", []))
+    return view
+
+
+# --- Format the Analysis Output as JSON (clients render it themselves) ---
+def format_json_response(result, job_info) -> dict:
+    return analysis_view(result, job_info)
+
+
+# --- Format the Analysis Output as an HTML Fragment ---
+def format_string_response(result, job_info):
+    view = analysis_view(result, job_info)
+    sections = [RESULT_START, format_suitability_section(view["Suitability"]), "\n",
+                render_job_details(view["Job Details"]), render_matched_skills(view["Matched Skills"], view["Skill Match Percentage"])]
+
+    # Add conditional sections based on suitability
+    if "Interview Questions" in view:
+        sections += [INTERVIEW_QUESTIONS_HEADER, render_technical_questions(view["Interview Questions"]),
+                     render_list_section(BEHAVIORAL_HEADER, view["Behavioral Questions"], NO_BEHAVIORAL), SECTION_END]
+    elif "Reasons for Unsuitability" in view:
+        sections += [render_list_section(REASONS_HEADER, view["Reasons for Unsuitability"], NO_REASONS),
+                     render_list_section(SUGGESTIONS_HEADER, view["Suggestions"], NO_SUGGESTIONS), SECTION_END]
     else:
-        html += "<p>Analysis result did not clearly indicate suitability.</p>"
-    
-    # Close the main div
-    html += "</div>"
-    
-    return html
+        sections.append(UNCLEAR_SUITABILITY)
+    sections.append(RESULT_END)
+    return "".join(sections)
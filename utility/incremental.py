@@ -0,0 +1,178 @@
+# incremental.py
+import hashlib
+import json
+import os
+import re
+import secrets
+from utility.cache import build_cache
+from utility.compact import count_tokens, normalize_resume_text, split_resume_sections
+
+# Incremental re-analysis: with a session token (issued by the server, see new_session_token), the last analysis per session is kept together with a
+# hash of every resume section entry. A resubmission against the same posting only sends the changed entries
+# to the LLM and has it regenerate the affected keys (questions for skills whose match changed, revised
+# reasons/suggestions); everything else is carried over and the skill match is recomputed locally.
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "true").lower() == "true"
+SESSION_STATE_SIZE = int(os.getenv("SESSION_STATE_SIZE", "4096"))
+SESSION_STATE_TTL = float(os.getenv("SESSION_STATE_TTL", "604800"))
+# Past this share of the resume's tokens changed, a full analysis is cheaper to get right
+INCREMENTAL_MAX_CHANGED_SHARE = float(os.getenv("INCREMENTAL_MAX_CHANGED_SHARE", "0.5"))
+MAX_SESSION_TOKEN_LENGTH = 200
+NEW_SESSION = "new" # session_token value that asks for a token to be issued
+MIN_INTERVIEW_QUESTIONS = 5
+# Behavioral questions are written around these sections
+BEHAVIORAL_SECTIONS = {"summary", "experience", "projects", "volunteer", "other"}
+
+session_analyses = build_cache("session_analyses", maxsize=SESSION_STATE_SIZE, ttl=SESSION_STATE_TTL)
+
+# Per mode (full, reused, updated): resubmissions, prompt tokens a full analysis would have sent, tokens sent
+INCREMENTAL_STATS = {mode: {"requests": 0, "full_prompt_tokens": 0, "sent_tokens": 0} for mode in ("full", "reused", "updated")}
+
+
+def new_session_token() -> str:
+    # Unguessable, so nobody can pick up another caller's earlier analysis by trying IDs
+    return secrets.token_urlsafe(24)
+
+
+def session_key(session_token: str) -> str:
+    # Only a hash of the token is stored
+    return hashlib.sha256(session_token.encode("utf-8")).hexdigest()
+
+
+async def session_exists(session_token: str) -> bool:
+    return await load_session(session_token) is not None
+
+
+def context_fingerprint(job_desc, portfolio_skills, model_name: str, analyze_both: bool) -> str:
+    # Everything besides the resume and the job's skill list that the analysis depends on. If any of it
+    # changed the previous answer is not a valid starting point.
+    payload = json.dumps([job_desc.get("role"), job_desc.get("description"), portfolio_skills, model_name, analyze_both], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def resume_sections(resume_text: str) -> dict:
+    # section id -> [entries]: the normalized text (so re-exports that only move whitespace compare equal) split
+    # by heading, then into blank-line separated entries, so editing one job in Experience doesn't resend all of
+    # them. Repeated headings get numbered ids (experience, experience#2, ...).
+    sections, seen = {}, {}
+    for name, text in split_resume_sections(normalize_resume_text(resume_text)):
+        seen[name] = seen.get(name, 0) + 1
+        entries = [entry.strip("\n") for entry in text.split("\n\n") if entry.strip()]
+        sections[name if seen[name] == 1 else f"{name}#{seen[name]}"] = entries
+    return sections
+
+
+def section_name(section: str) -> str:
+    return section.split("#")[0]
+
+
+def section_hashes(sections: dict) -> dict:
+    return {section: [entry_hash(entry) for entry in entries] for section, entries in sections.items()}
+
+
+def entry_hash(entry: str) -> str:
+    return hashlib.sha256(entry.encode("utf-8")).hexdigest()[:16]
+
+
+def diff_sections(previous: dict, sections: dict):
+    # (changed, removed): [(section id, entry)] new or edited since the previous analysis, in document order,
+    # and {section id: entries gone beyond those edited}. Entries are compared by content, so reordering alone changes nothing.
+    changed, removed = [], {}
+    for section, entries in sections.items():
+        before = set(previous.get(section, ()))
+        hashes = [entry_hash(entry) for entry in entries]
+        edits = [(section, entry) for entry, digest in zip(entries, hashes) if digest not in before]
+        changed += edits
+        gone = len(before - set(hashes)) - len(edits) # An edited entry is one new entry in place of an old one
+        if gone > 0:
+            removed[section] = gone
+    for section, hashes in previous.items():
+        if section not in sections:
+            removed[section] = len(set(hashes))
+    return changed, removed
+
+
+def mentions(text: str, skill: str) -> bool:
+    return re.search(rf"(?<![a-z0-9]){re.escape(skill.lower())}(?![a-z0-9+#])", text.lower()) is not None
+
+
+async def load_session(session_token: str):
+    return await session_analyses.aget(session_key(session_token))
+
+
+async def remember_analysis(session_token: str, context: str, job_skills, sections: dict, skill_match: dict, result: dict):
+    await session_analyses.aset(session_key(session_token), {
+        "context": context,
+        "job_skills": list(job_skills),
+        "sections": section_hashes(sections),
+        "matched": skill_match["Matched Skills"],
+        "suitability": skill_match["Suitability"],
+        "result": result,
+    })
+
+
+def plan_update(previous, context: str, job_skills, sections: dict, skill_match: dict):
+    # What a resubmission needs from the LLM, or None for a full analysis:
+    #   {"mode": "reused"}                   nothing the analysis depends on changed
+    #   {"mode": "updated", "keys": [...]}   regenerate these keys from the changed sections
+    # Without a local verdict (posting lists no skills) the LLM's verdict could change with any edit: full analysis.
+    if previous is None or previous["context"] != context or previous["suitability"] != skill_match["Suitability"] or skill_match["Suitability"] is None:
+        return None
+    changed, removed = diff_sections(previous["sections"], sections)
+    total = sum(count_tokens(entry) for entries in sections.values() for entry in entries)
+    if not total or sum(count_tokens(entry) for _, entry in changed) > INCREMENTAL_MAX_CHANGED_SHARE * total:
+        return None
+    touched = list(dict.fromkeys([section for section, _ in changed] + list(removed)))
+
+    # Skills whose matched state flipped, plus skills added to or dropped from the posting
+    was_matched, now_matched = set(previous["matched"]), set(skill_match["Matched Skills"])
+    old_skills, new_skills = set(previous["job_skills"]), set(job_skills)
+    gained = [skill for skill in job_skills if skill in now_matched and (skill not in was_matched or skill not in old_skills)]
+    lost = sorted((was_matched - now_matched) | (old_skills - new_skills))
+    focus = gained + [skill for skill in lost if skill not in gained]
+
+    result = previous["result"]
+    keys, kept_questions, question_count = [], [], 0
+    if skill_match["Suitability"] == "Yes":
+        questions = result.get("Interview Questions") or []
+        kept_questions = [item for item in questions if not any(mentions(json.dumps(item), skill) for skill in focus)]
+        if focus: # Replace the questions on skills that changed, topping the list up to the minimum
+            question_count = max(len(questions) - len(kept_questions), len(gained), MIN_INTERVIEW_QUESTIONS - len(kept_questions))
+        if question_count > 0:
+            keys.append("Interview Questions")
+        if any(section_name(section) in BEHAVIORAL_SECTIONS for section in touched):
+            keys.append("Behavioral Questions")
+    elif touched or focus:
+        keys += ["Reasons for Unsuitability", "Suggestions"]
+    if not keys:
+        return {"mode": "reused"}
+    return {"mode": "updated", "keys": keys, "sections": touched, "changed": changed, "removed": removed, "focus": focus,
+            "kept_questions": kept_questions, "question_count": question_count}
+
+
+def merge_update(previous_result: dict, update: dict, plan: dict) -> dict:
+    # The previous analysis with the regenerated keys swapped in; new interview questions follow the kept ones
+    merged = dict(previous_result)
+    for key in plan["keys"]:
+        value = update.get(key)
+        if key == "Interview Questions":
+            merged[key] = plan["kept_questions"] + list(value or [])
+        elif value:
+            merged[key] = value
+    return merged
+
+
+def record_incremental(mode: str, full_prompt_tokens: int, sent_tokens: int):
+    stats = INCREMENTAL_STATS[mode]
+    stats["requests"] += 1
+    stats["full_prompt_tokens"] += full_prompt_tokens
+    stats["sent_tokens"] += sent_tokens
+
+
+def incremental_stats() -> dict:
+    # Per mode, plus the share of prompt tokens resubmissions didn't have to send
+    report = {mode: dict(stats) for mode, stats in INCREMENTAL_STATS.items()}
+    full = sum(stats["full_prompt_tokens"] for stats in INCREMENTAL_STATS.values())
+    sent = sum(stats["sent_tokens"] for stats in INCREMENTAL_STATS.values())
+    report["tokens_saved"] = full - sent
+    report["token_reduction"] = round(1 - sent / full, 3) if full else 0.0
+    return report
@@ -0,0 +1,370 @@
+# jobs.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from fastapi import HTTPException
+from utility.executor import run_blocking
+from utility.observability import log
+
+# Submit/poll analyses (/analyze/jobs). Jobs run on a bounded pool of asyncio workers in the process
+# that accepted them; the store only holds their status and results, so with a shared backend
+# (sqlite on one host, redis across hosts) a poll can land on any uvicorn worker.
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory") # memory | sqlite | redis
+JOB_DB = os.getenv("JOB_DB", "jobs.db")
+JOB_REDIS_URL = os.getenv("JOB_REDIS_URL", "redis://127.0.0.1:6379/0")
+JOB_REDIS_TIMEOUT = float(os.getenv("JOB_REDIS_TIMEOUT", "1")) # Seconds per redis call (in the blocking pool, not the loop)
+JOB_STORE_RETRY_AFTER = 5 # Seconds submits and polls answer 503 right away after a store error
+ERROR_LOG_INTERVAL = 60 # Seconds between log lines while the store is failing
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100")) # Queued jobs per process before submits get a 503
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "300")) # Seconds a job may run
+JOB_TTL = float(os.getenv("JOB_TTL", "3600")) # Seconds a job stays pollable after its last update
+REDIS_PREFIX = "career_jobs:"
+PURGE_EVERY = 100 # Saves between sweeps of expired jobs (memory and sqlite)
+DURATION_SAMPLES = 200
+
+ACTIVE = ("queued", "running")
+
+
+class MemoryJobStore:
+    # This process only: polls have to reach the worker that accepted the job
+    name = "memory"
+    blocking = False
+
+    def __init__(self, ttl: float = JOB_TTL):
+        self.ttl = ttl
+        self._jobs = {} # id -> (job, expires_at)
+        self._active = {} # dedup key -> id
+        self._saves = 0
+
+    def save(self, job: dict):
+        self._jobs[job["id"]] = (dict(job), time.time() + self.ttl)
+        if job["status"] in ACTIVE:
+            self._active[job["key"]] = job["id"]
+        elif self._active.get(job["key"]) == job["id"]:
+            del self._active[job["key"]]
+        self._saves += 1
+        if self._saves % PURGE_EVERY == 0:
+            now = time.time()
+            for job_id in [job_id for job_id, (_, expires_at) in self._jobs.items() if expires_at < now]:
+                del self._jobs[job_id]
+
+    def load(self, job_id: str):
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[1] < time.time():
+            return None
+        return dict(entry[0])
+
+    def active_job(self, key: str):
+        return self._active.get(key)
+
+    def claim(self, job: dict):
+        # Saves the job as the active one for its key and returns None, or returns the id of the job
+        # that already is. One step, so two identical submits can't both start a job.
+        existing = self._active.get(job["key"])
+        if existing is not None:
+            return existing
+        self.save(job)
+        return None
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore:
+    # Shared by every uvicorn worker on the host through one WAL-mode database file
+    name = "sqlite"
+    blocking = True # JobQueue calls it through the blocking pool
+
+    def __init__(self, path: str = JOB_DB, ttl: float = JOB_TTL, timeout: float = JOB_TIMEOUT):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._saves = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, key TEXT NOT NULL, active INTEGER NOT NULL, "
+            "data TEXT NOT NULL, updated_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        # dedup key -> the active job holding it. The primary key makes claiming it one atomic upsert.
+        self._conn.execute("CREATE TABLE IF NOT EXISTS job_keys (key TEXT PRIMARY KEY, id TEXT NOT NULL, updated_at REAL NOT NULL)")
+        self._conn.commit()
+
+    def _write(self, job: dict, now: float):
+        active = job["status"] in ACTIVE
+        self._conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, key, active, data, updated_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job["id"], job["key"], int(active), json.dumps(job), now, now + self.ttl),
+        )
+        if active:
+            self._conn.execute("UPDATE job_keys SET updated_at = ? WHERE key = ? AND id = ?", (now, job["key"], job["id"]))
+        else:
+            self._conn.execute("DELETE FROM job_keys WHERE key = ? AND id = ?", (job["key"], job["id"]))
+
+    def save(self, job: dict):
+        now = time.time()
+        with self._lock:
+            self._write(job, now)
+            self._saves += 1
+            if self._saves % PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+                self._conn.execute("DELETE FROM job_keys WHERE updated_at < ?", (now - self.timeout,))
+            self._conn.commit()
+
+    def claim(self, job: dict):
+        # Takes the key unless an active job holds it; a holder not updated within JOB_TIMEOUT (its worker
+        # died) or no longer active is replaced. Other workers' claims wait on the write lock.
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO job_keys (key, id, updated_at) VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE "
+                    "SET id = excluded.id, updated_at = excluded.updated_at WHERE job_keys.updated_at <= ? "
+                    "OR NOT EXISTS (SELECT 1 FROM jobs WHERE jobs.id = job_keys.id AND jobs.active = 1)",
+                    (job["key"], job["id"], now, now - self.timeout),
+                )
+                holder = self._conn.execute("SELECT id FROM job_keys WHERE key = ?", (job["key"],)).fetchone()[0]
+                if holder == job["id"]:
+                    self._write(job, now)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return None if holder == job["id"] else holder
+
+    def load(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ? AND expires_at >= ?", (job_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def active_job(self, key: str):
+        # Jobs not updated within JOB_TIMEOUT belonged to a worker that died; don't hand those out
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_keys.id FROM job_keys JOIN jobs ON jobs.id = job_keys.id "
+                "WHERE job_keys.key = ? AND jobs.active = 1 AND job_keys.updated_at > ?", (key, time.time() - self.timeout)
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisJobStore:
+    # Shared across hosts; any Redis-protocol server works (benchmarks/resp_server.py for local runs)
+    name = "redis"
+    blocking = True
+
+    def __init__(self, url: str = JOB_REDIS_URL, ttl: float = JOB_TTL, timeout: float = JOB_TIMEOUT):
+        from utility.resp import RespClient
+        self.client = RespClient(url, timeout=JOB_REDIS_TIMEOUT)
+        self.ttl = int(ttl)
+        self.timeout = int(timeout)
+
+    def save(self, job: dict):
+        commands = [("SET", REDIS_PREFIX + job["id"], json.dumps(job), "EX", self.ttl)]
+        key = REDIS_PREFIX + "key:" + job["key"]
+        # The dedup pointer expires on its own if the worker running the job dies
+        commands.append(("SET", key, job["id"], "EX", self.timeout) if job["status"] in ACTIVE else ("DEL", key))
+        for reply in self.client.pipeline(*commands):
+            if isinstance(reply, Exception): # An error reply (RespError); the job wasn't stored
+                raise reply
+
+    def load(self, job_id: str):
+        data = self.client.execute("GET", REDIS_PREFIX + job_id)
+        return json.loads(data) if data else None
+
+    def active_job(self, key: str):
+        job_id = self.client.execute("GET", REDIS_PREFIX + "key:" + key)
+        return job_id.decode() if job_id else None
+
+    def claim(self, job: dict):
+        # SET NX takes the dedup pointer only if no active job holds it; the GET in the same round trip
+        # says who does
+        key = REDIS_PREFIX + "key:" + job["key"]
+        while True:
+            taken, holder = self.client.pipeline(("SET", key, job["id"], "NX", "EX", self.timeout), ("GET", key))
+            for reply in (taken, holder):
+                if isinstance(reply, Exception):
+                    raise reply
+            if taken is not None:
+                self.save(job)
+                return None
+            if holder is not None: # Else it expired in between; try again
+                return holder.decode()
+
+    def close(self):
+        self.client.close()
+
+
+def build_job_store(backend: str = JOB_BACKEND):
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend == "redis":
+        return RedisJobStore()
+    if backend != "memory":
+        raise ValueError(f"Unknown JOB_BACKEND {backend!r}, expected memory, sqlite or redis")
+    return MemoryJobStore()
+
+
+class JobQueue:
+    def __init__(self, store, workers: int = JOB_WORKERS, max_pending: int = JOB_QUEUE_SIZE, timeout: float = JOB_TIMEOUT):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.queue = asyncio.Queue()
+        self.running = 0
+        self.counts = {"submitted": 0, "deduplicated": 0, "rejected": 0, "done": 0, "failed": 0}
+        self.durations = deque(maxlen=DURATION_SAMPLES) # Seconds per finished job, for Retry-After
+        self.store_errors = 0
+        self._tasks = []
+        self._store_down_until = 0.0
+        self._error_logged_at = 0.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(build_job_store())
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still queued won't run; say so instead of leaving them "queued" until they expire
+        while not self.queue.empty():
+            job, _ = self.queue.get_nowait()
+            await self._finish(job, error={"status_code": 503, "detail": "The server shut down before the job ran. Submit it again."})
+        self.store.close()
+
+    def retry_after(self) -> int:
+        # Rough time until a queue slot frees up: one average job per worker
+        average = sum(self.durations) / len(self.durations) if self.durations else 10.0
+        return max(1, round(average * self.queue.qsize() / max(1, self.workers)))
+
+    async def _call_store(self, method: str, *args):
+        # Shared stores do blocking socket/sqlite I/O (up to JOB_REDIS_TIMEOUT plus a reconnect), so it runs
+        # in the blocking pool. A failure opens the breaker for JOB_STORE_RETRY_AFTER seconds.
+        func = getattr(self.store, method)
+        if not self.store.blocking:
+            return func(*args)
+        try:
+            return await run_blocking(func, *args)
+        except Exception as e:
+            self.store_errors += 1
+            self._store_down_until = time.time() + JOB_STORE_RETRY_AFTER
+            if time.time() - self._error_logged_at > ERROR_LOG_INTERVAL:
+                self._error_logged_at = time.time()
+                log("job_store_error", level="warning", backend=self.store.name, operation=method, error=str(e))
+            raise
+
+    async def _request_store(self, method: str, *args):
+        # Submits and polls: while the breaker is open they get a 503 right away instead of each
+        # waiting out the store's timeout
+        unavailable = HTTPException(status_code=503, detail="The job store is unavailable, try again later.",
+                                    headers={"Retry-After": str(JOB_STORE_RETRY_AFTER)})
+        if time.time() < self._store_down_until:
+            raise unavailable
+        try:
+            return await self._call_store(method, *args)
+        except Exception as e:
+            raise unavailable from e
+
+    async def submit(self, key: str, run):
+        # run() -> result dict. Returns (job, deduplicated): an identical queued or running job is
+        # returned instead of starting another one. The store checks for it and saves the new job in
+        # one step (claim), so identical submits racing on different workers still start one job.
+        if self.queue.qsize() >= self.max_pending:
+            # Nothing gets created, so a plain lookup will do: a duplicate still gets the job it matches
+            existing = await self._active(await self._request_store("active_job", key))
+            if existing is not None:
+                self.counts["deduplicated"] += 1
+                return existing, True
+            self.counts["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Too many analyses queued, try again later.",
+                                headers={"Retry-After": str(self.retry_after())})
+        job = {"id": uuid.uuid4().hex, "key": key, "status": "queued", "created": time.time()}
+        holder = await self._request_store("claim", job)
+        if holder is not None:
+            existing = await self._active(holder)
+            if existing is not None:
+                self.counts["deduplicated"] += 1
+                return existing, True
+            # The holder finished but its pointer outlived it (a failed final save): run this one undeduplicated
+            await self._request_store("save", job)
+        self.queue.put_nowait((job, run))
+        self.counts["submitted"] += 1
+        self.start()
+        return job, False
+
+    async def get(self, job_id: str):
+        return await self._request_store("load", job_id)
+
+    async def _active(self, job_id):
+        job = await self._request_store("load", job_id) if job_id is not None else None
+        return job if job is not None and job["status"] in ACTIVE else None
+
+    async def _worker(self):
+        while True:
+            job, run = await self.queue.get()
+            job.update(status="running", started=time.time())
+            self.running += 1
+            try:
+                try:
+                    await self._call_store("save", job)
+                except Exception: # Polls show "queued" a while longer; the final save may still get through
+                    pass
+                result = await asyncio.wait_for(run(), self.timeout)
+                await self._finish(job, result=result)
+            except asyncio.TimeoutError:
+                await self._finish(job, error={"status_code": 504, "detail": f"The analysis took longer than {self.timeout:g}s."})
+            except HTTPException as e:
+                await self._finish(job, error={"status_code": e.status_code, "detail": e.detail})
+            except asyncio.CancelledError:
+                await self._finish(job, error={"status_code": 503, "detail": "The server shut down while the job was running. Submit it again."})
+                raise
+            except Exception as e:
+                log("job_failed", level="error", exc_info=True, job_id=job["id"], error=str(e))
+                await self._finish(job, error={"status_code": 500, "detail": f"An internal server error occurred: {str(e)}"})
+            finally:
+                self.running -= 1
+
+    async def _finish(self, job: dict, result=None, error=None):
+        job["finished"] = time.time()
+        if error is None:
+            job.update(status="done", result=result)
+            self.counts["done"] += 1
+        else:
+            job.update(status="error", error=error)
+            self.counts["failed"] += 1
+        if "started" in job:
+            self.durations.append(job["finished"] - job["started"])
+        try:
+            await self._call_store("save", job)
+        except Exception:
+            log("job_store_failed", level="error", exc_info=True, job_id=job["id"])
+
+    def stats(self) -> dict:
+        return {"backend": self.store.name, "workers": self.workers, "queued": self.queue.qsize(), "running": self.running,
+                "max_queued": self.max_pending, **self.counts, "store_errors": self.store_errors,
+                "avg_seconds": round(sum(self.durations) / len(self.durations), 3) if self.durations else None}
+
+
+def get_job_queue(app) -> JobQueue:
+    # Normally set by the lifespan; created lazily for callers that skip it (e.g. ASGITransport in scripts)
+    queue = getattr(app.state, "job_queue", None)
+    if queue is None:
+        queue = JobQueue.from_env()
+        app.state.job_queue = queue
+    return queue
@@ -0,0 +1,199 @@
+# llm_json.py
+import json
+import os
+import re
+from fastapi import HTTPException
+from utility.prompt_template import CompiledPrompt
+from utility.observability import log
+
+# Groq's JSON mode (response_format=json_object) makes the API return syntactically valid JSON.
+# It isn't used for streamed calls. Turn it off with LLM_JSON_MODE=false for models that reject it.
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+# How many "fix this JSON" calls to make before giving up with a 500
+JSON_FIX_RETRIES = int(os.getenv("JSON_FIX_RETRIES", "1"))
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.S)
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+# what -> outcome -> count. Outcomes: ok (parsed as-is), repaired (locally), fixed_by_retry, failed
+PARSE_STATS = {}
+
+FIX_JSON_PROMPT = CompiledPrompt(
+    prefix="""
+        ### INSTRUCTION:
+        The text below was supposed to be a single valid JSON object, but it could not be parsed.
+        Return ONLY the corrected JSON object: keep all the content, fix the syntax, and add no commentary or markdown.
+    """,
+    template="""
+        Expected keys: {keys}
+        Parse error: {error}
+
+        ### BROKEN OUTPUT:
+        {content}
+
+        ### CORRECTED JSON:
+    """,
+)
+
+
+def json_mode(llm):
+    # Same client with JSON mode switched on; stubs without .bind() are used as they are
+    if LLM_JSON_MODE and hasattr(llm, "bind"):
+        return llm.bind(response_format={"type": "json_object"})
+    return llm
+
+
+def strip_to_json(text: str) -> str:
+    # Drop markdown fences and any preamble before the first { or [
+    text = text or ""
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return text[min(starts):] if starts else text.strip()
+
+
+def _scan(text: str):
+    # One pass over the text that fixes what models typically get wrong: raw newlines inside strings,
+    # trailing commas, Python literals, text after the closing brace, and output cut off mid-way.
+    # Returns (repaired, fallbacks), where fallbacks cut back to each earlier comma for when the
+    # truncation point itself isn't salvageable (e.g. `"key":` with no value).
+    out = []
+    stack = []
+    cuts = []
+    in_string = escaped = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                char = "\\n"
+            elif char == "\t":
+                char = "\\t"
+            out.append(char)
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char in _CLOSERS:
+            stack.append(char)
+            out.append(char)
+        elif char in "}]":
+            _drop_trailing_comma(out)
+            if stack and _CLOSERS[stack[-1]] == char:
+                stack.pop()
+                out.append(char)
+                if not stack:
+                    break # Anything after the top-level value is commentary
+        elif char == ",":
+            cuts.append((len(out), list(stack)))
+            out.append(char)
+        elif char.isalpha():
+            j = i
+            while j < len(text) and text[j].isalpha():
+                j += 1
+            word = text[i:j]
+            out.append(_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    if in_string:
+        out.append('"')
+    _drop_trailing_comma(out)
+    repaired = "".join(out) + "".join(_CLOSERS[opener] for opener in reversed(stack))
+    fallbacks = ["".join(out[:position]) + "".join(_CLOSERS[opener] for opener in reversed(open_stack))
+                 for position, open_stack in reversed(cuts)]
+    return repaired, fallbacks
+
+
+def _drop_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str):
+    # Returns (value, repaired). Raises ValueError if nothing parseable can be recovered.
+    candidate = strip_to_json(text)
+    try:
+        return json.loads(candidate), False
+    except ValueError:
+        pass
+    repaired, fallbacks = _scan(candidate)
+    for attempt in [repaired] + fallbacks[:20]:
+        try:
+            return json.loads(attempt), True
+        except ValueError:
+            continue
+    raise ValueError("no valid JSON could be recovered from the model output")
+
+
+def validate_output(data, schema) -> dict:
+    # Apply the response model and return a plain dict with the original JSON keys
+    if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+        log("llm_json_unwrapped_list", level="warning")
+        data = data[0]
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    return schema.model_validate(data).model_dump(by_alias=True, exclude_none=True)
+
+
+def _record(what: str, outcome: str):
+    counts = PARSE_STATS.setdefault(what, {"ok": 0, "repaired": 0, "fixed_by_retry": 0, "failed": 0})
+    counts[outcome] += 1
+
+
+def parse_stats() -> dict:
+    # parse_failure_rate: share of outputs that needed another LLM call or failed outright
+    stats = {}
+    for what, counts in PARSE_STATS.items():
+        total = sum(counts.values())
+        stats[what] = dict(counts, total=total,
+                           parse_failure_rate=round((counts["fixed_by_retry"] + counts["failed"]) / total, 3) if total else None)
+    return stats
+
+
+async def parse_llm_json(content: str, schema, llm, what: str) -> dict:
+    # Parse and validate model output. Broken output is repaired locally first; failing that, only the
+    # broken text (not the original prompt) goes back to the same model to be fixed.
+    error = None
+    try:
+        data, repaired = repair_json(content)
+        result = validate_output(data, schema)
+        _record(what, "repaired" if repaired else "ok")
+        return result
+    except ValueError as e:
+        error = e
+
+    keys = ", ".join(f'"{field.alias or name}"' for name, field in schema.model_fields.items())
+    for _ in range(JSON_FIX_RETRIES):
+        log("llm_json_fix_retry", level="warning", output=what, error=str(error))
+        try:
+            response = await json_mode(llm).ainvoke(FIX_JSON_PROMPT.format(keys=keys, error=error, content=content))
+        except HTTPException:
+            raise
+        except Exception as e:
+            error = e
+            break
+        try:
+            data, _ = repair_json(response.content)
+            result = validate_output(data, schema)
+            _record(what, "fixed_by_retry")
+            return result
+        except ValueError as e:
+            error = e
+            content = response.content
+
+    _record(what, "failed")
+    log("llm_json_failed", level="error", output=what, error=str(error), raw=content) # Log raw content on error
+    raise HTTPException(status_code=500, detail=f"Failed to parse {what} JSON from LLM. Error: {str(error)}. Raw response: {(content or '')[:500]}...")
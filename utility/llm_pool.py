@@ -0,0 +1,91 @@
+# llm_pool.py
+import os
+import httpx
+from typing import TYPE_CHECKING
+from utility.llm_scheduler import (INTERACTIVE, GROQ_RPM, GROQ_TPM, GROQ_RATE_LIMITS, LLM_MAX_CONCURRENCY,
+                                   ModelScheduler, ScheduledLLM, parse_rate_limits)
+
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+
+class LLMRegistry:
+    # One ChatGroq per model, all sharing the same keep-alive httpx pools, and one scheduler per model
+    # (utility/llm_scheduler.py) that every call goes through.
+    # Created once in the app lifespan (app.py) and closed on shutdown.
+    def __init__(self, api_key, temperature=0.1, max_connections=100, max_keepalive=20,
+                 keepalive_expiry=30.0, timeout=60.0, transport=None, async_transport=None, base_url=None,
+                 rpm=GROQ_RPM, tpm=GROQ_TPM, rate_limits=None, max_concurrency=LLM_MAX_CONCURRENCY):
+        self.api_key = api_key
+        self.temperature = temperature
+        self.base_url = base_url
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # transport / async_transport let tests and benchmarks swap in httpx.MockTransport (no network,
+        # see benchmarks/stubs.py fake_chat_transport)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout, transport=transport)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout, transport=async_transport)
+        self._models = {}
+        # model -> (rpm, tpm); models not listed get rpm/tpm
+        self.default_limits = (rpm, tpm)
+        self.rate_limits = parse_rate_limits(GROQ_RATE_LIMITS) if rate_limits is None else rate_limits
+        self.max_concurrency = max_concurrency
+        self.schedulers = {}
+
+    @classmethod
+    def from_env(cls, **overrides):
+        settings = dict(
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("GROQ_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30")),
+            timeout=float(os.getenv("GROQ_TIMEOUT", "60")),
+            base_url=os.getenv("GROQ_API_BASE"),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def scheduler(self, model_name: str) -> ModelScheduler:
+        scheduler = self.schedulers.get(model_name)
+        if scheduler is None:
+            rpm, tpm = self.rate_limits.get(model_name, self.default_limits)
+            scheduler = ModelScheduler(model_name, rpm, tpm, self.max_concurrency)
+            self.schedulers[model_name] = scheduler
+        return scheduler
+
+    def scheduler_stats(self) -> dict:
+        return {name: scheduler.snapshot() for name, scheduler in self.schedulers.items()}
+
+    def get(self, model_name: str, priority: int = INTERACTIVE) -> "ScheduledLLM":
+        llm = self._models.get(model_name)
+        if llm is None:
+            from langchain_groq import ChatGroq # Heaviest import in the app, loaded on first use or by the warm-up
+            llm = ChatGroq(
+                temperature=self.temperature, # Slightly lower temp for consistency
+                groq_api_key=self.api_key,
+                model_name=model_name,
+                groq_api_base=self.base_url,
+                http_client=self.http_client,
+                http_async_client=self.http_async_client,
+                max_retries=0, # Retries and back-off happen in the scheduler, which sees every caller
+            )
+            self._models[model_name] = llm
+        return ScheduledLLM(llm, self.scheduler(model_name), priority)
+
+    async def aclose(self):
+        self._models.clear()
+        self.http_client.close()
+        await self.http_async_client.aclose()
+
+
+def get_llm_registry(app) -> LLMRegistry:
+    # Normally set by the lifespan; created lazily for callers that skip it (e.g. ASGITransport in scripts)
+    registry = getattr(app.state, "llm_registry", None)
+    if registry is None:
+        registry = LLMRegistry.from_env()
+        app.state.llm_registry = registry
+    return registry
+
@@ -0,0 +1,312 @@
+# llm_scheduler.py
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import random
+import re
+import sys
+import time
+import httpx
+from typing import Optional
+from fastapi import HTTPException
+from utility.compact import count_tokens
+from utility.observability import LLM_SECONDS, LLM_TOKENS, log, span
+
+# Lower runs first. Single analyses are interactive; /analyze/batch items queue behind them.
+INTERACTIVE = 0
+BATCH = 1
+
+# Per-model budgets. GROQ_RATE_LIMITS overrides them per model: "model=rpm:tpm,other-model=rpm:tpm".
+# 0 turns a budget off.
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "0"))
+GROQ_RATE_LIMITS = os.getenv("GROQ_RATE_LIMITS", "")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8")) # In-flight calls per model
+# How long a call may wait for a slot (including provider back-off) before it's rejected with a 429
+LLM_QUEUE_DEADLINE = float(os.getenv("LLM_QUEUE_DEADLINE", "30"))
+LLM_BATCH_QUEUE_DEADLINE = float(os.getenv("LLM_BATCH_QUEUE_DEADLINE", "300"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+# Completion tokens assumed when budgeting TPM before the response reports real usage
+LLM_OUTPUT_TOKENS = int(os.getenv("LLM_OUTPUT_TOKENS", "800"))
+
+# ChatGroq runs with max_retries=0, so everything its client would have retried is retried here:
+# rate limits, request timeouts, gateway and server errors, and requests that never got a response
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_rate_limits(spec: str) -> dict:
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, budget = entry.partition("=")
+        rpm, _, tpm = budget.partition(":")
+        limits[model.strip()] = (int(rpm or 0), int(tpm or 0))
+    return limits
+
+
+def parse_duration(value) -> Optional[float]:
+    # Retry-After is plain seconds; Groq's x-ratelimit-reset-* headers look like "7.66s", "2m59.56s" or "120ms"
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parts = _DURATION_RE.findall(str(value))
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+
+def is_retryable(error: Exception) -> bool:
+    if getattr(error, "status_code", None) in RETRY_STATUSES:
+        return True
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError, TimeoutError)):
+        return True
+    # The Groq SDK wraps connection failures and timeouts; it's only loaded once a ChatGroq exists
+    groq = sys.modules.get("groq")
+    return groq is not None and isinstance(error, groq.APIConnectionError)
+
+
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    # Seconds to back off after a rate-limited/overloaded response or a failed connection, or None if the
+    # error isn't retryable. A retry-after from the provider is a floor; jitter only ever adds to it so
+    # callers spread out.
+    if not is_retryable(error):
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    hinted = None
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        hinted = parse_duration(headers.get(name))
+        if hinted is not None:
+            break
+    if hinted is not None:
+        return hinted + random.uniform(0, 0.25 * hinted + 0.05)
+    ceiling = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def usage_tokens(message) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+def record_usage(model: str, message, attrs: dict):
+    # Provider-reported token counts into llm_tokens_total and the call's span
+    usage = getattr(message, "usage_metadata", None) or {}
+    for kind in ("input", "output"):
+        count = usage.get(f"{kind}_tokens")
+        if count:
+            LLM_TOKENS.inc(count, model=model, kind=kind)
+            attrs[f"{kind}_tokens"] = attrs.get(f"{kind}_tokens", 0) + count
+
+
+class TokenBucket:
+    # `per_minute` units a minute, refilled continuously, with up to a minute's worth available at once
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.refill = per_minute / 60
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill)
+        self.updated = now
+        return max(0.0, (amount - self.level) / self.refill)
+
+    def take(self, amount: float, now: float):
+        self.wait_time(0, now)
+        self.level -= amount
+
+
+class ModelScheduler:
+    # Admission control for one model: a priority queue drained while the request/token budgets and the
+    # concurrency limit allow it. A provider retry-after pauses the whole queue, not just the failed call.
+    def __init__(self, model: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.model = model
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.blocked_until = 0.0
+        self._queue = [] # (priority, seq, tokens, future)
+        self._seq = itertools.count()
+        self._timer = None
+        self.stats = {"calls": 0, "queue_wait_ms": 0.0, "rate_limited": 0, "retries": 0, "rejected": 0}
+
+    def waiting(self) -> int:
+        return sum(1 for entry in self._queue if not entry[3].done())
+
+    def estimated_wait(self, priority: int, tokens: float, now: float) -> float:
+        # Time until the budgets cover this call plus everything queued at the same or higher priority
+        ahead = [entry for entry in self._queue if entry[0] <= priority and not entry[3].done()]
+        wait = max(0.0, self.blocked_until - now)
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(len(ahead) + 1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(sum(entry[2] for entry in ahead) + tokens, now))
+        return wait
+
+    def reject(self, wait: float):
+        self.stats["rejected"] += 1
+        retry_after = max(1, math.ceil(wait))
+        raise HTTPException(status_code=429, headers={"Retry-After": str(retry_after)},
+                            detail=f"The {self.model} model is at its rate limit. Try again in {retry_after} s.")
+
+    async def acquire(self, priority: int, tokens: float, deadline: float) -> float:
+        # Waits for a slot; returns the tokens reserved. Raises a 429 right away if the estimate already
+        # runs past the deadline, or once the deadline passes.
+        if self.tokens:
+            tokens = min(tokens, self.tokens.capacity) # A bigger call could never be admitted otherwise
+        now = time.monotonic()
+        wait = self.estimated_wait(priority, tokens, now)
+        if now + wait > deadline:
+            self.reject(wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=deadline - now)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                self.release() # Granted just as we gave up
+            else:
+                future.cancel()
+                self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                self.reject(self.estimated_wait(priority, tokens, time.monotonic()))
+            raise
+        self.stats["calls"] += 1
+        self.stats["queue_wait_ms"] += (time.monotonic() - now) * 1000
+        return tokens
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def pause(self, seconds: float):
+        self.stats["rate_limited"] += 1
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def settle(self, reserved: float, used: Optional[int]):
+        # Correct the TPM budget once the response reports what the call really cost
+        if self.tokens and used is not None:
+            self.tokens.level -= used - reserved
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queue and self.active < self.max_concurrency:
+            _, _, tokens, future = self._queue[0]
+            if future.done(): # Caller gave up waiting
+                heapq.heappop(self._queue)
+                continue
+            wait = max(self.blocked_until - now,
+                       self.requests.wait_time(1, now) if self.requests else 0.0,
+                       self.tokens.wait_time(tokens, now) if self.tokens else 0.0)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            if self.requests:
+                self.requests.take(1, now)
+            if self.tokens:
+                self.tokens.take(tokens, now)
+            self.active += 1
+            future.set_result(None)
+
+    def backoff_or_reject(self, error: Exception, attempt: int, deadline: float):
+        # Retryable errors pause the queue and return; anything else (or no time left) is raised
+        delay = retry_delay(error, attempt)
+        if delay is None:
+            raise error
+        self.pause(delay)
+        log("llm_backoff", level="warning", model=self.model, status=getattr(error, "status_code", None),
+            error=type(error).__name__, delay_s=round(delay, 2), attempt=attempt + 1)
+        if attempt >= LLM_MAX_RETRIES or time.monotonic() + delay > deadline:
+            self.reject(delay)
+        self.stats["retries"] += 1
+
+    async def run(self, call, priority: int, tokens: float, deadline: float):
+        for attempt in itertools.count():
+            with span("llm_queue", model=self.model):
+                reserved = await self.acquire(priority, tokens, deadline)
+            started = time.perf_counter()
+            try:
+                with span("llm", model=self.model, attempt=attempt + 1) as attrs:
+                    result = await call()
+                    record_usage(self.model, result, attrs)
+            except HTTPException:
+                raise
+            except Exception as e:
+                self.backoff_or_reject(e, attempt, deadline)
+                continue
+            finally:
+                LLM_SECONDS.observe(time.perf_counter() - started, model=self.model)
+                self.release()
+            self.settle(reserved, usage_tokens(result))
+            return result
+
+    async def stream(self, open_stream, priority: int, tokens: float, deadline: float):
+        # Like run(), but a call is only retried if it failed before its first chunk
+        for attempt in itertools.count():
+            with span("llm_queue", model=self.model):
+                await self.acquire(priority, tokens, deadline)
+            started = False
+            call_started = time.perf_counter()
+            try:
+                with span("llm", model=self.model, attempt=attempt + 1, stream=True) as attrs:
+                    async for chunk in open_stream():
+                        started = True
+                        record_usage(self.model, chunk, attrs) # Usually only on the last chunk
+                        yield chunk
+                return
+            except HTTPException:
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                self.backoff_or_reject(e, attempt, deadline)
+            finally:
+                LLM_SECONDS.observe(time.perf_counter() - call_started, model=self.model)
+                self.release()
+
+    def snapshot(self) -> dict:
+        calls = self.stats["calls"]
+        return dict(self.stats, queue_wait_ms=round(self.stats["queue_wait_ms"], 1),
+                    avg_queue_wait_ms=round(self.stats["queue_wait_ms"] / calls, 1) if calls else None,
+                    active=self.active, waiting=self.waiting())
+
+
+class ScheduledLLM:
+    # What LLMRegistry.get hands out: the model's ChatGroq with ainvoke/astream routed through its scheduler.
+    # Everything else (model_name, ...) is read from the underlying client.
+    def __init__(self, llm, scheduler: ModelScheduler, priority: int = INTERACTIVE, runnable=None):
+        self.llm = llm
+        self.scheduler = scheduler
+        self.priority = priority
+        self.runnable = runnable if runnable is not None else llm
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def bind(self, **kwargs) -> "ScheduledLLM":
+        return ScheduledLLM(self.llm, self.scheduler, self.priority, self.runnable.bind(**kwargs))
+
+    def with_priority(self, priority: int) -> "ScheduledLLM":
+        return ScheduledLLM(self.llm, self.scheduler, priority, self.runnable)
+
+    def _budget(self, prompt):
+        deadline = time.monotonic() + (LLM_BATCH_QUEUE_DEADLINE if self.priority >= BATCH else LLM_QUEUE_DEADLINE)
+        return self.priority, count_tokens(str(prompt)) + LLM_OUTPUT_TOKENS, deadline
+
+    async def ainvoke(self, prompt, **kwargs):
+        return await self.scheduler.run(lambda: self.runnable.ainvoke(prompt, **kwargs), *self._budget(prompt))
+
+    def astream(self, prompt, **kwargs):
+        return self.scheduler.stream(lambda: self.runnable.astream(prompt, **kwargs), *self._budget(prompt))
@@ -0,0 +1,210 @@
+# observability.py
+import bisect
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+# Request IDs, timed spans, Prometheus-style metrics and JSON logs. Everything is in-process and
+# cheap (a perf_counter pair, a bisect and a dict update per span), so it stays on in production.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200")) # Per request; big batches stop recording after this
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+request_id = contextvars.ContextVar("request_id", default=None)
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+# --- Metrics ---
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_label_text(labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {} # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}"
+            yield f"{self.name}_sum{_label_text(labels)} {series[-1]:.6f}"
+            yield f"{self.name}_count{_label_text(labels)} {cumulative}"
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.")
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "Time until the response body was fully sent.")
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Duration of pipeline stages (fetch, extract, parse, prompt_build, llm, format, ...).")
+LLM_SECONDS = Histogram("llm_call_duration_seconds", "LLM call duration per model, excluding queueing.")
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the provider, per model and kind (input/output).")
+METRICS = [HTTP_REQUESTS, HTTP_SECONDS, STAGE_SECONDS, LLM_SECONDS, LLM_TOKENS]
+_collectors = []
+
+
+def register_collector(collect):
+    # collect(app) -> iterable of (name, type, help, [(labels dict, value), ...]) read at scrape time,
+    # for state that already lives elsewhere (cache counters, scheduler queues, ...)
+    _collectors.append(collect)
+
+
+def render_metrics(app=None) -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, kind, help_text, samples in collect(app):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_label_text(tuple(sorted(labels.items())))} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# --- Spans ---
+
+class Trace:
+    # Spans of one request, logged with the request when it finishes
+    def __init__(self, rid: str):
+        self.request_id = rid
+        self.started = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, name, start, seconds, attrs):
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append({"name": name, "start_ms": round((start - self.started) * 1000, 1), "ms": round(seconds * 1000, 1), **attrs})
+
+
+@contextmanager
+def span(name: str, **attrs):
+    # Times the block into stage_duration_seconds and the current request's trace. The yielded dict
+    # takes attributes learned inside the block (e.g. token counts).
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=name)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(name, start, seconds, attrs)
+
+
+# --- Logs ---
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "event": record.getMessage()}
+        rid = request_id.get()
+        if rid:
+            entry["request_id"] = rid
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+logger = logging.getLogger("career_consultant")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log(event: str, level: str = "info", exc_info=False, **fields):
+    # One JSON line per event; the current request ID is added automatically
+    logger.log(logging.getLevelName(level.upper()), event, exc_info=exc_info, extra={"fields": fields})
+
+
+# --- Middleware ---
+
+class RequestContextMiddleware:
+    # Pure ASGI (no BaseHTTPMiddleware) so streamed responses pass straight through. Assigns the
+    # request ID (or keeps the caller's X-Request-ID), echoes it back, and on completion records the
+    # request metrics and one access log line with the request's spans.
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+
+    def route_name(self, scope) -> str:
+        # The route template, not the raw path, so metric labels stay bounded
+        if self._routes is None:
+            self._routes = {getattr(route, "endpoint", None): route.path for route in scope["app"].routes}
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        rid = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        trace = Trace(rid)
+        rid_token, trace_token = request_id.set(rid), current_trace.set(trace)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            seconds = time.perf_counter() - trace.started
+            route = self.route_name(scope)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status)
+            HTTP_SECONDS.observe(seconds, route=route)
+            if route != "/metrics":
+                fields = {"method": scope["method"], "route": route, "status": status, "ms": round(seconds * 1000, 1), "spans": trace.spans}
+                if trace.dropped:
+                    fields["spans_dropped"] = trace.dropped
+                log("request", **fields)
+            request_id.reset(rid_token)
+            current_trace.reset(trace_token)
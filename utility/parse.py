@@ -1,28 +1,135 @@
-import PyPDF2
-import docx
+import hashlib
+import io
+import os
 from fastapi import UploadFile, HTTPException
+from concurrent.futures.process import BrokenProcessPool
+from utility.cache import build_cache
+from utility.executor import run_in_process
+from utility.observability import span
 
-def parse_pdf(file):
+PDF_CONTENT_TYPE = "application/pdf"
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# A resume never needs more than this; long scanned PDFs are cut off instead of tying up a worker
+MAX_RESUME_PAGES = int(os.getenv("MAX_RESUME_PAGES", "20"))
+MAX_RESUME_CHARS = int(os.getenv("MAX_RESUME_CHARS", "60000"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# hash(file bytes) -> extracted text, so one resume sent against many postings is parsed once
+text_cache = build_cache("resume_text", maxsize=int(os.getenv("RESUME_CACHE_SIZE", "256")))
+
+def iter_pdf_text(file, max_pages=MAX_RESUME_PAGES):
+    # PyPDF2 loads pages lazily, so stopping early skips the rest of the document
+    import PyPDF2
     reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in reader.pages:
+    for index, page in enumerate(reader.pages):
+        if index >= max_pages:
+            return
         extracted = page.extract_text()
         if extracted:
-            text += extracted
-    return text
+            yield extracted
 
-def parse_docx(file):
+def iter_block_items(parent):
+    # Paragraph text and tables in document order; python-docx's doc.paragraphs skips tables entirely
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+    for child in parent.iterchildren():
+        if child.tag.endswith("}p"):
+            yield Paragraph(child, None).text
+        elif child.tag.endswith("}tbl"):
+            yield Table(child, None)
+
+def iter_table_text(table):
+    for row in table.rows:
+        seen = set()
+        cells = []
+        for cell in row.cells:
+            # Merged cells repeat the same underlying element across the row
+            if id(cell._tc) in seen:
+                continue
+            seen.add(id(cell._tc))
+            text = " ".join(chunk for chunk in iter_cell_text(cell) if chunk)
+            if text:
+                cells.append(text)
+        if cells:
+            yield " | ".join(cells)
+
+def iter_cell_text(cell):
+    for block in iter_block_items(cell._tc):
+        if isinstance(block, str):
+            yield block.strip()
+        else:
+            yield from iter_table_text(block)
+
+def iter_docx_text(file):
+    import docx
     doc = docx.Document(file)
-    text = ""
-    for para in doc.paragraphs:
-        text += para.text + "\n"
-    return text
-
-def extract_resume_info(file: UploadFile):
-    if file.content_type == "application/pdf":
-        text = parse_pdf(file.file)
-    elif file.content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-        text = parse_docx(file.file)
-    else:
+    for block in iter_block_items(doc.element.body):
+        if isinstance(block, str):
+            yield block
+        else:
+            yield from iter_table_text(block)
+
+def take_text(chunks, max_chars=MAX_RESUME_CHARS, separator=""):
+    # Consume the generator only until the character budget is reached
+    parts, size = [], 0
+    for chunk in chunks:
+        room = max_chars - size
+        if room <= 0:
+            break
+        chunk = chunk[:room]
+        parts.append(chunk)
+        size += len(chunk) + len(separator)
+    return separator.join(parts)
+
+def parse_pdf(file):
+    # Pages are separated by a form feed so normalize_resume_text can find running headers/footers
+    return take_text(iter_pdf_text(file), separator="\f")
+
+def parse_docx(file):
+    return take_text(iter_docx_text(file), separator="\n")
+
+def extract_text_from_bytes(data: bytes, content_type: str) -> str:
+    # Runs in a parse worker process, so it takes plain bytes instead of the UploadFile
+    file = io.BytesIO(data)
+    return parse_pdf(file) if content_type == PDF_CONTENT_TYPE else parse_docx(file)
+
+async def read_upload(upload: UploadFile):
+    # Returns (bytes, sha256 hex). Reads in chunks and enforces the size cap before anything is parsed.
+    digest = hashlib.sha256()
+    chunks, size = [], 0
+    await upload.seek(0)
+    while chunk := await upload.read(64 * 1024):
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"File too large. The limit is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+async def run_parser(func, *args):
+    # Parse in the process pool and turn worker failures into client errors.
+    # Workers raise ValueError for bad input, since HTTPException doesn't survive pickling.
+    try:
+        return await run_in_process(func, *args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TimeoutError:
+        raise HTTPException(status_code=422, detail="The file took too long to process. Please upload a smaller or simpler file.")
+    except MemoryError:
+        raise HTTPException(status_code=413, detail="The file needs too much memory to process. Please upload a smaller file.")
+    except BrokenProcessPool:
+        raise HTTPException(status_code=422, detail="The file could not be processed.")
+
+async def extract_resume_info(file: UploadFile):
+    if file.content_type not in (PDF_CONTENT_TYPE, DOCX_CONTENT_TYPE):
         raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a PDF or DOCX file.")
-    return {"content": text}
\ No newline at end of file
+
+    data, digest = await read_upload(file)
+    key = f"{file.content_type}:{digest}"
+    text = await text_cache.aget(key)
+    if text is None:
+        with span("parse_document", type="pdf" if file.content_type == PDF_CONTENT_TYPE else "docx", bytes=len(data)):
+            text = await run_parser(extract_text_from_bytes, data, file.content_type)
+        await text_cache.aset(key, text)
+    return {"content": text}
@@ -0,0 +1,75 @@
+# portfolio_csv.py
+import codecs
+import csv
+import os
+from fastapi import HTTPException, UploadFile
+from utility.executor import run_blocking
+from utility.parse import MAX_UPLOAD_BYTES
+from utility.observability import log, span
+
+# Portfolio CSVs only need their 'Technology' column. Read row by row instead of building a DataFrame:
+# memory stays flat, big files stop at the row cap, and pandas stays off the import path.
+TECHNOLOGY_COLUMN = "Technology"
+MAX_PORTFOLIO_ROWS = int(os.getenv("MAX_PORTFOLIO_ROWS", "5000"))
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def iter_text_lines(file, max_bytes=MAX_UPLOAD_BYTES):
+    # Decode incrementally. UTF-8 (with or without BOM) first; on the first invalid byte the rest of
+    # the file is read as latin-1, which accepts anything.
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    size = 0
+    while True:
+        chunk = file.read(READ_CHUNK_BYTES)
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File too large. The limit is {max_bytes // (1024 * 1024)} MB.")
+        try:
+            text = decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError:
+            buffered, _ = decoder.getstate()
+            decoder = codecs.getincrementaldecoder("latin-1")()
+            text = decoder.decode(buffered + chunk, final=not chunk)
+        lines = (pending + text).splitlines(keepends=True)
+        # Hold back a trailing partial line until the next chunk completes it
+        pending = lines.pop() if chunk and lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+        if not chunk:
+            return
+
+
+def read_technologies(file, max_rows=MAX_PORTFOLIO_ROWS):
+    # Unique, non-empty 'Technology' values in first-seen order
+    reader = csv.reader(iter_text_lines(file))
+    try:
+        header = next(reader, None)
+        if not header or not any(name.strip() for name in header):
+            raise HTTPException(status_code=400, detail="Invalid CSV file provided for portfolio. Error: No columns to parse from file")
+        columns = [name.strip() for name in header]
+        if TECHNOLOGY_COLUMN not in columns:
+            raise HTTPException(status_code=400, detail=f"Portfolio CSV file must contain a '{TECHNOLOGY_COLUMN}' column.")
+        index = columns.index(TECHNOLOGY_COLUMN)
+
+        seen = set()
+        technologies = []
+        for row_number, row in enumerate(reader):
+            if row_number >= max_rows:
+                log("portfolio_csv_truncated", level="warning", max_rows=max_rows)
+                break
+            value = row[index].strip() if index < len(row) else ""
+            if value and value not in seen:
+                seen.add(value)
+                technologies.append(value)
+        return technologies
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV file provided for portfolio. Error: {e}")
+
+
+async def load_portfolio_skills(portfolio_file: UploadFile) -> str:
+    # Returns the unique 'Technology' values as a comma-separated string
+    await portfolio_file.seek(0)
+    with span("parse_portfolio") as attrs:
+        technologies = await run_blocking(read_technologies, portfolio_file.file)
+        attrs["technologies"] = len(technologies)
+    return ", ".join(technologies)
@@ -0,0 +1,25 @@
+# prompt_template.py
+import string
+import textwrap
+
+
+class CompiledPrompt:
+    # A prompt split into a static prefix (instructions and examples, byte-identical for every request,
+    # so the provider's prompt cache can reuse it) and a short template for the per-request data.
+    # Both are dedented and the template is parsed once at import; format() only joins strings.
+    def __init__(self, prefix: str, template: str):
+        self.prefix = textwrap.dedent(prefix).strip("\n") + "\n\n"
+        self.template = textwrap.dedent(template).strip("\n") + "\n"
+        self._parts = [
+            (literal, field)
+            for literal, field, _, _ in string.Formatter().parse(self.template)
+        ]
+        self.fields = {field for _, field in self._parts if field}
+
+    def format(self, **values) -> str:
+        parts = [self.prefix]
+        for literal, field in self._parts:
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
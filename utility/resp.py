@@ -0,0 +1,130 @@
+# resp.py
+import socket
+import threading
+from typing import Optional
+from urllib.parse import urlsplit, unquote
+
+# Minimal blocking client for the Redis protocol (RESP2), enough for the job store and shared caches
+# without another dependency. One connection per client, guarded by a lock. A call can wait out the
+# timeout and a reconnect, so async callers go through utility.executor.run_blocking, never the event loop.
+DEFAULT_TIMEOUT = 2.0
+
+
+class RespError(Exception):
+    # Error reply from the server (e.g. wrong type, unknown command)
+    pass
+
+
+class RespClient:
+    def __init__(self, url: str = "redis://127.0.0.1:6379/0", timeout: float = DEFAULT_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", ""):
+            raise ValueError(f"Unsupported URL scheme for {url!r}, expected redis://")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.db = int(parts.path.strip("/") or 0)
+        self.password = unquote(parts.password) if parts.password else None
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._roundtrip(("AUTH", self.password))
+        if self.db:
+            self._roundtrip(("SELECT", self.db))
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            finally:
+                self._sock = self._reader = None
+
+    def execute(self, *args):
+        # One command, one reply. A dropped connection is re-opened and the command sent once more.
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._roundtrip(args)
+                except (ConnectionError, socket.timeout, OSError):
+                    self._close()
+                    if attempt == 2:
+                        raise
+
+    def pipeline(self, *commands):
+        # Several commands in one write; returns the replies in order (error replies as RespError values)
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                self._sock.sendall(b"".join(encode_command(command) for command in commands))
+                replies = []
+                for _ in commands:
+                    try:
+                        replies.append(self._read_reply())
+                    except RespError as e:
+                        replies.append(e)
+                return replies
+            except (ConnectionError, socket.timeout, OSError):
+                self._close()
+                raise
+
+    def _roundtrip(self, args):
+        self._sock.sendall(encode_command(args))
+        return self._read_reply()
+
+    def _read_reply(self):
+        return read_reply(self._reader)
+
+
+def encode_command(args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode("utf-8")
+        else:
+            data = str(arg).encode("ascii")
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+
+def read_reply(reader) -> Optional[object]:
+    # Bulk strings come back as bytes, simple strings as str, integers as int, nil as None
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        raise RespError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) < length + 2:
+            raise ConnectionError("Connection closed mid-reply")
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise RespError(f"Unexpected reply: {line[:40]!r}")
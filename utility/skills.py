@@ -0,0 +1,405 @@
+# skills.py
+import os
+import re
+
+# Canonical skill -> aliases seen in resumes, portfolios and postings. Matching is case-insensitive
+# and works on whole tokens, so "Java" doesn't match "JavaScript". Only the aliases are indexed:
+# ambiguous words ("Go", "R", "rest", "spring", "swift", "spark", "ml", "kube", "containers") are left out on purpose
+# and handled by AMBIGUOUS_ALIASES / CASED_ALIASES below.
+SKILL_SYNONYMS = {
+    "Python": ["python", "python3"],
+    "Java": ["java"],
+    "JavaScript": ["javascript", "js", "ecmascript", "es6"],
+    "TypeScript": ["typescript"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#", "csharp", "c sharp"],
+    ".NET": [".net", "dotnet", "dot net", "asp.net", ".net core", "net core"],
+    "Go": ["golang", "go lang"],
+    "Rust": ["rust"],
+    "Ruby": ["ruby"],
+    "Ruby on Rails": ["rails", "ruby on rails", "ror"],
+    "PHP": ["php"],
+    "Kotlin": ["kotlin"],
+    "Scala": ["scala"],
+    "R": ["r programming", "rstudio"],
+    "SQL": ["sql", "t-sql", "tsql", "pl/sql", "plsql"],
+    "PostgreSQL": ["postgresql", "postgres", "psql", "pgsql"],
+    "MySQL": ["mysql", "mariadb"],
+    "SQL Server": ["sql server", "mssql", "ms sql"],
+    "Oracle Database": ["oracle db", "oracle database"],
+    "MongoDB": ["mongodb", "mongo"],
+    "Redis": ["redis"],
+    "Elasticsearch": ["elasticsearch", "elastic search", "opensearch"],
+    "Cassandra": ["cassandra"],
+    "DynamoDB": ["dynamodb", "dynamo db"],
+    "Kafka": ["kafka", "apache kafka"],
+    "RabbitMQ": ["rabbitmq", "rabbit mq"],
+    "Spark": ["apache spark", "pyspark"],
+    "Hadoop": ["hadoop", "hdfs"],
+    "Airflow": ["airflow", "apache airflow"],
+    "Docker": ["docker", "containerization"],
+    "Kubernetes": ["kubernetes", "k8s", "eks", "gke", "aks"],
+    "Terraform": ["terraform"],
+    "Ansible": ["ansible"],
+    "AWS": ["aws", "amazon web services", "ec2", "s3", "aws lambda"],
+    "Azure": ["azure", "microsoft azure"],
+    "GCP": ["gcp", "google cloud", "google cloud platform"],
+    "CI/CD": ["ci/cd", "ci cd", "continuous integration", "continuous delivery", "continuous deployment",
+              "jenkins", "github actions", "gitlab ci", "circleci"],
+    "Git": ["git", "github", "gitlab", "bitbucket"],
+    "Linux": ["linux", "unix", "bash", "shell scripting"],
+    "REST APIs": ["restful", "rest api", "rest apis", "restful api", "restful apis", "api development"],
+    "GraphQL": ["graphql"],
+    "gRPC": ["grpc"],
+    "Microservices": ["microservices", "micro services", "microservice"],
+    "React": ["react", "reactjs", "react.js"],
+    "Angular": ["angular", "angularjs"],
+    "Vue": ["vue", "vuejs", "vue.js"],
+    "Node.js": ["nodejs", "node.js"],
+    "Express": ["expressjs", "express.js"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi", "fast api"],
+    "Spring Boot": ["spring boot", "springboot", "spring framework"],
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3", "sass", "scss", "tailwind"],
+    "Pandas": ["pandas"],
+    "NumPy": ["numpy"],
+    "scikit-learn": ["scikit-learn", "sklearn", "scikit learn"],
+    "TensorFlow": ["tensorflow", "keras"],
+    "PyTorch": ["pytorch", "torch"],
+    "Machine Learning": ["machine learning"],
+    "Deep Learning": ["deep learning", "neural networks"],
+    "NLP": ["nlp", "natural language processing"],
+    "LLMs": ["llm", "llms", "large language models", "generative ai", "genai", "gen ai"],
+    "LangChain": ["langchain"],
+    "Data Visualization": ["data visualization", "matplotlib", "seaborn", "plotly", "tableau", "power bi"],
+    "Agile": ["agile", "scrum", "kanban"],
+    "Unit Testing": ["unit testing", "pytest", "junit", "jest", "tdd", "test driven development"],
+}
+
+# Ambiguous words as aliases. In a job's skill list or a portfolio (lists of technologies) "Go" or "spark" can
+# only mean the technology, so they are indexed for those. In resume prose they are too common ("I go to",
+# "sparked", "rest of the team"), so there only the technology's own spelling counts (CASED_ALIASES).
+AMBIGUOUS_ALIASES = {
+    "Go": ["go"],
+    "R": ["r"],
+    "REST APIs": ["rest"],
+    "Spring Boot": ["spring"],
+    "Swift": ["swift"],
+    "Spark": ["spark"],
+    "Machine Learning": ["ml"],
+    "Kubernetes": ["kube"],
+    "Docker": ["containers"],
+}
+AMBIGUOUS_WORDS = {alias for aliases in AMBIGUOUS_ALIASES.values() for alias in aliases}
+# "Spring" is left out: capitalized, it is as likely the season
+CASED_ALIASES = {"Go": "Go", "R": "R", "REST": "REST APIs", "Swift": "Swift", "Spark": "Spark", "ML": "Machine Learning"}
+# Not part of a longer token ("R&D", "go-live", "Go.mod"); "R." is left out too, it's usually a middle initial
+_CASED_RE = re.compile(r"(?<![\w.+#&-])(" + "|".join(CASED_ALIASES) + r")(?![\w+#&-]|\.\w)(?<!R(?=\.))")
+
+# Posting entries that aren't technical skills: degrees, years of experience, soft skills. They can't be matched
+# against resume words reliably, so they stay out of the percentage and the LLM judges them.
+NON_TECHNICAL_RE = re.compile(
+    r"\b(bachelor'?s?|master'?s?|degree|diploma|ph\.?d|b\.?sc|m\.?sc|b\.?s|m\.?s|b\.?tech|m\.?tech|mba|\d+\+?\s*(?:years?|yrs)|"
+    r"communication|teamwork|team player|leadership|collaboration|collaborative|interpersonal|problem[- ]solving|"
+    r"time management|attention to detail|self[- ]motivated|self[- ]starter|organi[sz]ational|presentation|"
+    r"critical thinking|analytical thinking|adaptability|work ethic|fluent|fluency|english)\b",
+    re.I,
+)
+
+# A match this far below the 80% cutoff is "clearly" unsuitable: fast mode answers without the LLM
+SUITABILITY_THRESHOLD = 80
+FAST_MODE_CUTOFF = int(os.getenv("FAST_MODE_CUTOFF", "60"))
+
+# Semantic pass (utility/embeddings.py) for job skills the exact pass missed: spelling variants and
+# typos like "PostgresSQL" or "Kubernets". Very short skills ("Go", "SQL") are left to the exact pass.
+SEMANTIC_SKILLS = os.getenv("SEMANTIC_SKILLS", "true").lower() == "true"
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_THRESHOLD", "0.72")) # Cosine similarity needed to count as matched
+SEMANTIC_TOP_K = 5
+SEMANTIC_MIN_LENGTH = 4
+SEMANTIC_MAX_PHRASES = 2000 # Resume/portfolio words and word pairs compared per request
+SEMANTIC_WORD_THRESHOLD = 0.6 # Every word of the skill needs a word this close (or containing it) in the evidence
+
+# Words a job skill may carry besides the skill itself ("5+ years of Python experience", "Python and Java")
+SKILL_FILLER = {"and", "or", "with", "plus", "in", "of", "experience", "knowledge", "proficiency", "familiarity",
+                "strong", "solid", "years", "year", "yrs", "programming", "language", "languages"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#.][a-z0-9+#.\-]*")
+_END = "\0"
+
+
+def tokenize(text: str):
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        token = token.rstrip(".-") # Sentence punctuation, "node.js." -> "node.js"
+        if token.startswith(".") and token != ".net":
+            token = token.lstrip(".")
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+class SkillIndex:
+    # Token trie over alias phrases. scan() walks the text once and takes the longest alias starting
+    # at each token, so cost is linear in the text (times the longest alias, a handful of tokens).
+    def __init__(self, phrases=None):
+        self.root = {}
+        for canonical, aliases in (phrases or {}).items():
+            for alias in aliases:
+                self.add(alias, canonical)
+
+    def add(self, phrase: str, canonical: str):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_END] = canonical
+
+    def scan_tokens(self, tokens):
+        return self._walk(tokens)
+
+    def cover_tokens(self, tokens):
+        # (canonicals found, tokens no alias covers), for checking a job skill is covered end to end
+        uncovered = []
+        return self._walk(tokens, uncovered), uncovered
+
+    def _walk(self, tokens, uncovered=None):
+        found = set()
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            match, match_end = None, i
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _END in node:
+                    match, match_end = node[_END], j
+            if match is not None:
+                found.add(match)
+                i = match_end
+            else:
+                if uncovered is not None:
+                    uncovered.append(tokens[i])
+                i += 1
+        return found
+
+    def scan(self, text: str):
+        return self.scan_tokens(tokenize(text))
+
+
+# Compiled once at import. LIST_INDEX also knows the ambiguous words, for skill lists (postings, portfolios).
+SKILL_INDEX = SkillIndex(SKILL_SYNONYMS)
+LIST_INDEX = SkillIndex(SKILL_SYNONYMS)
+for _canonical, _aliases in AMBIGUOUS_ALIASES.items():
+    for _alias in _aliases:
+        LIST_INDEX.add(_alias, _canonical)
+
+
+def cased_skills(text: str) -> set:
+    # Canonicals of the ambiguous skills written the way the technology is ("Go", "Spark"), not as plain words
+    return {CASED_ALIASES[word] for word in _CASED_RE.findall(text or "")}
+
+
+def is_non_technical(skill: str) -> bool:
+    # A degree, years-of-experience or soft-skill entry that names no known technology
+    return NON_TECHNICAL_RE.search(skill) is not None and not LIST_INDEX.scan(skill)
+
+
+def normalize_job_skills(job_skills):
+    # The extraction prompt asks for a list, but some models still return one comma-separated string
+    if isinstance(job_skills, str):
+        job_skills = re.split(r"[,;\n]", job_skills)
+    if not isinstance(job_skills, list):
+        return []
+    return [str(skill).strip() for skill in job_skills if str(skill).strip()]
+
+
+def match_skills(job_skills, resume_text: str = "", portfolio_skills: str = "") -> dict:
+    # Deterministic replacement for the LLM's "Matched Skills" / "Skill Match Percentage"
+    job_skills = normalize_job_skills(job_skills)
+    # Degrees, years and soft skills aren't counted; the prompt hands them to the LLM
+    other = [skill for skill in job_skills if is_non_technical(skill)]
+    job_skills = [skill for skill in job_skills if skill not in other]
+    candidate_tokens = tokenize(f"{resume_text or ''}\n{portfolio_skills or ''}")
+    candidate_known = SKILL_INDEX.scan_tokens(tokenize(resume_text or "")) | cased_skills(resume_text)
+    candidate_known |= LIST_INDEX.scan(portfolio_skills or "")
+
+    # A job skill goes through the dictionary only if its aliases cover all of it, and then needs every skill it
+    # names ("Python and Java" needs both). The rest ("Azure DevOps", "React Native", "AWS Glue") are matched as
+    # literal phrases in one extra pass, so the base word alone doesn't count. Ambiguous words ("Go") are always
+    # covered by LIST_INDEX, so they never become a literal phrase that "I go to" would match.
+    phrase_index = SkillIndex()
+    job_canonicals = []
+    for skill in job_skills:
+        canonicals, uncovered = LIST_INDEX.cover_tokens(tokenize(skill))
+        if any(token not in SKILL_FILLER and not token.rstrip("+").isdigit() for token in uncovered):
+            canonicals = set()
+        if not canonicals:
+            phrase_index.add(skill, skill)
+        job_canonicals.append(canonicals)
+    candidate_phrases = phrase_index.scan_tokens(candidate_tokens) if phrase_index.root else set()
+
+    hits = {}
+    for skill, canonicals in zip(job_skills, job_canonicals):
+        hits[skill] = canonicals <= candidate_known if canonicals else skill in candidate_phrases
+
+    semantic = []
+    if SEMANTIC_SKILLS:
+        # Not for the ambiguous words themselves: "spark" in prose is as close to "Spark" as it gets
+        unmatched = [skill for skill, hit in hits.items() if not hit and not set(tokenize(skill)) - SKILL_FILLER <= AMBIGUOUS_WORDS]
+        semantic = semantic_matches(unmatched, candidate_tokens, candidate_known)
+        for entry in semantic:
+            hits[entry["skill"]] = True
+
+    matched = [skill for skill in job_skills if hits[skill]]
+    missing = [skill for skill in job_skills if not hits[skill]]
+    if not job_skills:
+        # Nothing to count against: no authoritative numbers, the LLM judges from the description
+        return {"Matched Skills": [], "Missing Skills": [], "Semantic Matches": [], "Other Requirements": other,
+                "Skill Match Percentage": None, "Suitability": None}
+    percentage = round(100 * len(matched) / len(job_skills))
+    return {
+        "Matched Skills": matched,
+        "Missing Skills": missing,
+        "Semantic Matches": semantic,
+        "Other Requirements": other,
+        "Skill Match Percentage": percentage,
+        "Suitability": "Yes" if percentage >= SUITABILITY_THRESHOLD else "No",
+    }
+
+
+def is_authoritative(match: dict) -> bool:
+    # False when the posting listed no skills, so there is no local percentage or verdict
+    return match["Skill Match Percentage"] is not None
+
+
+def candidate_phrases(tokens):
+    # Distinct words and word pairs from the resume/portfolio, in order of first appearance
+    phrases, seen = [], set()
+    for i, token in enumerate(tokens):
+        for phrase in (token, f"{token} {tokens[i + 1]}" if i + 1 < len(tokens) else None):
+            if phrase and len(phrase) >= SEMANTIC_MIN_LENGTH and phrase not in seen:
+                seen.add(phrase)
+                phrases.append(phrase)
+                if len(phrases) >= SEMANTIC_MAX_PHRASES:
+                    return phrases
+    return phrases
+
+
+def semantic_matches(skills, candidate_tokens, candidate_known) -> list:
+    # [{"skill", "evidence", "score"}] for the skills with close evidence. A skill matches if one of its
+    # nearest vocabulary entries is a skill the candidate has, or if a resume/portfolio phrase is itself
+    # close to it. Either way the evidence has to cover every word of the skill (see covers_skill), so a
+    # single shared word ("Apache Flink" / "apache kafka", "Power BI" / "power plant") is not enough.
+    # Pure arithmetic on local vectors, so the same inputs always give the same scores.
+    skills = [skill for skill in skills if len(skill) >= SEMANTIC_MIN_LENGTH]
+    if not skills:
+        return []
+    from utility.embeddings import embed, get_vocabulary
+    queries = embed(skills)
+    neighbours = get_vocabulary().top_k(queries, SEMANTIC_TOP_K) if candidate_known else [[] for _ in skills]
+    phrases = candidate_phrases(candidate_tokens)
+    scores = embed(phrases) @ queries.T if phrases else None
+
+    results = []
+    for column, skill in enumerate(skills):
+        best = None
+        for canonical, phrase, score in neighbours[column]:
+            if score < SEMANTIC_THRESHOLD:
+                break
+            if canonical in candidate_known and covers_skill(skill, phrase):
+                best = (score, canonical)
+                break
+        if scores is not None:
+            # The closest few phrases, best first; the first that covers the skill is the evidence
+            column_scores = scores[:, column]
+            top = column_scores.argsort()[::-1][:SEMANTIC_TOP_K]
+            for row in top.tolist():
+                score = float(column_scores[row])
+                if score < SEMANTIC_THRESHOLD or (best is not None and score <= best[0]):
+                    break
+                if covers_skill(skill, phrases[row]):
+                    best = (score, phrases[row])
+                    break
+        if best is not None:
+            results.append({"skill": skill, "evidence": best[1], "score": round(best[0], 2)})
+    return results
+
+
+def covers_skill(skill: str, evidence: str) -> bool:
+    # Every word of the skill has a close word in the evidence (typos: "kubernets") or is spelled out inside
+    # it ("Postgre SQL" in "postgresql", "Micro-services" in "microservices")
+    from utility.embeddings import embed, phrase_words
+    skill_words, evidence_words = phrase_words(skill), phrase_words(evidence)
+    if not skill_words or not evidence_words:
+        return False
+    squashed = "".join(evidence_words)
+    similarity = embed(skill_words) @ embed(evidence_words).T
+    return all(similarity[i].max() >= SEMANTIC_WORD_THRESHOLD or (len(word) >= 3 and word in squashed)
+               for i, word in enumerate(skill_words))
+
+
+def skill_match_prompt_block(match: dict) -> str:
+    # Appended to the analysis prompts so the LLM writes questions/suggestions around fixed numbers
+    if not is_authoritative(match):
+        return f"""### PRECOMPUTED SKILL MATCH:
+The job posting lists no specific technical skills. Judge "Suitability", "Skill Match Percentage" and "Matched Skills" from the job description.
+{other_line(match)}"""
+    return f"""### PRECOMPUTED SKILL MATCH (authoritative, do not recalculate):
+Suitability: {match["Suitability"]}
+Skill Match Percentage: {match["Skill Match Percentage"]}
+Matched Skills: {", ".join(match["Matched Skills"]) or "None"}
+Missing Skills: {", ".join(match["Missing Skills"]) or "None"}
+{semantic_line(match)}{other_line(match)}Use exactly these values for "Suitability", "Skill Match Percentage" and "Matched Skills", and spend your effort on the questions, reasons and suggestions.
+"""
+
+
+def semantic_line(match: dict) -> str:
+    # Which matched skills rest on a close rather than exact match, with their similarity (0-1)
+    semantic = match.get("Semantic Matches")
+    if not semantic:
+        return ""
+    pairs = ", ".join(f'{entry["skill"]} ~ {entry["evidence"]} ({entry["score"]:.2f})' for entry in semantic)
+    return f"Close Matches (counted as matched; similarity 0-1): {pairs}\n"
+
+
+def other_line(match: dict) -> str:
+    # Degree, experience and soft-skill requirements, not part of the percentage
+    other = match.get("Other Requirements")
+    if not other:
+        return ""
+    return f"Other Requirements (not counted above; judge them from the resume and mention unmet ones): {', '.join(other)}\n"
+
+
+def apply_skill_match(result: dict, match: dict) -> dict:
+    # The local numbers win over whatever the model wrote, when there are any
+    if is_authoritative(match):
+        for key in ("Suitability", "Skill Match Percentage", "Matched Skills"):
+            result[key] = match[key]
+    if result.get("Suitability") == "Yes":
+        result.setdefault("Interview Questions", [])
+        result.setdefault("Behavioral Questions", [])
+    else:
+        result.setdefault("Reasons for Unsuitability", [])
+        result.setdefault("Suggestions", [])
+    return result
+
+
+def is_clearly_unsuitable(match: dict) -> bool:
+    return is_authoritative(match) and match["Skill Match Percentage"] < FAST_MODE_CUTOFF
+
+
+def fast_mode_result(match: dict) -> dict:
+    # Analysis without an LLM call, for matches well below the threshold
+    missing = match["Missing Skills"]
+    return {
+        "Suitability": "No",
+        "Skill Match Percentage": match["Skill Match Percentage"],
+        "Matched Skills": match["Matched Skills"],
+        "Reasons for Unsuitability": [f"No evidence of {skill}, which the job posting requires." for skill in missing],
+        "Suggestions": [f"Build a project that uses {skill} and describe it on your resume or portfolio." for skill in missing[:4]],
+    }
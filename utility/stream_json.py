@@ -0,0 +1,80 @@
+# stream_json.py
+import json
+
+
+class IncrementalJSONObject:
+    # Feed streamed LLM text in arbitrary chunks; returns the top-level ("key", value) pairs of the
+    # JSON object as soon as each value is complete. Leading ```json fences or preamble are skipped.
+    def __init__(self):
+        self.buffer = ""
+        self.result = {}
+        self.done = False
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._reset_pair()
+
+    def _reset_pair(self):
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._value_emitted = False
+
+    def _emit(self, raw, completed):
+        if self._value_emitted or self._key is None:
+            return
+        self._value_emitted = True
+        try:
+            value = json.loads(raw.strip())
+        except ValueError:
+            return # Malformed value, the final full parse will report it
+        self.result[self._key] = value
+        completed.append((self._key, value))
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        buf = self.buffer
+        completed = []
+        while self._pos < len(buf) and not self.done:
+            ch = buf[self._pos]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._value_start is None:
+                            self._key = json.loads(buf[self._key_start:self._pos + 1])
+                        else:
+                            self._emit(buf[self._value_start:self._pos + 1], completed)
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = self._pos
+            elif ch == ":" and self._depth == 1 and self._value_start is None and self._key is not None:
+                self._value_start = self._pos + 1
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    # A nested object/array value just closed
+                    self._emit(buf[self._value_start:self._pos + 1], completed)
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        self._emit(buf[self._value_start:self._pos], completed)
+                    self.done = True
+            elif ch == "," and self._depth == 1:
+                if self._value_start is not None:
+                    self._emit(buf[self._value_start:self._pos], completed) # Numbers, true/false/null
+                self._reset_pair()
+            self._pos += 1
+        return completed
@@ -0,0 +1,39 @@
+# timing.py
+import time
+from contextlib import contextmanager
+from utility.observability import span
+
+
+class StageTimer:
+    # Collects wall-clock durations (ms) per pipeline stage for a single request. Each stage is also a
+    # span, so it lands in the request's trace and the stage_duration_seconds histogram.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            with span(name):
+                yield
+        finally:
+            self.stages[name] = (time.perf_counter() - start) * 1000
+
+    async def timed(self, name, awaitable):
+        with self.stage(name):
+            return await awaitable
+
+    def count(self, name, value):
+        # Per-request tallies that aren't durations, e.g. tokens saved by compaction
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing_header(self):
+        # Standard Server-Timing header, shows up in the browser devtools network panel
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
@@ -0,0 +1,21 @@
+# warmup.py
+import importlib
+import os
+import time
+from utility.observability import log
+
+# Heavy modules the request path imports on first use. The lifespan loads them in a background thread
+# right after startup, so the worker accepts traffic immediately and the first request rarely pays for them.
+WARMUP_MODULES = (
+    "langchain_groq",
+    "lxml.html",
+    "numpy",
+)
+WARMUP_IMPORTS = os.getenv("WARMUP_IMPORTS", "true").lower() == "true"
+
+
+def warm_imports(modules=WARMUP_MODULES):
+    started = time.perf_counter()
+    for module in modules:
+        importlib.import_module(module)
+    log("warmup_imports_done", ms=round((time.perf_counter() - started) * 1000), modules=len(modules))